@@ -1,10 +1,84 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .models import AuditEvent, Item, ItemAlias, Site, StockBalance, StockLedger, TimesheetEntry, User
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     fieldsets = UserAdmin.fieldsets + (
-        ("Additional Info", {"fields": ("role", "site_location")}),
+        ("Additional Info", {"fields": ("role", "site_location", "site", "supervisor")}),
     )
     list_display = ("username", "email", "role",  "site_location", "is_active")  # ✅ Add here
+
+
+@admin.register(Site)
+class SiteAdmin(admin.ModelAdmin):
+    list_display = ("name", "latitude", "longitude", "radius_m", "timezone", "geohash")
+    search_fields = ("name",)
+
+
+@admin.register(TimesheetEntry)
+class TimesheetEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        "user", "period_start", "period_end", "shifts", "regular_hours",
+        "overtime_hours", "night_hours", "leave_days", "paid_hours",
+    )
+    list_filter = ("period_start",)
+    search_fields = ("user__username",)
+    readonly_fields = ("computed_at",)
+
+
+class ItemAliasInline(admin.TabularInline):
+    model = ItemAlias
+    extra = 1
+
+
+@admin.register(Item)
+class ItemAdmin(admin.ModelAdmin):
+    list_display = ("name", "unit", "created_at")
+    search_fields = ("name", "aliases__name")
+    inlines = [ItemAliasInline]
+
+
+# Balances and the ledger change only through accounts.stock.
+@admin.register(StockBalance)
+class StockBalanceAdmin(admin.ModelAdmin):
+    list_display = ("item", "site", "on_hand", "reserved", "updated_at")
+    list_filter = ("site",)
+    search_fields = ("item__name",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockLedger)
+class StockLedgerAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "item", "site", "kind", "quantity", "on_hand", "reserved", "user")
+    list_filter = ("kind", "site")
+    search_fields = ("item__name",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# Append-only: events are written by accounts.audit and leave only through
+# `manage.py archive_audit_events`.
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "object_type", "object_id", "action", "actor_username", "changes")
+    list_filter = ("object_type", "action")
+    search_fields = ("actor_username", "=object_id")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
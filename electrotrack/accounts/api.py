@@ -0,0 +1,316 @@
+"""
+JSON clock-in / clock-out API for the mobile field app.
+
+The views are async and use the async ORM (acreate / aupdate / aget), so an
+ASGI worker (config.asgi) can keep many slow mobile connections open without
+a thread per request. Under WSGI they still work; Django runs them in an
+event loop per request.
+
+  POST /accounts/api/attendance/clock-in/    {"latitude": 12.97, "longitude": 80.22}
+  POST /accounts/api/attendance/clock-out/   (same body)
+  POST /accounts/api/attendance/sync/        {"punches": [{"id": "<uuid>",
+        "action": "clock_in", "timestamp": "2026-10-12T08:02:00+05:30",
+        "latitude": 12.97, "longitude": 80.22}, ...]}   (see accounts.punches)
+
+Auth: `Authorization: Token <key>` with a key from `manage.py create_api_token`.
+
+Retries: send an `Idempotency-Key` header (e.g. a UUID per tap). The first
+response for a key is stored and replayed for every retry with the same key,
+marked with an `Idempotent-Replayed: true` header. Keys expire after
+IDEMPOTENCY_KEY_TTL; `manage.py purge_idempotency_keys` deletes old ones.
+"""
+import hashlib
+import json
+import secrets
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import DateTimeField, F, Value
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .expressions import HoursBetween
+from .feed import publish
+from .geofence import clean_location, fence_fields
+from .models import ApiToken, Attendance, IdempotencyKey
+from .punches import MAX_PUNCHES, Punch, sync_punches
+from .stats import invalidate_dashboard_stats
+from .summaries import record_key, refresh_daily_summaries
+
+# last_used_at is only rewritten when older than this, to keep writes off
+# the hot path.
+TOKEN_TOUCH_INTERVAL = timedelta(minutes=5)
+
+# Offline punches may be stamped slightly ahead of the server clock.
+PUNCH_CLOCK_SKEW = timedelta(minutes=5)
+
+# A retry older than this is a new request; the stored key is replaced.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+
+def _hash(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def issue_token(user, name=""):
+    """Create an API token for `user` and return the raw key (not stored)."""
+    key = secrets.token_urlsafe(32)
+    ApiToken.objects.create(user=user, name=name, key_hash=_hash(key))
+    return key
+
+
+def _create(model, **fields):
+    """model.objects.create() in a savepoint: an IntegrityError leaves an enclosing transaction usable."""
+    with transaction.atomic():
+        return model.objects.create(**fields)
+
+
+def _error(status, code, detail):
+    return status, {"error": code, "detail": detail}
+
+
+async def _authenticate(request):
+    scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() not in ("token", "bearer") or not key.strip():
+        return None
+    try:
+        token = await ApiToken.objects.select_related("user__site").aget(key_hash=_hash(key.strip()))
+    except ApiToken.DoesNotExist:
+        return None
+    if not token.user.is_active:
+        return None
+
+    now = timezone.now()
+    if token.last_used_at is None or now - token.last_used_at > TOKEN_TOUCH_INTERVAL:
+        await ApiToken.objects.filter(pk=token.pk).aupdate(last_used_at=now)
+    return token.user
+
+
+def _json_body(request):
+    try:
+        body = json.loads(request.body or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise ValueError("Body must be JSON.")
+    if not isinstance(body, dict):
+        raise ValueError("Body must be a JSON object.")
+    return body
+
+
+def _location(data):
+    """(latitude, longitude) from a JSON object, or raise ValueError."""
+    return clean_location(data.get("latitude"), data.get("longitude"))
+
+
+def _punches(data):
+    """([Punch, ...],) from a sync body, or raise ValueError."""
+    items = data.get("punches")
+    if not isinstance(items, list) or not items:
+        raise ValueError("punches must be a non-empty list.")
+    if len(items) > MAX_PUNCHES:
+        raise ValueError(f"At most {MAX_PUNCHES} punches per request.")
+
+    latest = timezone.now() + PUNCH_CLOCK_SKEW
+    punches, seen = [], set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"punches[{index}] must be an object.")
+        client_id = str(item.get("id") or "").strip()
+        if not client_id or len(client_id) > 64:
+            raise ValueError(f"punches[{index}].id must be 1-64 characters.")
+        if item.get("action") not in ("clock_in", "clock_out"):
+            raise ValueError(f"punches[{index}].action must be clock_in or clock_out.")
+        timestamp = parse_datetime(str(item.get("timestamp") or ""))
+        if timestamp is None:
+            raise ValueError(f"punches[{index}].timestamp must be an ISO 8601 datetime.")
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+        if timestamp > latest:
+            raise ValueError(f"punches[{index}].timestamp is in the future.")
+        try:
+            latitude, longitude = _location(item)
+        except ValueError as exc:
+            raise ValueError(f"punches[{index}]: {exc}")
+
+        # A queue that repeats an id is a client bug; keep the first copy.
+        if client_id in seen:
+            continue
+        seen.add(client_id)
+        punches.append(Punch(client_id, item["action"], timestamp, latitude, longitude))
+    return (punches,)
+
+
+def api_endpoint(name, parse=_location):
+    """
+    Token auth, JSON parsing and Idempotency-Key handling around an async
+    handler(user, *parse(body)) -> (status, payload). `parse` validates the
+    JSON body and raises ValueError for a 400.
+    """
+    def decorator(handler):
+        @csrf_exempt
+        @require_POST
+        @wraps(handler)
+        async def view(request):
+            user = await _authenticate(request)
+            if user is None:
+                return JsonResponse({"error": "unauthorized", "detail": "Invalid or missing token."}, status=401)
+            if user.role in ["admin", "supervisor"]:
+                return JsonResponse(
+                    {"error": "forbidden", "detail": "Admins and supervisors cannot mark attendance."},
+                    status=403,
+                )
+            try:
+                args = parse(_json_body(request))
+            except ValueError as exc:
+                return JsonResponse({"error": "invalid", "detail": str(exc)}, status=400)
+
+            key = request.headers.get("Idempotency-Key", "").strip()[:255]
+            record = None
+            if key:
+                record, replay = await _claim(user, key, name)
+                if replay is not None:
+                    return replay
+
+            try:
+                status, payload = await handler(user, *args)
+            except Exception:
+                # Let the client retry with the same key.
+                if record:
+                    await IdempotencyKey.objects.filter(pk=record.pk).adelete()
+                raise
+
+            if record:
+                await IdempotencyKey.objects.filter(pk=record.pk).aupdate(
+                    status_code=status, response=payload
+                )
+            return JsonResponse(payload, status=status)
+
+        return view
+
+    return decorator
+
+
+async def _claim(user, key, name):
+    """
+    (record, None) when this request owns `key`, or (None, response) with the
+    stored answer for it. A key whose first request failed (and released it)
+    or that has expired is claimed again.
+    """
+    for _ in range(2):
+        try:
+            return await sync_to_async(_create)(IdempotencyKey, user=user, key=key, endpoint=name), None
+        except IntegrityError:
+            pass
+        stored = await IdempotencyKey.objects.filter(user=user, key=key).afirst()
+        if stored is None:
+            continue
+        if stored.created_at < timezone.now() - IDEMPOTENCY_KEY_TTL:
+            await IdempotencyKey.objects.filter(pk=stored.pk).adelete()
+            continue
+        return None, _replay(stored, name)
+    # Lost the race twice; the other request is still holding the key.
+    return None, JsonResponse(
+        {"error": "in_progress", "detail": "A request with this key is still being processed."},
+        status=409,
+    )
+
+
+def _replay(stored, name):
+    if stored.endpoint != name:
+        return JsonResponse(
+            {"error": "idempotency_key_reused", "detail": "This key was used for another endpoint."},
+            status=422,
+        )
+    if stored.status_code is None:
+        return JsonResponse(
+            {"error": "in_progress", "detail": "A request with this key is still being processed."},
+            status=409,
+        )
+    return JsonResponse(stored.response, status=stored.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+# ============================================
+# CLOCK IN / CLOCK OUT
+# ============================================
+@api_endpoint("clock_in")
+async def api_clock_in(user, latitude, longitude):
+    now = timezone.now()
+    try:
+        # The one-open-shift constraint rejects a second open shift.
+        record = await sync_to_async(_create)(
+            Attendance,
+            user=user,
+            clock_in=now,
+            latitude=latitude,
+            longitude=longitude,
+            status="pending",
+            **fence_fields(user.site, latitude, longitude),
+        )
+    except IntegrityError:
+        return _error(409, "already_clocked_in", "You are already clocked in.")
+
+    return 201, {
+        "id": record.pk,
+        "clock_in": now.isoformat(),
+        "status": record.status,
+        "out_of_fence": record.out_of_fence,
+    }
+
+
+@api_endpoint("clock_out")
+async def api_clock_out(user, latitude, longitude):
+    shift = await (
+        Attendance.objects.filter(user=user, clock_in__isnull=False, clock_out__isnull=True)
+        .only("id", "user_id", "clock_in", "shift_date")
+        .afirst()
+    )
+    if shift is None:
+        return _error(409, "not_clocked_in", "No active clock-in found.")
+
+    now = timezone.now()
+    closed = await Attendance.objects.filter(pk=shift.pk, clock_out__isnull=True).aupdate(
+        clock_out=now,
+        clock_out_latitude=latitude,
+        clock_out_longitude=longitude,
+        total_hours=HoursBetween(Value(now, output_field=DateTimeField()), F("clock_in")),
+    )
+    if not closed:
+        return _error(409, "not_clocked_in", "No active clock-in found.")
+
+    await sync_to_async(publish)(Attendance, [shift.pk])
+    await sync_to_async(lambda: refresh_daily_summaries([record_key(shift)]))()
+    await sync_to_async(invalidate_dashboard_stats)(user.pk)
+
+    hours = (now - shift.clock_in).total_seconds() / 3600 if shift.clock_in else None
+    return 200, {
+        "id": shift.pk,
+        "clock_in": shift.clock_in.isoformat() if shift.clock_in else None,
+        "clock_out": now.isoformat(),
+        "total_hours": round(hours, 2) if hours is not None else None,
+    }
+
+
+# ============================================
+# OFFLINE SYNC
+# ============================================
+@api_endpoint("sync", parse=_punches)
+async def api_sync_punches(user, punches):
+    try:
+        results, open_shift = await sync_to_async(sync_punches)(user, punches)
+    except IntegrityError:
+        # Another sync for the same punches committed first; retrying
+        # reports them as duplicates.
+        return _error(409, "conflict", "These punches were synced concurrently; retry.")
+
+    return 200, {
+        "results": results,
+        "applied": sum(result["status"] == "applied" for result in results),
+        "open_shift": {
+            "id": open_shift.pk,
+            "clock_in": open_shift.clock_in.isoformat() if open_shift.clock_in else None,
+        } if open_shift else None,
+    }
@@ -0,0 +1,98 @@
+"""
+Audit trail: who approved, rejected or edited which record (AuditEvent).
+
+`record()` and `record_many()` don't write anything themselves. Events are
+buffered and written with one bulk_create when the transaction they belong
+to commits (transaction.on_commit), so a bulk approval of thousands of rows
+adds one batched INSERT, and a change that is rolled back leaves no event.
+Outside a transaction the events are written straight away.
+
+The buffer is kept per savepoint level: each level registers its own
+on_commit flush, so rolling back a savepoint drops the flush together with
+the events recorded inside it, the same way Django drops the savepoint's
+other commit hooks.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import AuditEvent
+
+BATCH_SIZE = 2_000
+
+_local = threading.local()
+
+
+class _Buffer:
+    def __init__(self, using):
+        self.using = using
+        self.events = []
+
+    def flush(self):
+        events, self.events = self.events, []
+        AuditEvent.objects.using(self.using).bulk_create(events, batch_size=BATCH_SIZE)
+
+
+def _buffer(using):
+    """The pending buffer for the current savepoint level, registering its flush on first use."""
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        return None
+    # Buffers whose flush is no longer pending were written, or rolled back
+    # along with their transaction or savepoint.
+    pending = {getattr(hook, "__self__", None) for _, hook, _ in connection.run_on_commit}
+    buffers = _local.buffers = {
+        key: buffer for key, buffer in getattr(_local, "buffers", {}).items()
+        if key[0] != using or buffer in pending
+    }
+    key = (using, tuple(connection.savepoint_ids))
+    if key not in buffers:
+        buffers[key] = _Buffer(using)
+        transaction.on_commit(buffers[key].flush, using=using)
+    return buffers[key]
+
+
+def _events(events, using):
+    buffer = _buffer(using)
+    if buffer is None:
+        AuditEvent.objects.using(using).bulk_create(events, batch_size=BATCH_SIZE)
+    else:
+        buffer.events.extend(events)
+
+
+def _event(actor, action, object_type, object_id, changes):
+    return AuditEvent(
+        object_type=object_type,
+        object_id=object_id,
+        action=action,
+        actor=actor if actor is not None and actor.is_authenticated else None,
+        actor_username=getattr(actor, "username", "") or "",
+        changes=changes,
+    )
+
+
+def record(actor, action, obj, using=DEFAULT_DB_ALIAS, **changes):
+    """
+    Log `action` by `actor` on the model instance `obj`. Keyword arguments
+    are the changed fields as (old, new) pairs, e.g. status=("pending", "approved").
+    """
+    _events(
+        [_event(actor, action, obj._meta.label_lower, obj.pk, {
+            field: list(values) if isinstance(values, tuple) else values
+            for field, values in changes.items()
+        })],
+        using,
+    )
+
+
+def record_many(actor, action, model, rows, using=DEFAULT_DB_ALIAS):
+    """Log `action` on many records of `model`: `rows` is [(pk, changes dict), ...]."""
+    label = model._meta.label_lower
+    _events([_event(actor, action, label, pk, changes) for pk, changes in rows], using)
+
+
+def history(obj):
+    """`obj`'s events, oldest first (one range scan of audit_object_idx)."""
+    return AuditEvent.objects.filter(
+        object_type=obj._meta.label_lower, object_id=obj.pk
+    ).order_by("created_at", "id")
@@ -0,0 +1,323 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks never touch the configured database: everything runs against a
+throwaway test database that is created from the current models and destroyed
+afterwards.
+"""
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from .metrics import percentile  # noqa: F401  (re-exported for the commands)
+from .models import Attendance, Item, WorkReport, MaterialRequest, normalize_item_name, shift_date
+from .search import install_search_indexes
+
+User = get_user_model()
+
+SITES = ["Site A", "Site B", "Site C", "Site D", "Site E"]
+BATCH_SIZE = 10_000
+
+
+@contextmanager
+def scratch_database(verbosity=0, file_backed=False):
+    """
+    Create a disposable test database for the duration of the block.
+
+    SQLite test databases live in memory by default; pass file_backed=True
+    for benchmarks that need real file locking (concurrent writers).
+    """
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_test_settings = dict(test_settings)
+    # Build the schema straight from the models; replaying the full
+    # migration history is slow and adds nothing to a benchmark.
+    test_settings["MIGRATE"] = False
+    if file_backed and connection.vendor == "sqlite":
+        test_settings["NAME"] = os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+    old_name = connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, serialize=False
+    )
+    # Raw-SQL pieces of the schema that the models don't describe.
+    install_search_indexes()
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings.clear()
+        test_settings.update(old_test_settings)
+
+
+@contextmanager
+def test_environment():
+    """Django's test setup (allowed hosts, fast email backend) without the test runner."""
+    setup_test_environment(debug=settings.DEBUG)
+    try:
+        yield
+    finally:
+        teardown_test_environment()
+
+
+@contextmanager
+def explicit_timestamps(model, field_name="created_at"):
+    """Let bulk_create keep the given auto_now_add values while seeding."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def _batched(objects, size=BATCH_SIZE):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _random_moment(now, days):
+    return now - timedelta(seconds=random.randint(0, days * 86400))
+
+
+def seed_users(count, password="benchmark"):
+    """Create `count` electricians spread over SITES; returns their ids."""
+    hashed = make_password(password)
+    users = (
+        User(
+            username=f"bench{i}",
+            password=hashed,
+            role="electrician",
+            site_location=SITES[i % len(SITES)],
+        )
+        for i in range(count)
+    )
+    for batch in _batched(users):
+        User.objects.bulk_create(batch)
+    return list(User.objects.filter(username__startswith="bench").values_list("id", flat=True))
+
+
+def seed_attendance(user_ids, count, days=365, open_share=0.1):
+    """
+    Create `count` closed shifts for random users over the last `days`, plus
+    one open shift for the first `open_share` of users.
+    """
+    now = timezone.now()
+    statuses = ["approved"] * 7 + ["pending"] * 2 + ["rejected"]
+
+    def rows():
+        for _ in range(count):
+            clock_in = _random_moment(now, days)
+            hours = random.uniform(4, 11)
+            yield Attendance(
+                user_id=random.choice(user_ids),
+                clock_in=clock_in,
+                shift_date=shift_date(None, clock_in),
+                clock_out=clock_in + timedelta(hours=hours),
+                total_hours=round(hours, 2),
+                status=random.choice(statuses),
+                latitude=12.9 + random.random() / 10,
+                longitude=80.2 + random.random() / 10,
+            )
+        for user_id in user_ids[: int(len(user_ids) * open_share)]:
+            clock_in = now - timedelta(hours=2)
+            yield Attendance(user_id=user_id, clock_in=clock_in, shift_date=shift_date(None, clock_in))
+
+    for batch in _batched(rows()):
+        Attendance.objects.bulk_create(batch)
+
+
+def seed_month(user_ids, first_day, days=30):
+    """
+    A realistic pay period: per user and day, mostly one approved shift
+    (some night shifts, some long enough for overtime), otherwise leave or
+    absence. Returns the number of rows created.
+    """
+    zone = timezone.get_default_timezone()
+    created = 0
+
+    def rows():
+        for user_id in user_ids:
+            for offset in range(days):
+                day = first_day + timedelta(days=offset)
+                roll = random.random()
+                if roll < 0.08:
+                    # No clock times: the row covers shift_date.
+                    yield Attendance(
+                        user_id=user_id,
+                        shift_date=day,
+                        attendance_type="leave" if roll < 0.05 else "absent",
+                        status="approved",
+                    )
+                    continue
+                if roll < 0.2:
+                    continue  # day off
+                start_hour = 21 if roll > 0.85 else random.choice([6, 7, 8, 9])
+                clock_in = timezone.make_aware(
+                    datetime(day.year, day.month, day.day, start_hour, random.randint(0, 59)), zone
+                )
+                hours = random.uniform(6, 12)
+                yield Attendance(
+                    user_id=user_id,
+                    clock_in=clock_in,
+                    shift_date=day,
+                    clock_out=clock_in + timedelta(hours=hours),
+                    total_hours=round(hours, 2),
+                    status="approved",
+                )
+
+    for batch in _batched(rows()):
+        Attendance.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+TASKS = [
+    "Cable laying", "Panel wiring", "Earthing pit", "Lighting fixture install",
+    "DB board replacement", "Conduit routing", "Transformer inspection",
+    "Fault finding", "Meter installation", "Generator changeover",
+]
+WORDS = (
+    "cable termination gland conduit tray panel breaker mcb rccb earthing "
+    "pit lug crimp busbar transformer meter fault insulation megger socket "
+    "switch lighting fixture ceiling trunking junction box wire phase neutral"
+).split()
+
+
+def seed_work_reports(user_ids, count, days=365):
+    now = timezone.now()
+    statuses = [value for value, _ in WorkReport.STATUS_CHOICES]
+    rows = (
+        WorkReport(
+            user_id=random.choice(user_ids),
+            task_name=f"{random.choice(TASKS)} {i}",
+            description=" ".join(random.choices(WORDS, k=12)),
+            hours_worked=round(random.uniform(1, 8), 2),
+            status=random.choice(statuses),
+            created_at=_random_moment(now, days),
+        )
+        for i in range(count)
+    )
+    with explicit_timestamps(WorkReport):
+        for batch in _batched(rows):
+            WorkReport.objects.bulk_create(batch)
+
+
+def seed_material_requests(user_ids, count, days=365, names=None):
+    now = timezone.now()
+    statuses = [value for value, _ in MaterialRequest.STATUS_CHOICES]
+    items = names or ["LED bulb 9W", "2.5 sqmm wire", "MCB 32A", "PVC conduit", "Junction box"]
+    rows = (
+        MaterialRequest(
+            user_id=random.choice(user_ids),
+            item_name=random.choice(items),
+            quantity=random.randint(1, 100),
+            unit="NOS",
+            status=random.choice(statuses),
+            created_at=_random_moment(now, days),
+        )
+        for _ in range(count)
+    )
+    with explicit_timestamps(MaterialRequest):
+        for batch in _batched(rows):
+            MaterialRequest.objects.bulk_create(batch)
+
+
+BRANDS = [
+    "Havells", "Legrand", "Schneider", "Polycab", "Finolex", "Anchor",
+    "Siemens", "ABB", "Philips", "Syska", "Wipro", "Crompton",
+]
+MATERIALS = [
+    "LED bulb", "LED tube light", "MCB", "RCCB", "PVC conduit", "Copper wire",
+    "Armoured cable", "Junction box", "Cable gland", "Cable lug", "Switch",
+    "Socket", "DB box", "Isolator", "Contactor", "Ceiling fan", "Earthing rod",
+    "Busbar", "Flood light", "Cable tray",
+]
+SPECS = [
+    "6W", "9W", "12W", "15W", "20W", "16A", "25A", "32A", "40A", "63A",
+    "1.5 sqmm", "2.5 sqmm", "4 sqmm", "6 sqmm", "10 sqmm", "20mm", "25mm", "32mm",
+]
+POLES = ["SP", "DP", "TP", "FP"]
+
+
+def seed_catalog(count):
+    """`count` catalog items named like "Havells MCB 32A DP"; returns their names."""
+    names = [
+        f"{brand} {material} {spec} {pole}"
+        for brand in BRANDS for material in MATERIALS for spec in SPECS for pole in POLES
+    ]
+    names = random.sample(names, min(count, len(names)))
+    for batch in _batched(
+        Item(name=name, unit="NOS", normalized_name=normalize_item_name(name)) for name in names
+    ):
+        Item.objects.bulk_create(batch)
+    return names
+
+
+def misspell(name):
+    """A way someone might type `name` in a request form."""
+    words = name.split()
+    change = random.choice(["lower", "shuffle", "plural", "typo", "typo"])
+    if change == "shuffle":
+        random.shuffle(words)
+    elif change == "plural":
+        words = [word + "s" if word.isalpha() and len(word) > 3 else word for word in words]
+    elif change == "typo":
+        i = random.randrange(len(words))
+        word = words[i]
+        if len(word) > 3:
+            j = random.randrange(len(word) - 1)
+            words[i] = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+    return " ".join(words).lower()
+
+
+def time_call(func, repeat=20):
+    """Run `func` `repeat` times and return the median wall time in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_concurrently(workers, target):
+    """
+    Run target(worker_index) in `workers` threads and wait for them all.
+    Each thread closes its own DB connections when done.
+    """
+    def wrapper(index):
+        try:
+            target(index)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=wrapper, args=(i,)) for i in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def logged_in_client(user):
+    client = Client()
+    client.force_login(user)
+    return client
@@ -0,0 +1,236 @@
+"""
+Item catalog lookups: the material-name typeahead on the request form, and
+the matching that links free-text MaterialRequest lines to an Item.
+
+Both run against an in-process index of every Item name and ItemAlias,
+built on first use and kept per worker process. Saving or deleting an Item
+or ItemAlias bumps a generation number in the cache (signals.py); each
+lookup compares it with the generation the index was built at and rebuilds
+when they differ, so every worker sees catalog changes on its next lookup.
+
+Names are compared in normalize_item_name() form. The index maps each word
+prefix (up to PREFIX_CHARS characters) to the entries with a word starting
+with it, which answers "led bu"-style queries with a few set
+intersections. A typed word that starts no catalog word is first replaced
+by the most similar word of the catalog's (small) vocabulary by trigrams,
+so typos cost a lookup over words rather than over every entry. Linking
+free text (`match()`) compares whole names by trigrams instead.
+"""
+from collections import Counter, defaultdict
+import heapq
+from itertools import chain
+import threading
+import time
+
+from django.core.cache import cache
+
+from .models import Item, ItemAlias, normalize_item_name
+
+GENERATION_KEY = "catalog:generation"
+PREFIX_CHARS = 12
+MIN_SIMILARITY = 0.3        # trigram similarity to correct a typed word
+LINK_SIMILARITY = 0.6       # ... and for linking a free-text line to an item
+LINK_MARGIN = 0.1           # how far the best item must lead the runner-up
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = int(time.time())
+        cache.add(GENERATION_KEY, generation, None)
+        generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_catalog():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        _generation()
+
+
+def _trigrams(words):
+    return {
+        padded[i:i + 3]
+        for word in words
+        for padded in [f" {word} "]
+        for i in range(len(padded) - 2)
+    }
+
+
+class CatalogIndex:
+    """Word, prefix and trigram maps over the catalog's names and aliases."""
+
+    def __init__(self, items, aliases):
+        self.items = {}         # item id: (name, unit)
+        self.entries = []       # (item id, normalized name, words)
+        self.exact = {}         # normalized name: entry
+        self.words = defaultdict(set)
+        self.prefixes = defaultdict(set)
+        self.trigrams = defaultdict(set)
+        self.sizes = []         # trigrams per entry
+        self.word_trigrams = defaultdict(set)
+
+        for item_id, name, unit, normalized in items:
+            self.items[item_id] = (name, unit)
+            self._add(item_id, normalized)
+        for item_id, normalized in aliases:
+            if item_id in self.items:
+                self._add(item_id, normalized)
+        for word in self.words:
+            for gram in _trigrams([word]):
+                self.word_trigrams[gram].add(word)
+
+        # Suggestion order, fixed at build time: fewest words, then name.
+        self.rank = [0] * len(self.entries)
+        order = sorted(
+            range(len(self.entries)),
+            key=lambda entry: (len(self.entries[entry][2]), self.items[self.entries[entry][0]][0]),
+        )
+        for position, entry in enumerate(order):
+            self.rank[entry] = position
+
+    def _add(self, item_id, normalized):
+        if not normalized or normalized in self.exact:
+            return
+        entry = len(self.entries)
+        words = normalized.split()
+        self.entries.append((item_id, normalized, frozenset(words)))
+        self.exact[normalized] = entry
+        for word in words:
+            self.words[word].add(entry)
+            for end in range(1, min(len(word), PREFIX_CHARS) + 1):
+                self.prefixes[word[:end]].add(entry)
+        grams = _trigrams(words)
+        for gram in grams:
+            self.trigrams[gram].add(entry)
+        self.sizes.append(len(grams))
+
+    # --------------------------------------------
+    def prefix_matches(self, words):
+        """Entries with a word starting with each of `words`."""
+        postings = sorted((self.prefixes.get(word[:PREFIX_CHARS], ()) for word in words), key=len)
+        if not postings or not postings[0]:
+            return set()
+        found = set(postings[0]).intersection(*postings[1:])
+        long_words = [word for word in words if len(word) > PREFIX_CHARS]
+        if long_words:
+            found = {
+                entry for entry in found
+                if all(any(w.startswith(word) for w in self.entries[entry][2]) for word in long_words)
+            }
+        return found
+
+    def correct(self, word):
+        """`word` if it starts a catalog word, else the most similar catalog word (None if none is)."""
+        if word[:PREFIX_CHARS] in self.prefixes:
+            return word
+        grams = _trigrams([word])
+        shared = Counter(chain.from_iterable(self.word_trigrams.get(gram, ()) for gram in grams))
+        # A padded n-letter word has n trigrams.
+        best = max(
+            ((count / (len(grams) + len(candidate) - count), candidate) for candidate, count in shared.items()),
+            default=(0, None),
+        )
+        return best[1] if best[0] >= MIN_SIMILARITY else None
+
+    def similar(self, words, threshold):
+        """[(similarity, entry), ...] for entries sharing enough trigrams with `words`."""
+        grams = _trigrams(words)
+        if not grams:
+            return []
+        shared = Counter(chain.from_iterable(self.trigrams.get(gram, ()) for gram in grams))
+        scored = []
+        for entry, count in shared.items():
+            similarity = count / (len(grams) + self.sizes[entry] - count)
+            if similarity >= threshold:
+                scored.append((similarity, entry))
+        return scored
+
+    def _result(self, item_id):
+        name, unit = self.items[item_id]
+        return {"id": item_id, "name": name, "unit": unit}
+
+    def suggest(self, query, limit=8):
+        """Up to `limit` items for a partly typed name, best first."""
+        normalized = normalize_item_name(query)
+        if not normalized:
+            return []
+        words = normalized.split()
+
+        found = self.prefix_matches(words)
+        if not found:
+            words = [word for word in map(self.correct, words) if word]
+            found = self.prefix_matches(words)
+        ranked = heapq.nsmallest(limit * 2, found, key=self.rank.__getitem__)
+        if self.exact.get(normalized) in found:
+            ranked.insert(0, self.exact[normalized])
+
+        results, seen = [], set()
+        for entry in ranked:
+            item_id = self.entries[entry][0]
+            if item_id not in seen:
+                seen.add(item_id)
+                results.append(self._result(item_id))
+                if len(results) == limit:
+                    break
+        return results
+
+    def match(self, name):
+        """
+        (item id, how) for a free-text material name, `how` being "exact" or
+        "fuzzy"; (None, "ambiguous") or (None, "unmatched") when there is no
+        safe link.
+        """
+        normalized = normalize_item_name(name)
+        if not normalized:
+            return None, "unmatched"
+        if normalized in self.exact:
+            return self.entries[self.exact[normalized]][0], "exact"
+
+        words = normalized.split()
+        postings = sorted((self.words.get(word, ()) for word in words), key=len)
+        # Every word is in a longer item name ("cable" in "cable 2.5mm
+        # copper"; the same words would have matched exactly). The extra
+        # words may be what tells that item from the next one, so don't guess.
+        if set(postings[0]).intersection(*postings[1:]):
+            return None, "ambiguous"
+
+        best = {}
+        for similarity, entry in self.similar(words, LINK_SIMILARITY - LINK_MARGIN):
+            item_id = self.entries[entry][0]
+            best[item_id] = max(similarity, best.get(item_id, 0))
+        top = heapq.nlargest(2, best.items(), key=lambda pair: pair[1])
+        if not top or top[0][1] < LINK_SIMILARITY:
+            return None, "unmatched"
+        if len(top) > 1 and top[0][1] - top[1][1] < LINK_MARGIN:
+            return None, "ambiguous"
+        return top[0][0], "fuzzy"
+
+
+_index = None
+_index_generation = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """This process's CatalogIndex, rebuilt when the catalog has changed."""
+    global _index, _index_generation
+    generation = _generation()
+    if _index is None or _index_generation != generation:
+        with _lock:
+            if _index is None or _index_generation != generation:
+                _index = CatalogIndex(
+                    Item.objects.values_list("id", "name", "unit", "normalized_name").iterator(),
+                    ItemAlias.objects.values_list("item_id", "normalized_name").iterator(),
+                )
+                _index_generation = generation
+    return _index
+
+
+def suggest(query, limit=8):
+    return get_index().suggest(query, limit)
+
+
+def match(name):
+    return get_index().match(name)
@@ -0,0 +1,273 @@
+"""
+Streaming spreadsheet exports.
+
+Rows are read with values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE) and
+written out as they arrive, so memory use does not grow with the export size.
+CSV is streamed straight to the client. XLSX is streamed too: _XlsxWriter
+writes the workbook's zip archive part by part, the sheet as rows come in
+(inline strings, no shared-string table), and hands over each compressed
+block, so the first bytes go out at once and no worker builds a file first.
+
+Under ASGI Django reads a synchronous streaming body into a list before
+sending any of it, so with asynchronous=True the body is an async iterator
+instead (rows fetched a chunk at a time in a worker thread).
+
+Text that starts like a formula (=, +, -, @) is prefixed with a quote so a
+spreadsheet shows it rather than evaluating it.
+"""
+import csv
+import math
+import re
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape, quoteattr
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000
+XLSX_BLOCK_SIZE = 64 * 1024   # compressed bytes collected before a block is sent
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# (header, values_list lookup) pairs per export.
+ATTENDANCE_EXPORT = [
+    ("ID", "id"),
+    ("User", "user__username"),
+    ("Site", "user__site_location"),
+    ("Shift Date", "shift_date"),
+    ("Clock In", "clock_in"),
+    ("Clock Out", "clock_out"),
+    ("Total Hours", "total_hours"),
+    ("Type", "attendance_type"),
+    ("Status", "status"),
+    ("Latitude", "latitude"),
+    ("Longitude", "longitude"),
+    ("Clock-out Latitude", "clock_out_latitude"),
+    ("Clock-out Longitude", "clock_out_longitude"),
+]
+
+WORK_REPORT_EXPORT = [
+    ("ID", "id"),
+    ("Date", "created_at"),
+    ("User", "user__username"),
+    ("Site", "user__site_location"),
+    ("Task", "task_name"),
+    ("Description", "description"),
+    ("Hours Worked", "hours_worked"),
+    ("Status", "status"),
+]
+
+MATERIAL_REQUEST_EXPORT = [
+    ("ID", "id"),
+    ("Date", "created_at"),
+    ("Indent", "indent_id"),
+    ("User", "user__username"),
+    ("Site", "user__site_location"),
+    ("Item", "item_name"),
+    ("Quantity", "quantity"),
+    ("Unit", "unit"),
+    ("Remark", "description"),
+    ("Status", "status"),
+]
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    """Aware datetimes in local time; formula-like text defused; the rest as is."""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _values(queryset, columns):
+    return queryset.order_by("id").values_list(*[lookup for _, lookup in columns])
+
+
+def _rows(queryset, columns):
+    for row in _values(queryset, columns).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [_cell(value) for value in row]
+
+
+async def _arows(queryset, columns):
+    # Keyset chunks on id, each fetched in a worker thread (values_list()
+    # .aiterator() runs its query on the event loop thread).
+    values = queryset.order_by("id").values_list("id", *[lookup for _, lookup in columns])
+    fetch = sync_to_async(lambda after: list(values.filter(id__gt=after)[:EXPORT_CHUNK_SIZE]))
+    after = 0
+    while chunk := await fetch(after):
+        for row in chunk:
+            yield [_cell(value) for value in row[1:]]
+        after = chunk[-1][0]
+
+
+# ============================================
+# XLSX WRITER
+# ============================================
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name={title} sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_END = "</sheetData></worksheet>"
+# Control characters XML 1.0 can't carry.
+XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+SHEET_TITLE_ILLEGAL = re.compile(r"[\\/*?:\[\]]")
+
+
+class _Blocks:
+    """Write-only, unseekable file: zipfile writes into it, the response takes what is there."""
+
+    def __init__(self):
+        self.parts, self.size = [], 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data, self.parts, self.size = b"".join(self.parts), [], 0
+        return data
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)) and math.isfinite(value):
+        return f"<c><v>{value}</v></c>"
+    text = escape(XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+class _XlsxWriter:
+    """One-sheet workbook written as a zip stream; append() and close() return the bytes ready to send."""
+
+    def __init__(self, title, header):
+        self.output = _Blocks()
+        self.archive = zipfile.ZipFile(self.output, "w", zipfile.ZIP_DEFLATED)
+        title = SHEET_TITLE_ILLEGAL.sub("_", title) or "Sheet1"
+        for name, xml in XLSX_PARTS.items():
+            self.archive.writestr(name, xml.replace("{title}", quoteattr(title)))
+        self.sheet = self.archive.open("xl/worksheets/sheet1.xml", "w")
+        self.sheet.write(SHEET_START.encode())
+        self.rows = 0
+        self.append(header)
+
+    def append(self, values):
+        self.rows += 1
+        self.sheet.write(
+            f'<row r="{self.rows}">{"".join(_xlsx_cell(value) for value in values)}</row>'.encode()
+        )
+        if self.output.size >= XLSX_BLOCK_SIZE:
+            return self.output.take()
+        return b""
+
+    def close(self):
+        self.sheet.write(SHEET_END.encode())
+        self.sheet.close()
+        self.archive.close()
+        return self.output.take()
+
+
+# ============================================
+# RESPONSES
+# ============================================
+def stream_csv(queryset, columns, filename, asynchronous=False):
+    writer = csv.writer(_Echo())
+    header = [header for header, _ in columns]
+
+    def lines():
+        yield writer.writerow(header)
+        for row in _rows(queryset, columns):
+            yield writer.writerow(row)
+
+    async def alines():
+        yield writer.writerow(header)
+        async for row in _arows(queryset, columns):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(alines() if asynchronous else lines(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def stream_xlsx(queryset, columns, filename, asynchronous=False):
+    header = [header for header, _ in columns]
+
+    def blocks():
+        writer = _XlsxWriter(filename[:31], header)
+        for row in _rows(queryset, columns):
+            if block := writer.append(row):
+                yield block
+        yield writer.close()
+
+    async def ablocks():
+        writer = _XlsxWriter(filename[:31], header)
+        async for row in _arows(queryset, columns):
+            if block := writer.append(row):
+                yield block
+        yield writer.close()
+
+    response = StreamingHttpResponse(ablocks() if asynchronous else blocks(), content_type=XLSX_CONTENT_TYPE)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.xlsx"'
+    return response
+
+
+def export_response(queryset, columns, name, fmt=None, asynchronous=False):
+    """
+    CSV by default, XLSX when fmt == "xlsx". Pass asynchronous=True when the
+    request is served over ASGI.
+    """
+    filename = f"{name}_{timezone.localdate():%Y%m%d}"
+    if fmt == "xlsx":
+        return stream_xlsx(queryset, columns, filename, asynchronous)
+    return stream_csv(queryset, columns, filename, asynchronous)
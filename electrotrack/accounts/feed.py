@@ -0,0 +1,229 @@
+"""
+Change feed behind the live approval pages (attendance_manage and
+material_requests, streamed by views.live_feed).
+
+Code that creates or changes attendance / material request rows calls
+`publish(model, ids)`; the batch is passed on when the transaction commits.
+Each process has one Hub that fans batches out to its open streams. How a
+batch reaches the hubs depends on settings.LIVE_FEED_BACKEND:
+
+  "database"  publish() inserts a ChangeNotification row, but only while
+              some process has a live page open (a key in the shared
+              cache, kept fresh by the pollers; with no listeners a save
+              writes nothing extra). While a process has open streams, one
+              poller thread reads the rows past its cursor every
+              LIVE_FEED_POLL_SECONDS: a primary-key range scan that is
+              empty most of the time, however many pages are open. Ids can
+              commit out of order, so the poller stops at a missing id
+              until it appears or is GAP_SECONDS old (rolled back). Rows
+              older than RETENTION are pruned.
+  "local"     publish() hands the batch straight to this process's hub; no
+              table and no polling, but only pages served by the process
+              that made the change hear about it.
+
+Streams don't query anything while they wait. When a batch names rows of
+their kind they load just those rows.
+"""
+import asyncio
+from collections import deque
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ChangeNotification
+
+logger = logging.getLogger(__name__)
+
+RECENT_BATCHES = 1_000      # kept per process to replay to reconnecting streams
+POLL_LIMIT = 500            # notifications read per poll query
+RETENTION = timedelta(minutes=10)
+PRUNE_INTERVAL = 60         # seconds between prunes, per poller
+HEARTBEAT_SECONDS = 20
+LISTENER_KEY = "live-feed:listening"
+LISTENER_TTL = 60           # seconds a page render or poll keeps publishing on
+GAP_SECONDS = 5             # how long a missing id can be an uncommitted insert
+
+
+class Stale(Exception):
+    """The stream asked for batches this process no longer has."""
+
+
+class Hub:
+    """Per-process fan-out of change batches to waiting streams, from any thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.recent = deque()       # (seq, changes), oldest first
+        self.cursor = 0             # seq of the newest batch seen
+        self.floor = 0              # batches at or below this are gone
+        self.waiters = set()        # (event loop, asyncio.Event) per stream
+        self.watched = threading.Event()
+
+    def reset(self, cursor):
+        with self.lock:
+            if not self.recent:
+                self.cursor = self.floor = max(self.cursor, cursor)
+
+    def broadcast(self, changes, seq=None):
+        with self.lock:
+            seq = self.cursor + 1 if seq is None else seq
+            if seq <= self.cursor:
+                return
+            if len(self.recent) == RECENT_BATCHES:
+                self.floor = self.recent.popleft()[0]
+            self.recent.append((seq, changes))
+            self.cursor = seq
+            waiters = list(self.waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # that stream's loop has closed
+                pass
+
+    def since(self, after):
+        """[(seq, changes), ...] newer than `after`; raises Stale if some were dropped."""
+        with self.lock:
+            if after < self.floor:
+                raise Stale
+            return [batch for batch in self.recent if batch[0] > after]
+
+    async def changes(self, after):
+        """
+        Async iterator of batch lists newer than `after`, or None every
+        HEARTBEAT_SECONDS without any. Raises Stale (see since()).
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            self.waiters.add(waiter)
+            self.watched.set()
+        try:
+            while True:
+                waiter[1].clear()
+                batches = self.since(after)
+                if batches:
+                    after = batches[-1][0]
+                    yield batches
+                    continue
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self.lock:
+                self.waiters.discard(waiter)
+                if not self.waiters:
+                    self.watched.clear()
+
+
+hub = Hub()
+
+
+# ============================================
+# BACKENDS
+# ============================================
+class LocalBackend:
+    def publish(self, changes):
+        hub.broadcast(changes)
+
+    def cursor(self):
+        return hub.cursor
+
+    def start(self, after):
+        pass
+
+
+class DatabaseBackend:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def publish(self, changes):
+        if cache.get(LISTENER_KEY):
+            ChangeNotification.objects.create(changes=changes)
+
+    def cursor(self):
+        # Set before reading the cursor, so nothing published after it is skipped.
+        cache.set(LISTENER_KEY, True, LISTENER_TTL)
+        return ChangeNotification.objects.aggregate(last=Max("id"))["last"] or 0
+
+    def start(self, after):
+        """Start this process's poller (once), reading from `after` on."""
+        with self.lock:
+            if self.thread is None:
+                hub.reset(after)
+                self.thread = threading.Thread(target=self._poll, name="live-feed-poller", daemon=True)
+                self.thread.start()
+
+    def _poll(self):
+        pruned = time.monotonic()
+        listening = pruned - LISTENER_TTL  # when this poller last marked the feed listened to
+        while True:
+            if not hub.watched.is_set():
+                hub.watched.wait()
+                listening = time.monotonic() - LISTENER_TTL
+            if time.monotonic() - listening > LISTENER_TTL / 3:
+                cache.set(LISTENER_KEY, True, LISTENER_TTL)
+                listening = time.monotonic()
+            try:
+                rows = list(
+                    ChangeNotification.objects.filter(id__gt=hub.cursor)
+                    .order_by("id")
+                    .values_list("id", "changes", "created_at")[:POLL_LIMIT]
+                )
+                settled = timezone.now() - timedelta(seconds=GAP_SECONDS)
+                for seq, changes, created_at in rows:
+                    # A lower id may still be committing; wait for it unless
+                    # this row is old enough that it must have rolled back.
+                    if seq != hub.cursor + 1 and created_at > settled:
+                        rows = []
+                        break
+                    hub.broadcast(changes, seq)
+                if time.monotonic() - pruned > PRUNE_INTERVAL:
+                    ChangeNotification.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+                    pruned = time.monotonic()
+            except DatabaseError:
+                logger.exception("Live feed poll failed")
+                rows = []
+            close_old_connections()
+            if len(rows) < POLL_LIMIT:
+                time.sleep(settings.LIVE_FEED_POLL_SECONDS)
+
+
+BACKENDS = {"local": LocalBackend, "database": DatabaseBackend}
+_backend = None
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS[getattr(settings, "LIVE_FEED_BACKEND", "database")]()
+    return _backend
+
+
+# ============================================
+# API
+# ============================================
+def publish(model, ids):
+    """Announce rows of `model` created or changed, once the current transaction commits."""
+    ids = [pk for pk in ids if pk is not None]
+    if ids:
+        changes = {model._meta.label_lower: ids}
+        transaction.on_commit(lambda: backend().publish(changes))
+
+
+def cursor():
+    """Where a page rendered now should start its stream (?after=)."""
+    return backend().cursor()
+
+
+def changes(after):
+    """Batches of changes after `after` for one stream (see Hub.changes)."""
+    backend().start(after)
+    return hub.changes(after)
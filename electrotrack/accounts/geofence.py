@@ -0,0 +1,234 @@
+"""
+Geofence checks for attendance coordinates.
+
+A Site is a centre point with either a radius (metres) or a polygon of
+[latitude, longitude] vertices. Clock-ins store, for the clock-in position
+(Attendance.latitude / longitude; clock-outs keep theirs in
+clock_out_latitude / clock_out_longitude and never touch these):
+
+  * out_of_fence -- True / False against the user's site, None when the user
+    has no site or sent no coordinates,
+  * geohash      -- GEOHASH_PRECISION characters, indexed, so "who is near
+    this site" is a handful of prefix range scans instead of a table scan
+    (see attendance_near).
+
+The *_many functions are NumPy-vectorized versions used by
+`manage.py check_geofences` to re-check historical rows in bulk. NumPy is
+only imported there.
+"""
+import math
+
+from django.db.models import Q
+
+EARTH_RADIUS_M = 6_371_008.8
+METRES_PER_DEGREE = 111_320
+
+GEOHASH_PRECISION = 9  # ~5 m cells
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+# ============================================
+# SINGLE POINTS
+# ============================================
+def clean_location(latitude, longitude):
+    """
+    (latitude, longitude) as floats, (None, None) when both are blank, or
+    ValueError for anything else: one missing, not a number, NaN, or out of
+    range.
+    """
+    if latitude in (None, "") and longitude in (None, ""):
+        return None, None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("latitude and longitude must both be numbers.")
+    # NaN fails both comparisons.
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude / longitude out of range.")
+    return latitude, longitude
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def point_in_polygon(lat, lng, polygon):
+    """Ray casting; `polygon` is a list of [lat, lng] vertices (not closed)."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lat_i > lat) != (lat_j > lat):
+            crossing = lng_i + (lat - lat_i) * (lng_j - lng_i) / (lat_j - lat_i)
+            if lng < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+def contains(site, lat, lng):
+    """Whether (lat, lng) lies inside the site's polygon, or its radius if it has none."""
+    if site.polygon:
+        return point_in_polygon(lat, lng, site.polygon)
+    return haversine_m(site.latitude, site.longitude, lat, lng) <= site.radius_m
+
+
+def reach_m(site):
+    """Radius of a circle around the centre that covers the whole fence."""
+    if not site.polygon:
+        return site.radius_m
+    return max(haversine_m(site.latitude, site.longitude, lat, lng) for lat, lng in site.polygon)
+
+
+def fence_fields(site, lat, lng):
+    """out_of_fence / geohash values for an Attendance row at (lat, lng)."""
+    if lat is None or lng is None:
+        return {"out_of_fence": None, "geohash": None}
+    return {
+        "out_of_fence": None if site is None else not contains(site, lat, lng),
+        "geohash": encode(lat, lng),
+    }
+
+
+# ============================================
+# GEOHASH INDEX
+# ============================================
+def _cell_bits(precision):
+    bits = 5 * precision
+    return (bits + 1) // 2, bits // 2  # longitude bits, latitude bits
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars, value, bit, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                value, lng_lo = value * 2 + 1, mid
+            else:
+                value, lng_hi = value * 2, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value, lat_lo = value * 2 + 1, mid
+            else:
+                value, lat_hi = value * 2, mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[value])
+            value, bit = 0, 0
+    return "".join(chars)
+
+
+def covering_cells(lat, lng, radius_m):
+    """
+    Geohash prefixes whose cells cover a circle of `radius_m` around
+    (lat, lng): the centre cell and its neighbours, at the finest precision
+    whose cells are at least `radius_m` across.
+    """
+    cos_lat = max(math.cos(math.radians(lat)), 0.01)
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        lng_bits, lat_bits = _cell_bits(candidate)
+        height = 180 / 2 ** lat_bits * METRES_PER_DEGREE
+        width = 360 / 2 ** lng_bits * METRES_PER_DEGREE * cos_lat
+        if height >= radius_m and width >= radius_m:
+            precision = candidate
+            break
+
+    lng_bits, lat_bits = _cell_bits(precision)
+    dlat, dlng = 180 / 2 ** lat_bits, 360 / 2 ** lng_bits
+    cells = {
+        encode(max(-90, min(90, lat + i * dlat)), (lng + j * dlng + 180) % 360 - 180, precision)
+        for i in (-1, 0, 1)
+        for j in (-1, 0, 1)
+    }
+    return sorted(cells)
+
+
+def attendance_near(site, queryset, radius_m=None):
+    """
+    Rows of an Attendance queryset clocked in within `radius_m` of the site
+    centre (default: the fence itself). The geohash prefixes narrow it down
+    in SQL; the exact distance / polygon test runs on the few candidates.
+    """
+    radius = radius_m or reach_m(site)
+    prefixes = Q()
+    for cell in covering_cells(site.latitude, site.longitude, radius):
+        prefixes |= Q(geohash__startswith=cell)
+
+    candidates = queryset.filter(prefixes).exclude(latitude=None).exclude(longitude=None)
+    if radius_m is None:
+        return [row for row in candidates if contains(site, row.latitude, row.longitude)]
+    return [
+        row for row in candidates
+        if haversine_m(site.latitude, site.longitude, row.latitude, row.longitude) <= radius
+    ]
+
+
+# ============================================
+# VECTORIZED (NumPy)
+# ============================================
+def haversine_many(lats, lngs, lat, lng):
+    import numpy as np
+
+    phi1, phi2 = np.radians(lats), math.radians(lat)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng) - np.radians(lngs)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * math.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def point_in_polygon_many(lats, lngs, polygon):
+    """Ray casting over all points at once, one pass per polygon edge."""
+    import numpy as np
+
+    inside = np.zeros(len(lats), dtype=bool)
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if lat_i != lat_j:
+            straddles = (lat_i > lats) != (lat_j > lats)
+            crossing = lng_i + (lats - lat_i) * (lng_j - lng_i) / (lat_j - lat_i)
+            inside ^= straddles & (lngs < crossing)
+        j = i
+    return inside
+
+
+def contains_many(site, lats, lngs):
+    """Boolean array: which of the points fall inside the site's fence."""
+    if site.polygon:
+        return point_in_polygon_many(lats, lngs, site.polygon)
+    return haversine_many(lats, lngs, site.latitude, site.longitude) <= site.radius_m
+
+
+def encode_many(lats, lngs, precision=GEOHASH_PRECISION):
+    """Geohash strings for arrays of points (interleaves quantised coordinates)."""
+    import numpy as np
+
+    lng_bits, lat_bits = _cell_bits(precision)
+    lat_q = np.clip(((np.asarray(lats) + 90) / 180 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+    lng_q = np.clip(((np.asarray(lngs) + 180) / 360 * (1 << lng_bits)).astype(np.int64), 0, (1 << lng_bits) - 1)
+
+    # Geohash bits alternate longitude / latitude, longitude first.
+    code = np.zeros(len(lat_q), dtype=np.int64)
+    for bit in range(5 * precision):
+        index = bit // 2
+        if bit % 2 == 0:
+            value = (lng_q >> (lng_bits - 1 - index)) & 1
+        else:
+            value = (lat_q >> (lat_bits - 1 - index)) & 1
+        code = (code << 1) | value
+
+    alphabet = np.array(list(_BASE32))
+    digits = [alphabet[(code >> (5 * (precision - 1 - k))) & 31] for k in range(precision)]
+    return ["".join(chars) for chars in zip(*digits)]
@@ -0,0 +1,96 @@
+"""
+Background compression and thumbnailing of material request photos.
+
+Uploads are stored as-is on the request thread. Once the transaction commits,
+the photo is handed to a small in-process worker pool which:
+
+  * re-encodes the original as a JPEG no larger than PHOTO_MAX_SIDE px,
+  * renders a THUMBNAIL_SIZE thumbnail,
+  * names both files after a hash of the uploaded bytes, so re-uploads of the
+    same picture share one set of files,
+  * points every MaterialIndent / MaterialRequest row using the upload at the
+    new files and removes the raw upload.
+
+Settings (all optional):
+  MATERIAL_PHOTO_ASYNC    -- False runs the work inline at commit (default True)
+  MATERIAL_PHOTO_WORKERS  -- worker threads (default 2)
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import MaterialIndent, MaterialRequest
+
+logger = logging.getLogger(__name__)
+
+PHOTO_MAX_SIDE = 1600
+THUMBNAIL_SIZE = (160, 160)
+JPEG_QUALITY = 80
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "MATERIAL_PHOTO_WORKERS", 2),
+    thread_name_prefix="material-photo",
+)
+
+
+def _encode_jpeg(image):
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _save_once(name, content):
+    """Write `content` under `name` unless an identical hashed file is already there."""
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def process_photo(name):
+    """Compress the stored upload `name`, thumbnail it and repoint its rows."""
+    with default_storage.open(name, "rb") as upload:
+        raw = upload.read()
+
+    digest = hashlib.sha256(raw).hexdigest()[:20]
+    photo_name = f"material_photos/{digest}.jpg"
+    thumb_name = f"material_photos/thumbs/{digest}.jpg"
+
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(raw))).convert("RGB")
+    image.thumbnail((PHOTO_MAX_SIDE, PHOTO_MAX_SIDE))
+    photo_name = _save_once(photo_name, _encode_jpeg(image))
+    image.thumbnail(THUMBNAIL_SIZE)
+    thumb_name = _save_once(thumb_name, _encode_jpeg(image))
+
+    MaterialIndent.objects.filter(photo=name).update(photo=photo_name, thumbnail=thumb_name)
+    MaterialRequest.objects.filter(photo=name).update(photo=photo_name, thumbnail=thumb_name)
+
+    if photo_name != name:
+        default_storage.delete(name)
+    return photo_name, thumb_name
+
+
+def _run(name):
+    try:
+        process_photo(name)
+    except Exception:
+        logger.exception("Could not process material photo %s", name)
+    finally:
+        # Worker threads hold their own DB connections; don't leak them.
+        connections.close_all()
+
+
+def enqueue_photo(name):
+    """Process the upload `name` off the request thread once the transaction commits."""
+    if not name:
+        return
+    if getattr(settings, "MATERIAL_PHOTO_ASYNC", True):
+        transaction.on_commit(lambda: _executor.submit(_run, name))
+    else:
+        transaction.on_commit(lambda: process_photo(name))
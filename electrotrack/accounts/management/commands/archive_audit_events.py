@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import AuditEvent
+
+FIELDS = [
+    "id", "object_type", "object_id", "action", "actor_id", "actor_username", "changes", "created_at",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move audit events older than a cut-off out of the database into "
+        "gzipped JSON Lines files (one per chunk, named by id range), deleting "
+        "each chunk only after its file is on disk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=365,
+                            help="Archive events older than this many days (default 365).")
+        parser.add_argument("--before", help="YYYY-MM-DD; archive events before this date instead.")
+        parser.add_argument("--chunk-size", type=int, default=50_000,
+                            help="Events per file and per DELETE (default 50,000).")
+        parser.add_argument("--output-dir", default=settings.AUDIT_ARCHIVE_DIR,
+                            help="Where the .jsonl.gz files go (default settings.AUDIT_ARCHIVE_DIR).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Count what would be archived without writing or deleting.")
+
+    def handle(self, *args, **options):
+        if options["before"]:
+            try:
+                day = date.fromisoformat(options["before"])
+            except ValueError:
+                raise CommandError("--before must be YYYY-MM-DD.")
+            cutoff = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        else:
+            cutoff = timezone.now() - timedelta(days=options["days"])
+
+        output_dir = Path(options["output_dir"])
+        if not options["dry_run"]:
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+        events = AuditEvent.objects.filter(created_at__lt=cutoff)
+        started = time.perf_counter()
+        last_id, archived, files = 0, 0, 0
+        while True:
+            chunk = list(
+                events.filter(id__gt=last_id).order_by("id").values(*FIELDS)[: options["chunk_size"]]
+            )
+            if not chunk:
+                break
+            first_id, last_id = chunk[0]["id"], chunk[-1]["id"]
+            archived += len(chunk)
+            if options["dry_run"]:
+                continue
+
+            path = output_dir / f"audit-events-{first_id:012d}-{last_id:012d}.jsonl.gz"
+            partial = path.with_name(path.name + ".partial")
+            with gzip.open(partial, "wt", encoding="utf-8") as archive:
+                for event in chunk:
+                    archive.write(json.dumps(event, cls=DjangoJSONEncoder) + "\n")
+            with open(partial, "rb") as archive:
+                os.fsync(archive.fileno())
+            os.replace(partial, path)
+
+            # Same rows as the chunk: every older event with an id in its range.
+            with transaction.atomic():
+                events.filter(id__gte=first_id, id__lte=last_id).delete()
+            files += 1
+            self.stdout.write(f"  {path.name}: {len(chunk)} events")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would archive' if options['dry_run'] else 'Archived'} {archived} events "
+            f"from before {cutoff:%Y-%m-%d %H:%M} into {files} file(s) in {elapsed:.1f}s."
+        ))
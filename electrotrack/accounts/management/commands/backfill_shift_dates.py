@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Attendance, Site, shift_date
+
+UPDATE_BATCH = 5_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill Attendance.shift_date (local clock-in date at the user's site) "
+        "a chunk of rows at a time. Run rebuild_attendance_summary afterwards "
+        "so the daily summaries are grouped by the same dates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=50_000,
+                            help="Rows loaded and updated per transaction (default 50,000).")
+        parser.add_argument("--all", action="store_true",
+                            help="Recompute rows that already have a shift date.")
+        parser.add_argument("--site", type=int,
+                            help="Only rows of this site's users, e.g. after changing its time zone.")
+
+    def handle(self, *args, **options):
+        sites = {site.pk: site for site in Site.objects.all()}
+        rows = Attendance.objects.filter(clock_in__isnull=False)
+        if not options["all"]:
+            rows = rows.filter(shift_date__isnull=True)
+        if options["site"]:
+            rows = rows.filter(user__site_id=options["site"])
+
+        started = time.perf_counter()
+        last_id, filled = 0, 0
+        while True:
+            chunk = list(
+                rows.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "clock_in", "user__site_id")[: options["chunk_size"]]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                Attendance.objects.bulk_update(
+                    [
+                        Attendance(id=pk, shift_date=shift_date(sites.get(site_id), clock_in))
+                        for pk, clock_in, site_id in chunk
+                    ],
+                    ["shift_date"],
+                    batch_size=UPDATE_BATCH,
+                )
+            last_id = chunk[-1][0]
+            filled += len(chunk)
+            self.stdout.write(f"  up to id {last_id}: {filled} filled")
+
+        elapsed = time.perf_counter() - started
+        rate = filled / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Filled {filled} shift dates in {elapsed:.1f}s ({rate:,.0f} rows/s)."
+        ))
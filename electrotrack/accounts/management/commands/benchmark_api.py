@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient
+from django.urls import reverse
+
+from accounts.api import issue_token
+from accounts.benchmarks import (
+    logged_in_client,
+    percentile,
+    run_concurrently,
+    scratch_database,
+    seed_users,
+    test_environment,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the async JSON clock-in/out API (ASGI handler, one event loop) "
+        "with the WSGI attendance_view (one thread per client) at the same "
+        "concurrency: requests/sec, latency percentiles, errors and peak "
+        "Python memory (tracemalloc, measured in a separate pass)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=100,
+                            help="Simultaneous clients (threads for WSGI, tasks for ASGI).")
+        parser.add_argument("--rounds", type=int, default=5,
+                            help="Clock-in + clock-out cycles per client.")
+        parser.add_argument("--skip-memory", action="store_true",
+                            help="Skip the tracemalloc pass.")
+
+    def handle(self, *args, **options):
+        concurrency, rounds = options["concurrency"], options["rounds"]
+        runs = [("wsgi attendance_view", self._run_wsgi), ("asgi api", self._run_asgi)]
+
+        request_logger = logging.getLogger("django.request")
+        old_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            for label, run in runs:
+                result = self._measure(run, concurrency, rounds, trace=False)
+                if not options["skip_memory"]:
+                    result["peak_mb"] = self._measure(run, concurrency, rounds, trace=True)["peak_mb"]
+                self._report(label, result, concurrency, rounds)
+        finally:
+            request_logger.setLevel(old_level)
+
+    def _measure(self, run, concurrency, rounds, trace):
+        with scratch_database(file_backed=True), test_environment():
+            users = list(User.objects.filter(id__in=seed_users(concurrency)).order_by("id"))
+            if trace:
+                tracemalloc.start()
+            try:
+                result = run(users, rounds)
+                if trace:
+                    result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            finally:
+                if trace:
+                    tracemalloc.stop()
+        return result
+
+    def _run_wsgi(self, users, rounds):
+        url = reverse("accounts:attendance")
+        clients = [logged_in_client(user) for user in users]
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def worker(index):
+            for _ in range(rounds):
+                for action in ("clock_in", "clock_out"):
+                    start = time.perf_counter()
+                    try:
+                        ok = clients[index].post(url, {"action": action}).status_code == 302
+                    except Exception:
+                        ok = False
+                    with lock:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                        if not ok:
+                            errors.append(action)
+
+        elapsed = run_concurrently(len(users), worker)
+        return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+    def _run_asgi(self, users, rounds):
+        urls = {"clock_in": reverse("accounts:api_clock_in"), "clock_out": reverse("accounts:api_clock_out")}
+        expected = {"clock_in": 201, "clock_out": 200}
+        keys = [issue_token(user, "benchmark") for user in users]
+        body = json.dumps({"latitude": 12.97, "longitude": 80.22})
+        latencies, errors = [], []
+
+        async def client_task(key):
+            client = AsyncClient()
+            for round_ in range(rounds):
+                for action in ("clock_in", "clock_out"):
+                    start = time.perf_counter()
+                    try:
+                        response = await client.post(
+                            urls[action], body, content_type="application/json",
+                            headers={
+                                "Authorization": f"Token {key}",
+                                "Idempotency-Key": f"{action}-{round_}",
+                            },
+                        )
+                        ok = response.status_code == expected[action]
+                    except Exception:
+                        ok = False
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if not ok:
+                        errors.append(action)
+
+        async def main():
+            start = time.perf_counter()
+            await asyncio.gather(*(client_task(key) for key in keys))
+            elapsed = time.perf_counter() - start
+            # The async ORM runs queries on a shared worker thread; close its connection.
+            await sync_to_async(connections.close_all)()
+            return elapsed
+
+        elapsed = asyncio.run(main())
+        return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+    def _report(self, label, result, concurrency, rounds):
+        latencies, errors = result["latencies"], result["errors"]
+        total = len(latencies)
+        self.stdout.write(f"{label}")
+        self.stdout.write(f"  requests:    {total} ({concurrency} clients x {rounds} rounds x 2)")
+        self.stdout.write(f"  throughput:  {total / result['elapsed']:.1f} req/s")
+        self.stdout.write(f"  errors:      {len(errors)} ({100 * len(errors) / max(total, 1):.2f}%)")
+        for pct in (50, 95, 99):
+            self.stdout.write(f"  p{pct}:         {percentile(latencies, pct):.1f} ms")
+        if "peak_mb" in result:
+            self.stdout.write(f"  peak memory: {result['peak_mb']:.1f} MB (tracemalloc)")
+        self.stdout.write("")
@@ -0,0 +1,84 @@
+import io
+import random
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from accounts.benchmarks import (
+    logged_in_client,
+    misspell,
+    percentile,
+    scratch_database,
+    seed_catalog,
+    seed_material_requests,
+    seed_users,
+    test_environment,
+)
+from accounts.catalog import get_index, invalidate_catalog, suggest
+from accounts.models import MaterialRequest
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database with a catalog of items and free-text material "
+        "requests, then time typeahead suggestions (p50 / p95 ms), the JSON "
+        "endpoint, an index rebuild, and link_material_items."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=15_000)
+        parser.add_argument("--requests", type=int, default=200_000)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def _latency(self, label, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f"{label:<24}{percentile(samples, 50):>10.3f}{percentile(samples, 95):>10.3f}"
+        )
+
+    def handle(self, *args, **options):
+        with scratch_database(), test_environment():
+            names = seed_catalog(options["items"])
+            user_ids = seed_users(50)
+            typed = [misspell(name) for name in random.sample(names, min(2_000, len(names)))]
+            seed_material_requests(user_ids, options["requests"], names=typed)
+            self.stdout.write(
+                f"Seeded {len(names):,} items and {options['requests']:,} requests "
+                f"({len(set(typed)):,} distinct spellings)."
+            )
+
+            started = time.perf_counter()
+            invalidate_catalog()
+            get_index()
+            self.stdout.write(f"Index build: {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+            cases = [
+                ("one letter", "m"),
+                ("one word", "led"),
+                ("two words, partial", "led bu"),
+                ("full name", names[0].lower()),
+                ("typo", misspell(names[1])),
+                ("run-together", "ledbulb 9w"),
+                ("no match", "xylophone"),
+            ]
+            self.stdout.write(f"\n{'suggest':<24}{'p50 ms':>10}{'p95 ms':>10}")
+            for label, text in cases:
+                self._latency(label, lambda: suggest(text), options["repeat"])
+
+            client = logged_in_client(MaterialRequest.objects.first().user)
+            url = reverse("accounts:material_item_suggest")
+            self._latency("endpoint (led bu)", lambda: client.get(url, {"q": "led bu"}), options["repeat"])
+
+            started = time.perf_counter()
+            out = io.StringIO()
+            call_command("link_material_items", stdout=out)
+            summary = next(line for line in out.getvalue().splitlines() if line.startswith("Linked"))
+            self.stdout.write(f"\nlink_material_items ({time.perf_counter() - started:.1f}s): {summary}")
+            linked = MaterialRequest.objects.filter(item__isnull=False).count()
+            self.stdout.write(f"{linked:,} of {options['requests']:,} requests linked.")
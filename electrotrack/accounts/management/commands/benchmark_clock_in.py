@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.urls import reverse
+
+from accounts.benchmarks import (
+    logged_in_client,
+    percentile,
+    run_concurrently,
+    scratch_database,
+    seed_users,
+    test_environment,
+)
+
+User = get_user_model()
+
+
+@contextmanager
+def sqlite_mode(high_concurrency):
+    """Temporarily switch SQLite between stock and SQLITE_HIGH_CONCURRENCY mode."""
+    old_flag = getattr(settings, "SQLITE_HIGH_CONCURRENCY", False)
+    old_options = connection.settings_dict.get("OPTIONS", {})
+    settings.SQLITE_HIGH_CONCURRENCY = high_concurrency
+    connection.settings_dict["OPTIONS"] = (
+        {
+            "transaction_mode": "IMMEDIATE",
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+        if high_concurrency else {}
+    )
+    connection.close()
+    try:
+        yield
+    finally:
+        settings.SQLITE_HIGH_CONCURRENCY = old_flag
+        connection.settings_dict["OPTIONS"] = old_options
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive concurrent clock-in / clock-out requests through attendance_view "
+        "against a scratch copy of the configured database and report "
+        "throughput, latency percentiles and the error rate. Run it once per "
+        "settings profile (e.g. default SQLite vs DJANGO_DB_ENGINE=postgres) "
+        "to compare them; on SQLite, --sqlite-mode compare runs the stock "
+        "rollback-journal mode and the WAL high-concurrency mode back to back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=20,
+                            help="Concurrent electricians (threads).")
+        parser.add_argument("--rounds", type=int, default=25,
+                            help="Clock-in + clock-out cycles per worker.")
+        parser.add_argument("--sqlite-mode", default="settings",
+                            choices=["settings", "default", "high-concurrency", "compare"],
+                            help="SQLite only: which connection mode(s) to load test.")
+
+    def handle(self, *args, **options):
+        workers, rounds = options["workers"], options["rounds"]
+        mode = options["sqlite_mode"]
+
+        if connection.vendor != "sqlite" or mode == "settings":
+            self._report(self._run(workers, rounds), workers, rounds)
+            return
+
+        modes = ["default", "high-concurrency"] if mode == "compare" else [mode]
+        for name in modes:
+            with sqlite_mode(high_concurrency=(name == "high-concurrency")):
+                self._report(self._run(workers, rounds), workers, rounds)
+            self.stdout.write("")
+
+    def _run(self, workers, rounds):
+        url = reverse("accounts:attendance")
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        with scratch_database(file_backed=True), test_environment():
+            user_ids = seed_users(workers)
+            users = list(User.objects.filter(id__in=user_ids).order_by("id"))
+            clients = [logged_in_client(user) for user in users]
+            profile = self._profile()
+
+            def worker(index):
+                client = clients[index]
+                for _ in range(rounds):
+                    for action in ("clock_in", "clock_out"):
+                        ok, elapsed = self._post(client, url, action)
+                        with lock:
+                            latencies.append(elapsed)
+                            if not ok:
+                                errors.append(action)
+
+            # Failed requests are counted below; don't also dump their tracebacks.
+            request_logger = logging.getLogger("django.request")
+            old_level = request_logger.level
+            request_logger.setLevel(logging.CRITICAL)
+            try:
+                elapsed = run_concurrently(workers, worker)
+            finally:
+                request_logger.setLevel(old_level)
+
+        return {"profile": profile, "latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+    def _report(self, result, workers, rounds):
+        latencies, errors = result["latencies"], result["errors"]
+        total = len(latencies)
+        self.stdout.write(f"profile:     {result['profile']}")
+        self.stdout.write(f"requests:    {total} ({workers} workers x {rounds} rounds x 2)")
+        self.stdout.write(f"throughput:  {total / result['elapsed']:.1f} req/s")
+        self.stdout.write(f"errors:      {len(errors)} ({100 * len(errors) / max(total, 1):.2f}%)")
+        for pct in (50, 95, 99):
+            self.stdout.write(f"p{pct}:         {percentile(latencies, pct):.1f} ms")
+
+    def _profile(self):
+        settings_dict = connection.settings_dict
+        options = settings_dict.get("OPTIONS", {})
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                journal = cursor.fetchone()[0]
+            return f"sqlite journal_mode={journal} transaction_mode={options.get('transaction_mode', 'DEFERRED')}"
+        return (
+            f"{connection.vendor} conn_max_age={settings_dict.get('CONN_MAX_AGE')} "
+            f"pool={'pool' in options}"
+        )
+
+    def _post(self, client, url, action):
+        start = time.perf_counter()
+        try:
+            response = client.post(url, {"action": action})
+            ok = response.status_code in (200, 302)
+        except Exception:
+            ok = False
+        return ok, (time.perf_counter() - start) * 1000
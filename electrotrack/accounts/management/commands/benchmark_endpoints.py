@@ -0,0 +1,231 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.benchmarks import (
+    SITES,
+    percentile,
+    run_concurrently,
+    scratch_database,
+    seed_attendance,
+    seed_material_requests,
+    seed_users,
+    seed_work_reports,
+    test_environment,
+)
+from accounts.models import Attendance, MaterialRequest
+
+User = get_user_model()
+
+PASSWORD = "benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database with realistic volumes, drive the accounts URLs "
+        "with concurrent clients and write throughput, p50/p95/p99 latency and "
+        "query counts per endpoint to a JSON file. Pass --baseline with an "
+        "earlier results file to print the change per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--attendance", type=int, default=2_000_000)
+        parser.add_argument("--work-reports", type=int, default=100_000)
+        parser.add_argument("--material-requests", type=int, default=100_000)
+        parser.add_argument("--workers", type=int, default=8,
+                            help="Concurrent clients per endpoint.")
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Requests per endpoint.")
+        parser.add_argument("--only", nargs="*",
+                            help="Run just these endpoint names.")
+        parser.add_argument("--output", default="benchmark_results.json")
+        parser.add_argument("--baseline", help="Earlier results file to compare against.")
+
+    def handle(self, *args, **options):
+        with scratch_database(file_backed=True), test_environment():
+            self.stdout.write("Seeding…")
+            started = time.perf_counter()
+            user_ids = seed_users(options["users"], password=PASSWORD)
+            seed_attendance(user_ids, options["attendance"])
+            seed_work_reports(user_ids, options["work_reports"])
+            seed_material_requests(user_ids, options["material_requests"])
+            admin = User.objects.create_user("bench-admin", password=PASSWORD, role="admin")
+            self.stdout.write(f"  seeded in {time.perf_counter() - started:.0f}s")
+
+            endpoints = self._endpoints(user_ids, options["requests"])
+            if options["only"]:
+                endpoints = [e for e in endpoints if e["name"] in options["only"]]
+
+            results = {}
+            for endpoint in endpoints:
+                results[endpoint["name"]] = self._drive(
+                    endpoint, admin, options["workers"], options["requests"]
+                )
+                self._print_row(endpoint["name"], results[endpoint["name"]])
+
+        report = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "database": connection.vendor,
+            "debug": settings.DEBUG,
+            "volumes": {
+                "users": options["users"],
+                "attendance": options["attendance"],
+                "work_reports": options["work_reports"],
+                "material_requests": options["material_requests"],
+            },
+            "workers": options["workers"],
+            "endpoints": results,
+        }
+        with open(options["output"], "w") as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options["baseline"]:
+            self._compare(options["baseline"], results)
+
+    # ------------------------------------------------------------------
+    # Endpoints
+    # ------------------------------------------------------------------
+    def _endpoints(self, user_ids, count):
+        """
+        Each endpoint: name, role (admin / electrician / anonymous), method,
+        path(i) and data(i). Electrician endpoints log in as a different user
+        per request so clock-in/out never collide on one open shift.
+        """
+        # Users past the first 10% have no open shift from the seed data.
+        free_users = list(
+            User.objects.filter(id__in=user_ids[len(user_ids) // 10:])
+            .order_by("id")[:count]
+        )
+        pending_attendance = list(
+            Attendance.objects.filter(status="pending").values_list("id", flat=True)[: count * 2]
+        )
+        pending_materials = list(
+            MaterialRequest.objects.filter(status="pending").values_list("id", flat=True)[: count * 2]
+        )
+        bulk_ids = pending_attendance[count:]
+
+        def cycle(items, i):
+            return items[i % len(items)] if items else 0
+
+        return [
+            {"name": "login", "role": "anonymous", "method": "post",
+             "path": lambda i: reverse("accounts:login"),
+             "data": lambda i: {"username": cycle(free_users, i).username, "password": PASSWORD}},
+            {"name": "clock_in", "role": "electrician", "users": free_users, "method": "post",
+             "path": lambda i: reverse("accounts:attendance"),
+             "data": lambda i: {"action": "clock_in", "latitude": "12.97", "longitude": "80.22"}},
+            {"name": "clock_out", "role": "electrician", "users": free_users, "method": "post",
+             "path": lambda i: reverse("accounts:attendance"),
+             "data": lambda i: {"action": "clock_out", "latitude": "12.97", "longitude": "80.22"}},
+            {"name": "attendance_manage", "role": "admin", "method": "get",
+             "path": lambda i: reverse("accounts:attendance_manage"), "data": lambda i: {}},
+            {"name": "attendance_manage_filtered", "role": "admin", "method": "get",
+             "path": lambda i: reverse("accounts:attendance_manage"),
+             "data": lambda i: {"site": SITES[i % len(SITES)], "status": "pending"}},
+            {"name": "work_reports", "role": "admin", "method": "get",
+             "path": lambda i: reverse("accounts:work_reports"), "data": lambda i: {}},
+            {"name": "material_requests", "role": "admin", "method": "get",
+             "path": lambda i: reverse("accounts:material_requests"), "data": lambda i: {}},
+            {"name": "dashboard_stats", "role": "admin", "method": "get",
+             "path": lambda i: reverse("accounts:dashboard_stats"), "data": lambda i: {}},
+            {"name": "approve_attendance", "role": "admin", "method": "get",
+             "path": lambda i: reverse("accounts:approve_attendance", args=[cycle(pending_attendance, i)]),
+             "data": lambda i: {}},
+            {"name": "material_approve", "role": "admin", "method": "get",
+             "path": lambda i: reverse("accounts:material_approve", args=[cycle(pending_materials, i)]),
+             "data": lambda i: {}},
+            {"name": "attendance_bulk_status", "role": "admin", "method": "post",
+             "path": lambda i: reverse("accounts:attendance_bulk_status"),
+             "data": lambda i: {"action": "approve", "ids": bulk_ids[i * 50 % max(len(bulk_ids), 1):][:50]}},
+        ]
+
+    # ------------------------------------------------------------------
+    # Driver
+    # ------------------------------------------------------------------
+    def _drive(self, endpoint, admin, workers, count):
+        latencies, queries, errors = [], [], []
+        lock = threading.Lock()
+        next_index = iter(range(count))
+
+        def claim():
+            with lock:
+                return next(next_index, None)
+
+        def worker(_):
+            client = Client()
+            if endpoint["role"] == "admin":
+                client.force_login(admin)
+            while (i := claim()) is not None:
+                if endpoint["role"] == "electrician":
+                    # Session setup is not part of the measured request.
+                    client.force_login(endpoint["users"][i % len(endpoint["users"])])
+                elif endpoint["role"] == "anonymous":
+                    client.logout()
+                send = getattr(client, endpoint["method"])
+                with CaptureQueriesContext(connections["default"]) as captured:
+                    start = time.perf_counter()
+                    try:
+                        status = send(endpoint["path"](i), endpoint["data"](i)).status_code
+                    except Exception:
+                        status = 500
+                    elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(len(captured))
+                    if status >= 400:
+                        errors.append(status)
+
+        request_logger = logging.getLogger("django.request")
+        old_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            elapsed = run_concurrently(workers, worker)
+        finally:
+            request_logger.setLevel(old_level)
+
+        total = len(latencies)
+        return {
+            "requests": total,
+            "errors": len(errors),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "queries_mean": round(sum(queries) / total, 2) if total else 0,
+            "queries_max": max(queries, default=0),
+        }
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+    def _print_row(self, name, result):
+        self.stdout.write(
+            f"{name:<28}{result['throughput_rps']:>9.1f} rps"
+            f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f} ms"
+            f"{result['queries_mean']:>8.1f} q  {result['errors']} err"
+        )
+
+    def _compare(self, path, results):
+        with open(path) as fh:
+            baseline = json.load(fh)["endpoints"]
+        self.stdout.write(f"\nChange vs {path} (p95 latency, mean queries):")
+        for name, result in results.items():
+            old = baseline.get(name)
+            if not old:
+                continue
+            p95 = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0
+            self.stdout.write(
+                f"  {name:<28}{p95:>+8.1f}%  queries {old['queries_mean']} -> {result['queries_mean']}"
+            )
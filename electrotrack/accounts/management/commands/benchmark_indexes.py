@@ -0,0 +1,111 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import UniqueConstraint
+
+from accounts.benchmarks import (
+    scratch_database,
+    seed_users,
+    seed_attendance,
+    seed_work_reports,
+    seed_material_requests,
+    time_call,
+)
+from accounts.models import Attendance, WorkReport, MaterialRequest
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and report query plans and timings for the "
+        "hot attendance / work report / material request queries, with and "
+        "without the Meta.indexes and the index-backed unique constraints "
+        "(attendance_one_open_shift serves the open-shift lookup)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000,
+                            help="Rows to seed per table (default 1,000,000).")
+        parser.add_argument("--users", type=int, default=5_000)
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Runs per query; the median is reported.")
+        parser.add_argument("--plans", action="store_true",
+                            help="Print EXPLAIN output for every query.")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f"Seeding {options['rows']:,} rows per table…")
+            user_ids = seed_users(options["users"])
+            seed_attendance(user_ids, options["rows"])
+            seed_work_reports(user_ids, options["rows"])
+            seed_material_requests(user_ids, options["rows"])
+
+            queries = self._queries(user_ids[0])
+            models = [Attendance, WorkReport, MaterialRequest]
+
+            self._drop_indexes(models)
+            self._analyze()
+            before = self._measure(queries, options)
+            self._create_indexes(models)
+            self._analyze()
+            after = self._measure(queries, options)
+
+        self.stdout.write("")
+        self.stdout.write(f"{'query':<28}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+        for label, _ in queries:
+            speedup = before[label] / after[label] if after[label] else float("inf")
+            self.stdout.write(
+                f"{label:<28}{before[label]:>12.3f}{after[label]:>12.3f}{speedup:>9.1f}x"
+            )
+
+    def _queries(self, user_id):
+        return [
+            ("open shift", lambda: Attendance.objects.filter(
+                user_id=user_id, clock_in__isnull=False, clock_out__isnull=True).order_by("-id")[:1]),
+            ("attendance history", lambda: Attendance.objects.filter(
+                user_id=user_id).order_by("-id")[:50]),
+            ("attendance queue", lambda: Attendance.objects.filter(
+                status="pending").order_by("-id")[:50]),
+            ("work report queue", lambda: WorkReport.objects.filter(
+                status="pending").order_by("-created_at")[:50]),
+            ("work report history", lambda: WorkReport.objects.filter(
+                user_id=user_id).order_by("-created_at")[:50]),
+            ("material queue", lambda: MaterialRequest.objects.filter(
+                status="pending").order_by("-created_at")[:50]),
+            ("material history", lambda: MaterialRequest.objects.filter(
+                user_id=user_id).order_by("-created_at")[:50]),
+        ]
+
+    def _measure(self, queries, options):
+        phase = "with" if self._indexed else "without"
+        self.stdout.write(f"\nTiming {phase} indexes…")
+        results = {}
+        for label, build in queries:
+            if options["plans"]:
+                self.stdout.write(f"-- {label}\n{build().explain()}")
+            results[label] = time_call(lambda: list(build()), options["repeat"])
+        return results
+
+    def _analyze(self):
+        # Refresh planner statistics (same statement on SQLite and PostgreSQL).
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def _unique_constraints(self, model):
+        return [c for c in model._meta.constraints if isinstance(c, UniqueConstraint)]
+
+    def _drop_indexes(self, models):
+        with connection.schema_editor() as editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+                for constraint in self._unique_constraints(model):
+                    editor.remove_constraint(model, constraint)
+        self._indexed = False
+
+    def _create_indexes(self, models):
+        with connection.schema_editor() as editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    editor.add_index(model, index)
+                for constraint in self._unique_constraints(model):
+                    editor.add_constraint(model, constraint)
+        self._indexed = True
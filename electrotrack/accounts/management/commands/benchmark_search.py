@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from accounts.benchmarks import (
+    scratch_database,
+    seed_material_requests,
+    seed_users,
+    seed_work_reports,
+    time_call,
+)
+from accounts.models import MaterialRequest, WorkReport
+from accounts.search import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database with work reports / material requests and "
+        "time full-text searches (median ms) against the newest 20 LIKE matches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000,
+                            help="Work reports to seed (material requests get a tenth).")
+        parser.add_argument("--users", type=int, default=2_000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f"Seeding {options['rows']:,} work reports…")
+            user_ids = seed_users(options["users"])
+            seed_work_reports(user_ids, options["rows"])
+            seed_material_requests(user_ids, options["rows"] // 10)
+
+            reports = WorkReport.objects.all()
+            cases = [
+                ("one word", reports, "megger"),
+                ("prefix", reports, "trans"),
+                ("two words", reports, "cable gland"),
+                ("title + status", reports.filter(status="pending"), "panel wiring"),
+                ("single user", reports.filter(user_id=user_ids[0]), "earthing"),
+                ("materials", MaterialRequest.objects.all(), "mcb"),
+                ("no match", reports, "xylophone"),
+            ]
+
+            self.stdout.write(f"\n{'query':<18}{'fts ms':>10}{'like ms':>10}")
+            for label, queryset, text in cases:
+                fts = time_call(lambda: search(queryset, text), options["repeat"])
+                like = time_call(
+                    lambda: list(
+                        queryset.filter(description__icontains=text.split()[0])
+                        .order_by("-created_at")[:20]
+                    ),
+                    options["repeat"],
+                )
+                self.stdout.write(f"{label:<18}{fts:>10.2f}{like:>10.2f}")
@@ -0,0 +1,66 @@
+import math
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.benchmarks import scratch_database, seed_month, seed_users
+from accounts.timesheet import (
+    TOTAL_FIELDS,
+    TimesheetRules,
+    build_timesheets,
+    compute,
+    compute_reference,
+    load_period,
+    month_period,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database with a month of shifts and time the timesheet "
+        "engine: load, NumPy compute, plain-Python reference and write. Fails "
+        "if the two computations disagree."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--month", default="2026-03", help="YYYY-MM to seed and compute.")
+
+    def _timed(self, label, func):
+        started = time.perf_counter()
+        result = func()
+        self.stdout.write(f"  {label:<22}{(time.perf_counter() - started) * 1000:>10.0f} ms")
+        return result
+
+    def handle(self, *args, **options):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise CommandError("benchmark_timesheet requires NumPy.")
+
+        start, end = month_period(date.fromisoformat(f"{options['month']}-01"))
+        rules = TimesheetRules()
+        with scratch_database():
+            user_ids = seed_users(options["users"])
+            rows = seed_month(user_ids, start, (end - start).days + 1)
+            self.stdout.write(f"Seeded {rows:,} attendance rows for {len(user_ids):,} users.\n")
+
+            columns = self._timed("load (values_list)", lambda: load_period(start, end))
+            fast = self._timed("compute (NumPy)", lambda: compute(columns, rules))
+            slow = self._timed("reference (Python)", lambda: compute_reference(columns, rules))
+            written = self._timed("build + upsert", lambda: build_timesheets(start, end, rules))
+
+            worst = max(
+                (
+                    abs(fast[user_id][field] - values[field])
+                    for user_id, values in slow.items()
+                    for field in TOTAL_FIELDS
+                ),
+                default=0,
+            )
+            if set(fast) != set(slow) or not math.isclose(worst, 0, abs_tol=1e-6):
+                raise CommandError(f"NumPy and reference results differ (max difference {worst}).")
+            self.stdout.write(self.style.SUCCESS(
+                f"\n{written:,} entries; NumPy matches the reference (max difference {worst:.2e})."
+            ))
@@ -0,0 +1,41 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.timesheet import build_timesheets, month_period
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute per-employee timesheet totals (overtime, night hours, leave) "
+        "for a pay period from approved attendance and store them in "
+        "TimesheetEntry. Defaults to last month."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", help="YYYY-MM; the whole calendar month.")
+        parser.add_argument("--start", help="YYYY-MM-DD, with --end for a custom period.")
+        parser.add_argument("--end", help="YYYY-MM-DD, inclusive.")
+
+    def handle(self, *args, **options):
+        try:
+            if options["start"] or options["end"]:
+                start = date.fromisoformat(options["start"])
+                end = date.fromisoformat(options["end"])
+            elif options["month"]:
+                start, end = month_period(date.fromisoformat(f"{options['month']}-01"))
+            else:
+                start, end = month_period(timezone.localdate().replace(day=1) - timedelta(days=1))
+        except (TypeError, ValueError):
+            raise CommandError("Give --month YYYY-MM, or both --start and --end as YYYY-MM-DD.")
+        if end < start:
+            raise CommandError("--end is before --start.")
+
+        started = time.perf_counter()
+        written = build_timesheets(start, end)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} timesheet entries for {start}..{end} "
+            f"in {time.perf_counter() - started:.1f}s."
+        ))
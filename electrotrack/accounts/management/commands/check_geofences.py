@@ -0,0 +1,115 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.geofence import contains_many, encode_many
+from accounts.models import Attendance, Site
+
+UPDATE_BATCH = 5_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Check historical clock-in coordinates against each user's site "
+        "geofence with NumPy, a chunk of rows at a time, and store "
+        "Attendance.out_of_fence. --geohash also backfills the geohash index "
+        "for every row with coordinates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=100_000,
+                            help="Rows loaded and checked per transaction (default 100,000).")
+        parser.add_argument("--all", action="store_true",
+                            help="Re-check rows that already have a result (and re-encode geohashes).")
+        parser.add_argument("--geohash", action="store_true",
+                            help="Also fill Attendance.geohash for every row with coordinates, "
+                                 "with or without a site.")
+
+    def handle(self, *args, **options):
+        try:
+            import numpy as np
+        except ImportError:
+            raise CommandError("check_geofences requires NumPy.")
+
+        sites = {site.pk: site for site in Site.objects.all()}
+        rows = Attendance.objects.filter(
+            user__site__isnull=False, latitude__isnull=False, longitude__isnull=False
+        )
+        if not options["all"]:
+            rows = rows.filter(out_of_fence__isnull=True)
+
+        started = time.perf_counter()
+        last_id, checked, outside = 0, 0, 0
+        while True:
+            chunk = list(
+                rows.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "user__site_id", "latitude", "longitude")[: options["chunk_size"]]
+            )
+            if not chunk:
+                break
+            ids, site_ids, lats, lngs = (np.array(column) for column in zip(*chunk))
+            ids, site_ids = ids.astype(np.int64), site_ids.astype(np.int64)
+            lats, lngs = lats.astype(float), lngs.astype(float)
+
+            out = np.zeros(len(ids), dtype=bool)
+            for site_id in np.unique(site_ids):
+                mask = site_ids == site_id
+                out[mask] = ~contains_many(sites[int(site_id)], lats[mask], lngs[mask])
+
+            with transaction.atomic():
+                # Everything in the chunk's id range is inside unless listed below.
+                rows.filter(id__gte=ids[0], id__lte=ids[-1]).update(out_of_fence=False)
+                out_ids = ids[out].tolist()
+                for start in range(0, len(out_ids), UPDATE_BATCH):
+                    Attendance.objects.filter(
+                        id__in=out_ids[start:start + UPDATE_BATCH]
+                    ).update(out_of_fence=True)
+
+            last_id = int(ids[-1])
+            checked += len(ids)
+            outside += len(out_ids)
+            self.stdout.write(f"  up to id {last_id}: {checked} checked, {outside} outside")
+
+        elapsed = time.perf_counter() - started
+        rate = checked / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} rows in {elapsed:.1f}s ({rate:,.0f} rows/s); {outside} outside their fence."
+        ))
+        if options["geohash"]:
+            self.backfill_geohash(np, options)
+
+    def backfill_geohash(self, np, options):
+        # Independent of the fence check: rows of users without a site, or
+        # already checked, still need a geohash for the map search.
+        rows = Attendance.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        if not options["all"]:
+            rows = rows.filter(geohash__isnull=True)
+
+        last_id, encoded = 0, 0
+        while True:
+            chunk = list(
+                rows.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "latitude", "longitude")[: options["chunk_size"]]
+            )
+            if not chunk:
+                break
+            ids, lats, lngs = (np.array(column) for column in zip(*chunk))
+            with transaction.atomic():
+                Attendance.objects.bulk_update(
+                    [
+                        Attendance(id=pk, geohash=geohash)
+                        for pk, geohash in zip(
+                            ids.astype(np.int64).tolist(),
+                            encode_many(lats.astype(float), lngs.astype(float)),
+                        )
+                    ],
+                    ["geohash"],
+                    batch_size=UPDATE_BATCH,
+                )
+            last_id = int(ids[-1])
+            encoded += len(ids)
+            self.stdout.write(f"  up to id {last_id}: {encoded} geohashes")
+        self.stdout.write(self.style.SUCCESS(f"Filled the geohash of {encoded} rows."))
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.api import issue_token
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Issue a JSON API token for a user. The key is printed once and not stored."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--name", default="", help="Label, e.g. the device name.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}.")
+
+        key = issue_token(user, options["name"])
+        self.stdout.write(self.style.SUCCESS(f"Token for {user.username}:"))
+        self.stdout.write(key)
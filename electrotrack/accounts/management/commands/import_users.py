@@ -0,0 +1,65 @@
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.user_import import UserImportError, import_users, read_rows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update users from a CSV (header row) or JSON file, matched "
+        "on username; see accounts.user_import for the columns. Rows are all "
+        "checked first and nothing is written if any has a problem. Passwords "
+        "are hashed in a process pool, one worker per core by default; existing "
+        "users keep theirs unless --reset-passwords is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="The .csv or .json file.")
+        parser.add_argument("--no-update", action="store_true",
+                            help="Skip usernames that already exist instead of updating them.")
+        parser.add_argument("--reset-passwords", action="store_true",
+                            help="Also replace the passwords of existing users from the file.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Check the file and count what would change without writing.")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Password hashing processes (default: one per core).")
+        parser.add_argument("--actor", help="Username recorded in the audit log as the importer.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        actor = None
+        if options["actor"]:
+            try:
+                actor = User.objects.get(username=options["actor"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['actor']!r}.")
+
+        started = time.perf_counter()
+        try:
+            rows = read_rows(path.read_bytes(), path.name)
+        except OSError as error:
+            raise CommandError(f"Can't read {path}: {error}.")
+        except UserImportError as error:
+            raise CommandError(str(error))
+
+        result = import_users(
+            rows, actor=actor, update=not options["no_update"],
+            dry_run=options["dry_run"], workers=options["workers"],
+            reset_passwords=options["reset_passwords"],
+        )
+        if result.errors:
+            for number, problem in result.errors:
+                self.stderr.write(f"  row {number}: {problem}")
+            raise CommandError(f"{len(result.errors)} row(s) have problems; nothing was imported.")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would import' if options['dry_run'] else 'Imported'} {len(rows)} rows: "
+            f"{result.created} created, {result.updated} updated, {result.unchanged} unchanged, "
+            f"{result.skipped} skipped in {elapsed:.1f}s."
+        ))
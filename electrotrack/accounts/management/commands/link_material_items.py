@@ -0,0 +1,71 @@
+import time
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.catalog import get_index
+from accounts.models import MaterialRequest, normalize_item_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Link MaterialRequest lines that have no Item to the catalog item their "
+        "free-text name means (same normalized name or alias, or a close "
+        "trigram match), a chunk of rows at a time. "
+        "Names that are ambiguous or unknown are listed so they can be added "
+        "to the catalog as items or aliases. Linked pending lines reserve "
+        "stock when approved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=20_000,
+                            help="Rows loaded and updated per transaction (default 20,000).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Count what would be linked without writing.")
+        parser.add_argument("--show", type=int, default=20,
+                            help="How many of the most common unlinked names to list.")
+
+    def handle(self, *args, **options):
+        index = get_index()
+        rows = MaterialRequest.objects.filter(item__isnull=True)
+        decided = {}  # normalized name: (item id, how); requests repeat the same few names
+        outcomes, left = Counter(), Counter()
+
+        started = time.perf_counter()
+        last_id = 0
+        while True:
+            chunk = list(
+                rows.filter(id__gt=last_id).order_by("id").values_list("id", "item_name")[: options["chunk_size"]]
+            )
+            if not chunk:
+                break
+            links = defaultdict(list)  # item id: request ids
+            for pk, name in chunk:
+                key = normalize_item_name(name)
+                if key not in decided:
+                    decided[key] = index.match(name)
+                item_id, how = decided[key]
+                outcomes[how] += 1
+                if item_id is None:
+                    left[name.strip()] += 1
+                else:
+                    links[item_id].append(pk)
+            if links and not options["dry_run"]:
+                # One UPDATE per item rather than a CASE per row.
+                with transaction.atomic():
+                    for item_id, ids in links.items():
+                        MaterialRequest.objects.filter(id__in=ids).update(item_id=item_id)
+            last_id = chunk[-1][0]
+            self.stdout.write(f"  up to id {last_id}: {sum(outcomes.values())} read")
+
+        elapsed = time.perf_counter() - started
+        linked = outcomes["exact"] + outcomes["fuzzy"]
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would link' if options['dry_run'] else 'Linked'} {linked} lines "
+            f"({outcomes['exact']} exact, {outcomes['fuzzy']} fuzzy); "
+            f"{outcomes['ambiguous']} ambiguous, {outcomes['unmatched']} unmatched; "
+            f"{len(decided)} distinct names in {elapsed:.1f}s."
+        ))
+        for name, count in left.most_common(options["show"]):
+            self.stdout.write(f"  {count:>7}  {name}")
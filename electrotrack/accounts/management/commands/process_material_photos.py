@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from accounts.imaging import process_photo
+from accounts.models import MaterialIndent, MaterialRequest
+
+
+class Command(BaseCommand):
+    help = "Compress and thumbnail material photos that have no thumbnail yet (e.g. uploads made before the pipeline existed)."
+
+    def handle(self, *args, **options):
+        pending = Q(thumbnail__isnull=True) | Q(thumbnail="")
+        has_photo = Q(photo__isnull=False) & ~Q(photo="")
+        names = set(
+            MaterialRequest.objects.filter(pending & has_photo).values_list("photo", flat=True).distinct()
+        ) | set(
+            MaterialIndent.objects.filter(pending & has_photo).values_list("photo", flat=True).distinct()
+        )
+
+        done = 0
+        for name in sorted(names):
+            try:
+                process_photo(name)
+                done += 1
+            except Exception as exc:
+                self.stderr.write(f"  skipped {name}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} of {len(names)} photos."))
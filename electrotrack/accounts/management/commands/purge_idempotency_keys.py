@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.api import IDEMPOTENCY_KEY_TTL
+from accounts.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored Idempotency-Key responses older than the replay window "
+        "(accounts.api.IDEMPOTENCY_KEY_TTL), in chunks. Run it daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int,
+                            default=int(IDEMPOTENCY_KEY_TTL.total_seconds() // 3600),
+                            help="Delete keys older than this many hours (default: the replay window).")
+        parser.add_argument("--chunk-size", type=int, default=10_000,
+                            help="Keys per DELETE (default 10,000).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Count what would be deleted without deleting.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        keys = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+        if options["dry_run"]:
+            self.stdout.write(f"Would delete {keys.count()} idempotency keys from before {cutoff:%Y-%m-%d %H:%M}.")
+            return
+
+        deleted = 0
+        while True:
+            ids = list(keys.order_by("id").values_list("id", flat=True)[: options["chunk_size"]])
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} idempotency keys from before {cutoff:%Y-%m-%d %H:%M}."
+        ))
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Site
+from accounts.user_import import UserImportError, reassign_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Set the role and/or site of many users with one UPDATE: the users "
+        "named, everyone at --from-site-location, or both."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*")
+        parser.add_argument("--from-site-location",
+                            help="Select the users whose site_location is this.")
+        parser.add_argument("--role", help="New role.")
+        parser.add_argument("--site-location", help="New site_location.")
+        parser.add_argument("--site", help="New site, by name; \"-\" clears it.")
+
+    def handle(self, *args, **options):
+        if not options["usernames"] and options["from_site_location"] is None:
+            raise CommandError("Name some users or give --from-site-location.")
+        users = User.objects.all()
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        if options["from_site_location"] is not None:
+            users = users.filter(site_location=options["from_site_location"])
+
+        values = {}
+        if options["role"]:
+            values["role"] = options["role"]
+        if options["site_location"] is not None:
+            values["site_location"] = options["site_location"]
+        if options["site"] == "-":
+            values["site"] = None
+        elif options["site"]:
+            try:
+                values["site"] = Site.objects.get(name=options["site"])
+            except Site.DoesNotExist:
+                raise CommandError(f"No site named {options['site']!r}.")
+        if not values:
+            raise CommandError("Give --role, --site-location and/or --site.")
+
+        try:
+            updated = reassign_users(users, **values)
+        except UserImportError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Reassigned {updated} user(s)."))
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.summaries import rebuild_daily_summaries
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild AttendanceDailySummary from raw Attendance rows, a chunk of users at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Users processed per transaction (default 500).")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        user_ids = User.objects.order_by("id").values_list("id", flat=True)
+
+        last_id = 0
+        total = 0
+        while True:
+            chunk = list(user_ids.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            total += rebuild_daily_summaries(chunk)
+            last_id = chunk[-1]
+            self.stdout.write(f"  users up to id {last_id}: {total} summary rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} daily summary rows."))
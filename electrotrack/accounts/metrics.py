@@ -0,0 +1,137 @@
+"""
+Per-view request metrics kept in process memory.
+
+RequestMetricsMiddleware (accounts.middleware) records one sample per request;
+`render_prometheus()` turns the registry into Prometheus text format for the
+metrics endpoint. Every worker process keeps its own registry, so scrape each
+worker (or run a single one) when comparing numbers.
+
+Per view name:
+  * histograms of request duration and query count (cumulative since start,
+    so Prometheus rate()/histogram_quantile() work as usual),
+  * totals for SQL time, template render time and response bytes,
+  * p50/p95/p99 request duration over the last METRICS_WINDOW requests.
+"""
+import threading
+from collections import deque
+
+METRICS_WINDOW = 500
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_lock = threading.Lock()
+_views = {}
+
+
+class _ViewMetrics:
+    def __init__(self):
+        self.count = 0
+        self.duration_sum = 0.0
+        self.duration_buckets = [0] * len(DURATION_BUCKETS)
+        self.queries_sum = 0
+        self.query_buckets = [0] * len(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+        self.over_budget = 0
+        self.recent = deque(maxlen=METRICS_WINDOW)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _observe(buckets, bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            buckets[i] += 1
+
+
+def record(view, duration, queries, sql_seconds, template_seconds, response_bytes, over_budget):
+    with _lock:
+        metrics = _views.get(view)
+        if metrics is None:
+            metrics = _views[view] = _ViewMetrics()
+        metrics.count += 1
+        metrics.duration_sum += duration
+        _observe(metrics.duration_buckets, DURATION_BUCKETS, duration)
+        metrics.queries_sum += queries
+        _observe(metrics.query_buckets, QUERY_BUCKETS, queries)
+        metrics.sql_seconds += sql_seconds
+        metrics.template_seconds += template_seconds
+        metrics.response_bytes += response_bytes
+        metrics.over_budget += over_budget
+        metrics.recent.append(duration)
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+def _label(view):
+    return view.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _histogram(lines, name, view, buckets, bounds, total, count):
+    for bound, value in zip(bounds, buckets):
+        lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {value}')
+    lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {count}')
+    lines.append(f'{name}_sum{{view="{view}"}} {total}')
+    lines.append(f'{name}_count{{view="{view}"}} {count}')
+
+
+def render_prometheus():
+    with _lock:
+        snapshot = {
+            view: (m.count, m.duration_sum, list(m.duration_buckets), m.queries_sum,
+                   list(m.query_buckets), m.sql_seconds, m.template_seconds,
+                   m.response_bytes, m.over_budget, list(m.recent))
+            for view, m in sorted(_views.items())
+        }
+
+    sections = {
+        "duration": ["# HELP electrotrack_request_duration_seconds Request duration per view.",
+                     "# TYPE electrotrack_request_duration_seconds histogram"],
+        "queries": ["# HELP electrotrack_request_queries SQL queries per request.",
+                    "# TYPE electrotrack_request_queries histogram"],
+        "recent": [f"# HELP electrotrack_request_recent_seconds Request duration over the last {METRICS_WINDOW} requests.",
+                   "# TYPE electrotrack_request_recent_seconds summary"],
+        "sql": ["# HELP electrotrack_sql_seconds_total Time spent executing SQL.",
+                "# TYPE electrotrack_sql_seconds_total counter"],
+        "template": ["# HELP electrotrack_template_seconds_total Time spent rendering templates.",
+                     "# TYPE electrotrack_template_seconds_total counter"],
+        "bytes": ["# HELP electrotrack_response_bytes_total Response body bytes.",
+                  "# TYPE electrotrack_response_bytes_total counter"],
+        "budget": ["# HELP electrotrack_query_budget_exceeded_total Requests over REQUEST_QUERY_BUDGET.",
+                   "# TYPE electrotrack_query_budget_exceeded_total counter"],
+    }
+
+    for view, (count, duration_sum, duration_buckets, queries_sum, query_buckets,
+               sql_seconds, template_seconds, response_bytes, over_budget, recent) in snapshot.items():
+        view = _label(view)
+        _histogram(sections["duration"], "electrotrack_request_duration_seconds", view,
+                   duration_buckets, DURATION_BUCKETS, round(duration_sum, 6), count)
+        _histogram(sections["queries"], "electrotrack_request_queries", view,
+                   query_buckets, QUERY_BUCKETS, queries_sum, count)
+        for quantile in (50, 95, 99):
+            sections["recent"].append(
+                f'electrotrack_request_recent_seconds{{view="{view}",quantile="{quantile / 100}"}} '
+                f"{round(percentile(recent, quantile), 6)}"
+            )
+        sections["recent"].append(f'electrotrack_request_recent_seconds_sum{{view="{view}"}} {round(sum(recent), 6)}')
+        sections["recent"].append(f'electrotrack_request_recent_seconds_count{{view="{view}"}} {len(recent)}')
+        sections["sql"].append(f'electrotrack_sql_seconds_total{{view="{view}"}} {round(sql_seconds, 6)}')
+        sections["template"].append(
+            f'electrotrack_template_seconds_total{{view="{view}"}} {round(template_seconds, 6)}'
+        )
+        sections["bytes"].append(f'electrotrack_response_bytes_total{{view="{view}"}} {response_bytes}')
+        sections["budget"].append(f'electrotrack_query_budget_exceeded_total{{view="{view}"}} {over_budget}')
+
+    return "\n".join(line for lines in sections.values() for line in lines) + "\n"
@@ -0,0 +1,157 @@
+"""
+Opt-in request instrumentation (settings.REQUEST_METRICS).
+
+For every request RequestMetricsMiddleware measures, per resolved view name:
+the number of SQL queries and the time spent in them, the time spent rendering
+templates, the response size and the total duration. The numbers are
+
+  * sent back as a Server-Timing header (visible in the browser dev tools),
+  * recorded in the in-process registry in accounts.metrics, served in
+    Prometheus text format by the admin-only `accounts:metrics` view,
+  * checked against REQUEST_QUERY_BUDGET; views over budget are logged as a
+    warning on the "accounts.metrics" logger.
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+
+from . import metrics
+
+logger = logging.getLogger("accounts.metrics")
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class _Sample:
+    __slots__ = ("queries", "sql_seconds", "template_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def _execute(execute, sql, params, many, context):
+    """Execute wrapper on every connection; times the query for the current request, if any."""
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    return sample(execute, sql, params, many, context)
+
+
+def _wrap_connection(connection, **kwargs):
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+def _instrument_connections():
+    """
+    Wrap every connection, now and as they are opened. Connections are per
+    thread and ORM calls from async views run in worker threads, so the
+    wrapper finds its request through the _current ContextVar, which
+    sync_to_async carries over, rather than being added per request.
+    """
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+    connection_created.connect(_wrap_connection, dispatch_uid="accounts.request_metrics")
+
+
+def _instrument_templates():
+    """Time the template backend's render(); includes are part of the outer render."""
+    if getattr(Template.render, "_timed", False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None:
+            return original(self, context, request)
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            sample.template_seconds += time.perf_counter() - start
+
+    render._timed = True
+    Template.render = render
+
+
+class RequestMetricsMiddleware:
+    """
+    Works in both modes: under ASGI async views (the JSON API, the live
+    feed) are awaited directly instead of each being run in a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_METRICS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_budget = getattr(settings, "REQUEST_QUERY_BUDGET", 0)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        _instrument_connections()
+        _instrument_templates()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sample = _Sample()
+        token = _current.set(sample)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, sample, start)
+
+    async def __acall__(self, request):
+        sample = _Sample()
+        token = _current.set(sample)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, sample, start)
+
+    def _finish(self, request, response, sample, start):
+        duration = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unresolved"
+        size = 0 if response.streaming else len(response.content)
+        over_budget = bool(self.query_budget) and sample.queries > self.query_budget
+
+        if over_budget:
+            logger.warning(
+                "%s ran %d queries (budget %d) in %.1f ms: %s",
+                view, sample.queries, self.query_budget, sample.sql_seconds * 1000,
+                request.get_full_path(),
+            )
+        metrics.record(view, duration, sample.queries, sample.sql_seconds,
+                       sample.template_seconds, size, over_budget)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={sample.sql_seconds * 1000:.1f};desc="{sample.queries} queries"',
+            f"tpl;dur={sample.template_seconds * 1000:.1f}",
+            f"total;dur={duration * 1000:.1f}",
+        ])
+        return response
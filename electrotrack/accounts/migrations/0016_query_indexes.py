@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_remove_attendance_date_alter_attendance_clock_in_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('clock_out__isnull', True)), fields=['user'], name='attendance_open_shift_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['status', '-id'], name='attendance_status_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['user', '-id'], name='attendance_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialrequest',
+            index=models.Index(fields=['status', '-created_at'], name='material_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialrequest',
+            index=models.Index(fields=['user', '-created_at'], name='material_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workreport',
+            index=models.Index(fields=['status', '-created_at'], name='workreport_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workreport',
+            index=models.Index(fields=['user', '-created_at'], name='workreport_user_created_idx'),
+        ),
+    ]
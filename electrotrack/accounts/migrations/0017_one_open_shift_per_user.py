@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:34
+
+from django.db import migrations, models
+from django.db.models import F, Max
+from django.db.models.functions import Coalesce
+
+
+def close_duplicate_open_shifts(apps, schema_editor):
+    """Keep only each user's newest open shift so the constraint can be added."""
+    Attendance = apps.get_model('accounts', 'Attendance')
+    open_shifts = Attendance.objects.filter(clock_out__isnull=True)
+    newest = open_shifts.values('user').annotate(newest_id=Max('id')).values('newest_id')
+    open_shifts.exclude(id__in=newest).update(
+        clock_out=Coalesce(F('clock_in'), F('timestamp')),
+        total_hours=0,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_shifts, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='attendance',
+            name='attendance_open_shift_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(condition=models.Q(('clock_out__isnull', True)), fields=('user',), name='attendance_one_open_shift'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_one_open_shift_per_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('site_location', models.CharField(blank=True, max_length=255, null=True)),
+                ('hours', models.FloatField(default=0)),
+                ('shifts', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('approved_count', models.PositiveIntegerField(default=0)),
+                ('rejected_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'site_location'], name='summary_date_site_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='attendance_summary_user_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_attendancedailysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialIndent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.TextField(blank=True, null=True)),
+                ('photo', models.ImageField(blank=True, null=True, upload_to='material_photos/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='materialrequest',
+            name='indent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='accounts.materialindent'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_materialindent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materialindent',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='material_photos/thumbs/'),
+        ),
+        migrations.AddField(
+            model_name='materialrequest',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='material_photos/thumbs/'),
+        ),
+    ]
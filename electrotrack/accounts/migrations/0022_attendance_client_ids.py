@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_api_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='clock_in_client_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='clock_out_client_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_attendance_client_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Site',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('radius_m', models.PositiveIntegerField(default=200)),
+                ('polygon', models.JSONField(blank=True, null=True)),
+                ('geohash', models.CharField(db_index=True, editable=False, max_length=12)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='out_of_fence',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='members', to='accounts.site'),
+        ),
+    ]
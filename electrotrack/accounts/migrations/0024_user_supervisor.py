@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_sites_geofence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='supervisor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='team', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
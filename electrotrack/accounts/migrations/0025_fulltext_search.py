@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from accounts.search import install_search_indexes, remove_search_indexes
+
+
+def install(apps, schema_editor):
+    install_search_indexes(schema_editor.connection)
+
+
+def remove(apps, schema_editor):
+    remove_search_indexes(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    """FTS5 tables + triggers on SQLite, GIN tsvector indexes on PostgreSQL."""
+
+    dependencies = [
+        ('accounts', '0024_user_supervisor'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:13
+
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='shift_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='site',
+            name='timezone',
+            field=models.CharField(blank=True, max_length=64, validators=[accounts.models.validate_timezone]),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['user', 'shift_date'], name='attendance_user_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['shift_date'], name='attendance_day_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_attendance_shift_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimesheetEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('shifts', models.PositiveIntegerField(default=0)),
+                ('worked_hours', models.FloatField(default=0)),
+                ('regular_hours', models.FloatField(default=0)),
+                ('overtime_hours', models.FloatField(default=0)),
+                ('night_hours', models.FloatField(default=0)),
+                ('leave_days', models.PositiveIntegerField(default=0)),
+                ('absent_days', models.PositiveIntegerField(default=0)),
+                ('paid_hours', models.FloatField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timesheets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period_start', 'period_end'], name='timesheet_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'period_start', 'period_end'), name='timesheet_user_period')],
+            },
+        ),
+    ]
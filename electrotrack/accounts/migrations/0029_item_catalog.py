@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from accounts.models import normalize_item_name
+
+
+def fill_normalized_names(apps, schema_editor):
+    Item = apps.get_model("accounts", "Item")
+    items = list(Item.objects.only("id", "name"))
+    for item in items:
+        item.normalized_name = normalize_item_name(item.name)
+    Item.objects.bulk_update(items, ["normalized_name"], batch_size=1_000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0028_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ItemAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('normalized_name', models.CharField(editable=False, max_length=200, unique=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='accounts.item')),
+            ],
+            options={
+                'verbose_name_plural': 'item aliases',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0030_audit_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changes', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
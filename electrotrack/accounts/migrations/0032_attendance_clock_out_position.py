@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0031_change_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='clock_out_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='clock_out_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
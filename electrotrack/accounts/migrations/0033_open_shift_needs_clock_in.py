@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0032_attendance_clock_out_position'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='attendance',
+            name='attendance_one_open_shift',
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(condition=models.Q(('clock_in__isnull', False), ('clock_out__isnull', True)), fields=('user',), name='attendance_one_open_shift'),
+        ),
+    ]
@@ -3,7 +3,13 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from datetime import datetime
+import re
+import zoneinfo
+
+from .geofence import contains, encode
 
 
 class User(AbstractUser):
@@ -16,11 +22,59 @@ class User(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='electrician')
 
     site_location = models.CharField(max_length=255, blank=True, null=True)  
+    site = models.ForeignKey(
+        "Site", on_delete=models.SET_NULL, null=True, blank=True, related_name="members"
+    )
+    # Indexed (ForeignKey default); supervisor-scoped lists join on it.
+    supervisor = models.ForeignKey(
+        "self", on_delete=models.SET_NULL, null=True, blank=True, related_name="team"
+    )
 
     def __str__(self):
         return f"{self.username} ({self.role})"
 
 
+def validate_timezone(value):
+    try:
+        zoneinfo.ZoneInfo(value)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"Unknown time zone: {value}")
+
+
+def shift_date(site, clock_in):
+    """The date of `clock_in` at `site`, in settings.TIME_ZONE when there is no site zone."""
+    if clock_in is None:
+        return None
+    if site is not None and site.timezone:
+        return timezone.localdate(clock_in, zoneinfo.ZoneInfo(site.timezone))
+    return timezone.localdate(clock_in, timezone.get_default_timezone())
+
+
+class Site(models.Model):
+    """
+    A work site and its geofence: a centre point plus either a radius in
+    metres or a polygon of [latitude, longitude] vertices (accounts.geofence).
+    """
+    name = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    radius_m = models.PositiveIntegerField(default=200)
+    polygon = models.JSONField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, db_index=True, editable=False)
+    # IANA name, e.g. "Asia/Kolkata"; blank means settings.TIME_ZONE.
+    timezone = models.CharField(max_length=64, blank=True, validators=[validate_timezone])
+
+    def save(self, *args, **kwargs):
+        self.geohash = encode(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
+    def contains(self, latitude, longitude):
+        return contains(self, latitude, longitude)
+
+    def __str__(self):
+        return self.name
+
+
 class Attendance(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -43,11 +97,54 @@ class Attendance(models.Model):
     attendance_type = models.CharField(max_length=20, choices=ATTENDANCE_TYPE, default='present')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 
+    # Where the shift was clocked in: out_of_fence and geohash below describe
+    # this position too. The clock-out position is kept in its own columns.
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    clock_out_latitude = models.FloatField(null=True, blank=True)
+    clock_out_longitude = models.FloatField(null=True, blank=True)
 
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    # Ids generated by the mobile app for offline punches (accounts.punches);
+    # unique so a re-synced queue can't record the same punch twice.
+    clock_in_client_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    clock_out_client_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    # Clock-in position checked against the user's Site (accounts.geofence);
+    # None when there was no site or no coordinates.
+    out_of_fence = models.BooleanField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True, db_index=True)
+
+    # Local date of clock_in in the user's site time zone, so per-day and
+    # per-month queries are index range scans instead of TruncDate(clock_in).
+    # Set by save() on insert and when clock_in changes, never just because
+    # the user moved site; bulk paths set it with shift_date(), and
+    # `manage.py backfill_shift_dates` fills (or, with --site, re-dates)
+    # older rows. Leave and absent rows have no clock times: their creator
+    # sets shift_date to the day they cover and save() keeps it.
+    shift_date = models.DateField(null=True, blank=True, editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_clock_in = instance.__dict__.get("clock_in", models.DEFERRED)
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        clock_in = self.__dict__.get("clock_in", models.DEFERRED)
+        if (
+            (update_fields is None or "clock_in" in update_fields)
+            and (self._state.adding or clock_in != getattr(self, "_loaded_clock_in", models.DEFERRED))
+            and (self.clock_in is not None or self.attendance_type == "present")
+        ):
+            self.shift_date = shift_date(self.user.site, self.clock_in)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "shift_date"}
+        super().save(*args, **kwargs)
+        self._loaded_clock_in = self.__dict__.get("clock_in", models.DEFERRED)
+
     def hours_worked(self):
         if self.clock_in and self.clock_out:
             diff = self.clock_out - self.clock_in
@@ -60,8 +157,28 @@ class Attendance(models.Model):
         return ""
 
 
+    class Meta:
+        constraints = [
+            # At most one open shift per user: clocked in, not yet out (leave
+            # and absent rows have neither). The partial unique index also
+            # serves the clock-out lookup, which filters on the same two.
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(clock_in__isnull=False, clock_out__isnull=True),
+                name="attendance_one_open_shift",
+            ),
+        ]
+        indexes = [
+            # Approval queue and per-employee history, both newest first.
+            models.Index(fields=["status", "-id"], name="attendance_status_id_idx"),
+            models.Index(fields=["user", "-id"], name="attendance_user_id_idx"),
+            # Daily summaries (per user) and the date filters (all users).
+            models.Index(fields=["user", "shift_date"], name="attendance_user_day_idx"),
+            models.Index(fields=["shift_date"], name="attendance_day_idx"),
+        ]
+
     def __str__(self):
-        return f"{self.user.username} | {self.date} | {self.status}"
+        return f"{self.user.username} | {self.shift_date} | {self.status}"
 
 
 class WorkReport(models.Model):
@@ -79,10 +196,108 @@ class WorkReport(models.Model):
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='in_progress')
     created_at = models.DateTimeField(auto_now_add=True)  # ✅ fixed
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-created_at"], name="workreport_status_created_idx"),
+            models.Index(fields=["user", "-created_at"], name="workreport_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.task_name} ({self.created_at.date()})"
 
 
+class MaterialIndent(models.Model):
+    """One submitted material request form; its line items are MaterialRequest rows."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    description = models.TextField(blank=True, null=True)
+    photo = models.ImageField(upload_to='material_photos/', blank=True, null=True)
+    # Filled in by accounts.imaging once the upload has been compressed.
+    thumbnail = models.ImageField(upload_to='material_photos/thumbs/', blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"MR-{self.pk} ({self.user.username})"
+
+
+def normalize_item_name(value):
+    """
+    Spelling-independent form of a material name: lower case, punctuation
+    dropped, a number glued to its unit ("9 W" -> "9w"), plural "s" dropped
+    and the words sorted, so "LED Bulbs 9 W" and "9w led bulb" agree.
+    """
+    text = re.sub(r"[^a-z0-9.]+", " ", (value or "").lower())
+    text = re.sub(r"(\d)\s+([a-z])", r"\1\2", text)
+    words = set()
+    for word in text.split():
+        word = word.strip(".")
+        if len(word) > 3 and word.isalpha() and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if word:
+            words.add(word)
+    return " ".join(sorted(words))
+
+
+class Item(models.Model):
+    """
+    A catalog material with its canonical name and unit. MaterialRequest
+    lines are linked to it (accounts.catalog), which is what stock and demand
+    figures are counted against.
+    """
+    name = models.CharField(max_length=200, unique=True)
+    unit = models.CharField(max_length=50, blank=True)
+    # normalize_item_name(name); lookups and the typeahead match on it.
+    normalized_name = models.CharField(max_length=200, db_index=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def clean(self):
+        normalized = normalize_item_name(self.name)
+        if not normalized:
+            raise ValidationError({"name": "Enter a name with letters or digits."})
+        if (
+            Item.objects.filter(normalized_name=normalized).exclude(pk=self.pk).exists()
+            or ItemAlias.objects.filter(normalized_name=normalized).exclude(item_id=self.pk).exists()
+        ):
+            raise ValidationError({"name": "Another catalog item already has this name."})
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "name" in update_fields:
+            self.normalized_name = normalize_item_name(self.name)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "normalized_name"}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
+class ItemAlias(models.Model):
+    """Another way people write an Item, e.g. "9w led" for "LED bulb 9W"."""
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="aliases")
+    name = models.CharField(max_length=200)
+    normalized_name = models.CharField(max_length=200, unique=True, editable=False)
+
+    class Meta:
+        verbose_name_plural = "item aliases"
+
+    def clean(self):
+        normalized = normalize_item_name(self.name)
+        if not normalized:
+            raise ValidationError({"name": "Enter a name with letters or digits."})
+        if (
+            ItemAlias.objects.filter(normalized_name=normalized).exclude(pk=self.pk).exists()
+            or Item.objects.filter(normalized_name=normalized).exclude(pk=self.item_id).exists()
+        ):
+            raise ValidationError({"name": "This name already belongs to a catalog item."})
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_item_name(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
 class MaterialRequest(models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending"),
@@ -92,14 +307,245 @@ class MaterialRequest(models.Model):
 
     # 🔹 Fixed the ForeignKey line
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    indent = models.ForeignKey(
+        MaterialIndent, on_delete=models.CASCADE, related_name="lines", null=True, blank=True
+    )
 
     item_name = models.CharField(max_length=200)
+    # Stock item, when item_name matches one; approvals then reserve stock
+    # (accounts.stock). `reserved` is what this line currently holds.
+    item = models.ForeignKey(
+        Item, on_delete=models.PROTECT, null=True, blank=True, related_name="requests"
+    )
+    reserved = models.PositiveIntegerField(default=0)
+    issued_at = models.DateTimeField(null=True, blank=True)
     quantity = models.PositiveIntegerField()
     unit = models.CharField(max_length=50, null=True, blank=True) 
     description = models.TextField(blank=True, null=True)
     photo = models.ImageField(upload_to='material_photos/', blank=True, null=True)
+    thumbnail = models.ImageField(upload_to='material_photos/thumbs/', blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-created_at"], name="material_status_created_idx"),
+            models.Index(fields=["user", "-created_at"], name="material_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_name} x {self.quantity} ({self.user.username})"
+
+
+class StockBalance(models.Model):
+    """
+    Running stock of an item at a site (no site: the central store). Every
+    StockLedger row updates its balance in the same transaction, so current
+    stock is a one-row lookup rather than a sum over the ledger.
+    """
+    item = models.ForeignKey(Item, on_delete=models.PROTECT, related_name="balances")
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, blank=True, related_name="stock")
+    on_hand = models.IntegerField(default=0)
+    reserved = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["item", "site"], condition=models.Q(site__isnull=False), name="stock_item_site"
+            ),
+            models.UniqueConstraint(
+                fields=["item"], condition=models.Q(site__isnull=True), name="stock_item_central"
+            ),
+            # Last line of defence behind the checks in accounts.stock.
+            models.CheckConstraint(
+                condition=models.Q(reserved__gte=0, reserved__lte=models.F("on_hand")),
+                name="stock_not_negative",
+            ),
+        ]
+
+    @property
+    def available(self):
+        return self.on_hand - self.reserved
+
+    def __str__(self):
+        return f"{self.item} @ {self.site or 'Central store'}: {self.on_hand} ({self.reserved} reserved)"
+
+
+class StockLedger(models.Model):
+    """Append-only stock movements; on_hand / reserved are the balance after the movement."""
+    KIND_CHOICES = [
+        ("receipt", "Receipt"),
+        ("reserve", "Reserved"),
+        ("release", "Released"),
+        ("issue", "Issued"),
+    ]
+
+    item = models.ForeignKey(Item, on_delete=models.PROTECT, related_name="ledger")
+    site = models.ForeignKey(Site, on_delete=models.PROTECT, null=True, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.PositiveIntegerField()
+    on_hand = models.IntegerField()
+    reserved = models.IntegerField()
+    material_request = models.ForeignKey(
+        MaterialRequest, on_delete=models.SET_NULL, null=True, blank=True, related_name="stock_moves"
+    )
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["item", "site", "-id"], name="stock_ledger_item_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity} x {self.item}"
+
+
+class AttendanceDailySummary(models.Model):
+    """
+    Per-user, per-day totals of closed shifts. Maintained incrementally by
+    accounts.summaries and rebuilt with `manage.py rebuild_attendance_summary`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_summaries")
+    date = models.DateField()
+    site_location = models.CharField(max_length=255, blank=True, null=True)
+
+    hours = models.FloatField(default=0)
+    shifts = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    approved_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="attendance_summary_user_date"),
+        ]
+        indexes = [
+            models.Index(fields=["date", "site_location"], name="summary_date_site_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} | {self.date} | {self.hours}h"
+
+
+class TimesheetEntry(models.Model):
+    """
+    Per-employee pay-period totals from approved attendance, written by
+    accounts.timesheet (`manage.py build_timesheets`).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="timesheets")
+    period_start = models.DateField()
+    period_end = models.DateField()
+
+    shifts = models.PositiveIntegerField(default=0)
+    worked_hours = models.FloatField(default=0)
+    regular_hours = models.FloatField(default=0)
+    overtime_hours = models.FloatField(default=0)
+    night_hours = models.FloatField(default=0)
+    leave_days = models.PositiveIntegerField(default=0)
+    absent_days = models.PositiveIntegerField(default=0)
+    paid_hours = models.FloatField(default=0)
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "period_start", "period_end"], name="timesheet_user_period"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["period_start", "period_end"], name="timesheet_period_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} | {self.period_start}..{self.period_end} | {self.paid_hours}h"
+
+
+class ApiToken(models.Model):
+    """
+    Bearer token for the JSON API (`Authorization: Token <key>`). Only a
+    SHA-256 of the key is stored; the key itself is shown once when issued.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="api_tokens")
+    name = models.CharField(max_length=100, blank=True)
+    key_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username} | {self.name or 'token'}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The stored response for an API call made with an `Idempotency-Key`
+    header, so a retried request gets the first answer back instead of
+    clocking in or out twice. status_code is empty while the first call
+    is still running. Keys expire after accounts.api.IDEMPOTENCY_KEY_TTL and
+    are deleted by `manage.py purge_idempotency_keys`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=100)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_user_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} | {self.endpoint} | {self.key}"
+
+
+class AuditEvent(models.Model):
+    """
+    One approval or edit made through the app: who did what to which record
+    and the values it changed, e.g. changes={"status": ["pending", "approved"]}.
+    Rows are written by accounts.audit and never updated; they leave the
+    table only through `manage.py archive_audit_events`.
+    """
+    object_type = models.CharField(max_length=100)   # model label, e.g. "accounts.attendance"
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=50)
+    actor = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    # Kept with the event so it still names the actor after their account is deleted.
+    actor_username = models.CharField(max_length=150, blank=True)
+    changes = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # One record's history is a single range scan.
+            models.Index(fields=["object_type", "object_id", "created_at"], name="audit_object_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Audit events are append-only.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.object_type} #{self.object_id} | {self.action} | {self.actor_username}"
+
+
+class ChangeNotification(models.Model):
+    """
+    Rows created or changed by one transaction, for the live approval pages
+    when settings.LIVE_FEED_BACKEND is "database" (accounts.feed), e.g.
+    changes={"accounts.attendance": [41, 42]}. Kept for a few minutes only.
+    """
+    changes = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
-        return f"{self.item_name} x {self.quantity} ({self.user.username})"
\ No newline at end of file
+        return f"#{self.pk} | {self.created_at:%Y-%m-%d %H:%M:%S}"
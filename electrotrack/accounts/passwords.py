@@ -0,0 +1,33 @@
+"""
+Password hashing for bulk imports (accounts.user_import).
+
+make_password() with the default PBKDF2 hasher takes about half a second of
+CPU per password by design, so hashing a few thousand on one thread takes
+most of an hour. hash_passwords() spreads the work over a process pool, one
+worker per core. The workers are always spawned, never forked: a fork of a
+web or management process would copy its open database connections and
+threads (the live feed poller). They only import the hashers, never the
+models, so starting them is cheap.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+# Below this many passwords starting a pool costs more than it saves.
+POOL_THRESHOLD = 4
+
+
+def _hash(password):
+    return make_password(password)
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password() for each of `passwords`, in order. workers=1 hashes in this process."""
+    passwords = list(passwords)
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1 or len(passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(_hash, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
@@ -0,0 +1,183 @@
+"""
+Reconciliation of offline clock-in / clock-out punches queued by the mobile
+app (POST /accounts/api/attendance/sync/).
+
+A batch is replayed in timestamp order. Punches from before the user's open
+shift started are paired up on their own (a week queued offline while the
+app later clocked in live); from its clock-in on they apply to it:
+
+  * clock_in opens a shift, unless one is already open,
+  * clock_out closes the open shift, unless there is none or it would end
+    before it started,
+  * a new shift that overlaps a closed one (or, left open, would overlap
+    the live shift) is rejected, both of its punches,
+  * punches whose client id is already stored are reported as duplicates,
+    so re-sending a queue after a dropped response is harmless.
+
+Everything is written in one transaction with one bulk_update (the shift
+that was open before the batch) and one bulk_create (new shifts), so a week
+of punches costs about the same number of queries as a single one.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Q
+
+from .feed import publish
+from .geofence import fence_fields
+from .models import Attendance, shift_date
+from .stats import invalidate_dashboard_stats
+from .summaries import record_key, refresh_daily_summaries
+
+MAX_PUNCHES = 500
+
+
+@dataclass
+class Punch:
+    client_id: str
+    action: str
+    timestamp: datetime
+    latitude: float = None
+    longitude: float = None
+
+
+def _result(punch, status, reason=None, record=None):
+    result = {"id": punch.client_id, "action": punch.action, "status": status}
+    if reason:
+        result["reason"] = reason
+    if record is not None:
+        result["attendance_id"] = record
+    return result
+
+
+def _reject(results, punches, index, reason):
+    results[index] = _result(punches[index], "rejected", reason)
+
+
+def sync_punches(user, punches):
+    """
+    Apply `punches` (a list of Punch) for `user`. Returns one result per
+    punch, in the order given, plus the open shift after the sync.
+    """
+    ordered = sorted(enumerate(punches), key=lambda item: item[1].timestamp)
+    ids = [punch.client_id for punch in punches]
+    results = [None] * len(punches)
+
+    with transaction.atomic():
+        stored = set()
+        for clock_in_id, clock_out_id in Attendance.objects.filter(
+            Q(clock_in_client_id__in=ids) | Q(clock_out_client_id__in=ids)
+        ).values_list("clock_in_client_id", "clock_out_client_id"):
+            stored.update((clock_in_id, clock_out_id))
+
+        existing = (
+            Attendance.objects.select_for_update()
+            .filter(user=user, clock_in__isnull=False, clock_out__isnull=True)
+            .first()
+        )
+        # (clock_in, clock_out) of closed shifts the batch could overlap.
+        closed = list(
+            Attendance.objects.filter(
+                user=user, clock_in__isnull=False, clock_out__gt=ordered[0][1].timestamp,
+            ).values_list("clock_in", "clock_out")
+        ) if ordered else []
+        live = existing is None  # whether the batch has reached the open shift
+        open_shift, opened_by = None, None  # a shift opened by this batch, and its punch
+        created, updated = [], []
+        applied = {}  # result index -> the Attendance row the punch touched
+
+        for index, punch in ordered:
+            if not live and (existing.clock_in is None or punch.timestamp >= existing.clock_in):
+                # An earlier shift still open here would overlap the live one.
+                if open_shift is not None:
+                    created.remove(open_shift)
+                    del applied[opened_by]
+                    _reject(results, punches, opened_by, "overlaps_shift")
+                open_shift, live = existing, True
+
+            if punch.client_id in stored:
+                results[index] = _result(punch, "duplicate")
+                continue
+            stored.add(punch.client_id)
+
+            if punch.action == "clock_in":
+                if open_shift is not None:
+                    _reject(results, punches, index, "already_clocked_in")
+                    continue
+                if any(start <= punch.timestamp < end for start, end in closed):
+                    _reject(results, punches, index, "overlaps_shift")
+                    continue
+                open_shift = Attendance(
+                    user=user,
+                    clock_in=punch.timestamp,
+                    shift_date=shift_date(user.site, punch.timestamp),
+                    latitude=punch.latitude,
+                    longitude=punch.longitude,
+                    status="pending",
+                    clock_in_client_id=punch.client_id,
+                    **fence_fields(user.site, punch.latitude, punch.longitude),
+                )
+                created.append(open_shift)
+                applied[index], opened_by = open_shift, index
+            else:
+                if open_shift is None:
+                    _reject(results, punches, index, "not_clocked_in")
+                    continue
+                if open_shift.clock_in and punch.timestamp < open_shift.clock_in:
+                    _reject(results, punches, index, "before_clock_in")
+                    continue
+                if open_shift is not existing and any(
+                    start < punch.timestamp and open_shift.clock_in < end for start, end in closed
+                ):
+                    created.remove(open_shift)
+                    del applied[opened_by]
+                    _reject(results, punches, opened_by, "overlaps_shift")
+                    _reject(results, punches, index, "overlaps_shift")
+                    open_shift = None
+                    continue
+                open_shift.clock_out = punch.timestamp
+                open_shift.clock_out_latitude = punch.latitude
+                open_shift.clock_out_longitude = punch.longitude
+                open_shift.clock_out_client_id = punch.client_id
+                if open_shift.clock_in:
+                    open_shift.total_hours = round(
+                        (punch.timestamp - open_shift.clock_in).total_seconds() / 3600, 2
+                    )
+                    closed.append((open_shift.clock_in, punch.timestamp))
+                if open_shift is existing:
+                    updated.append(open_shift)
+                applied[index] = open_shift
+                open_shift = None
+
+        # A shift left open by the batch can't start before the live one
+        # or before a closed shift ends.
+        if open_shift is not None and open_shift is not existing and (
+            not live or any(end > open_shift.clock_in for _, end in closed)
+        ):
+            created.remove(open_shift)
+            del applied[opened_by]
+            _reject(results, punches, opened_by, "overlaps_shift")
+            open_shift = None
+        if not live:
+            open_shift = existing
+
+        # Close the previously open shift first: the one-open-shift
+        # constraint would reject a new open row while it is still open.
+        if updated:
+            Attendance.objects.bulk_update(
+                updated,
+                ["clock_out", "clock_out_latitude", "clock_out_longitude", "total_hours", "clock_out_client_id"],
+            )
+        if created:
+            Attendance.objects.bulk_create(created)
+        publish(Attendance, [record.pk for record in updated + created])
+
+    for index, record in applied.items():
+        results[index] = _result(punches[index], "applied", record=record.pk)
+
+    refresh_daily_summaries([record_key(record) for record in updated + created])
+    if updated or created:
+        invalidate_dashboard_stats(user.pk)
+
+    return results, open_shift
@@ -0,0 +1,150 @@
+"""
+Full-text search over work reports and material requests.
+
+SQLite:      an external-content FTS5 table per model, kept in sync by
+             triggers, ranked with bm25().
+PostgreSQL:  a GIN index on a weighted tsvector expression, ranked with
+             ts_rank(). Queries repeat the exact indexed expression.
+
+Every word typed is a prefix match ("cab term" finds "cable termination"),
+and all words must match. `install_search_indexes()` creates the tables /
+indexes (migration 0025, and benchmarks that build their schema from the
+models); `search()` returns ranked rows of an already-filtered queryset, so
+role scopes and list filters apply unchanged.
+"""
+import re
+
+from django.db import connection
+
+# table -> (title column, body column). Keyed by table rather than model so
+# the migration can import this module.
+SEARCH_FIELDS = {
+    "accounts_workreport": ("task_name", "description"),
+    "accounts_materialrequest": ("item_name", "description"),
+}
+TITLE_WEIGHT, BODY_WEIGHT = 10.0, 1.0
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+MAX_RANKED = 2_000
+
+
+def _fts_table(table):
+    return f"{table}_fts"
+
+
+def _pg_vector(table):
+    title, body = SEARCH_FIELDS[table]
+    return (
+        f"(setweight(to_tsvector('english', coalesce({title}, '')), 'A') || "
+        f"setweight(to_tsvector('english', coalesce({body}, '')), 'B'))"
+    )
+
+
+def _sqlite_statements(table):
+    fts = _fts_table(table)
+    title, body = SEARCH_FIELDS[table]
+    columns = f"{title}, {body}"
+    new_values = f"new.{title}, new.{body}"
+    old_values = f"old.{title}, old.{body}"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{columns}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        # Index the rows that existed before the table.
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def install_search_indexes(using=None):
+    """Create the backend's full-text index for every searched table."""
+    conn = using or connection
+    with conn.cursor() as cursor:
+        for table in SEARCH_FIELDS:
+            if conn.vendor == "sqlite":
+                for statement in _sqlite_statements(table):
+                    cursor.execute(statement)
+            elif conn.vendor == "postgresql":
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_search_idx "
+                    f"ON {table} USING GIN ({_pg_vector(table)})"
+                )
+
+
+def remove_search_indexes(using=None):
+    conn = using or connection
+    with conn.cursor() as cursor:
+        for table in SEARCH_FIELDS:
+            if conn.vendor == "sqlite":
+                fts = _fts_table(table)
+                for suffix in ("ai", "ad", "au"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+            elif conn.vendor == "postgresql":
+                cursor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+
+
+def terms(text):
+    """The words of a query, lower-cased, at most MAX_TERMS."""
+    return [word.lower() for word in _WORD.findall(text or "")][:MAX_TERMS]
+
+
+def search(queryset, text, limit=20):
+    """
+    [(row, rank), ...] for the best `limit` matches of `text` within
+    `queryset` (a WorkReport / MaterialRequest queryset, filters applied).
+    Higher rank is better. Only the newest MAX_RANKED matches are ranked, so
+    a common word costs the same on a million rows as on ten thousand.
+    """
+    words = terms(text)
+    model = queryset.model
+    table = model._meta.db_table
+    if not words or table not in SEARCH_FIELDS:
+        return []
+
+    # The filtered queryset becomes an id subquery; skip it when unfiltered.
+    filtered = bool(queryset.query.where)
+    scope_sql, scope_params = queryset.order_by().values("id").query.sql_with_params()
+    scope = f"AND {table}.id IN ({scope_sql}) " if filtered else ""
+
+    if connection.vendor == "postgresql":
+        vector = _pg_vector(table)
+        sql = (
+            f"SELECT id, rank FROM ("
+            f"SELECT {table}.id, ts_rank({vector}, query) AS rank "
+            f"FROM {table}, to_tsquery('english', %s) query "
+            f"WHERE {vector} @@ query {scope}"
+            f"ORDER BY {table}.id DESC LIMIT %s) matches "
+            f"ORDER BY rank DESC LIMIT %s"
+        )
+        params = [" & ".join(f"{word}:*" for word in words)]
+    else:
+        fts = _fts_table(table)
+        # CROSS JOIN keeps the FTS index as the outer loop; an IN (...) on
+        # the virtual table's rowid would probe it once per scoped row.
+        # bm25() is lower-is-better; negate so both backends sort descending.
+        sql = (
+            f"SELECT id, rank FROM ("
+            f"SELECT {fts}.rowid AS id, -bm25({fts}, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS rank "
+            f"FROM {fts} CROSS JOIN {table} ON {table}.id = {fts}.rowid "
+            f"WHERE {fts} MATCH %s {scope}"
+            f"ORDER BY {fts}.rowid DESC LIMIT %s) "
+            f"ORDER BY rank DESC LIMIT %s"
+        )
+        params = [" ".join(f'"{word}"*' for word in words)]
+
+    params += list(scope_params) if filtered else []
+    params += [MAX_RANKED, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        ranked = cursor.fetchall()
+
+    rows = model.objects.select_related("user").in_bulk([pk for pk, _ in ranked])
+    return [(rows[pk], rank) for pk, rank in ranked if pk in rows]
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_catalog
+from .feed import publish
+from .models import Attendance, Item, ItemAlias, MaterialIndent, MaterialRequest, WorkReport
+from .stats import invalidate_dashboard_stats
+from .teams import invalidate_teams
+
+User = get_user_model()
+
+
+# The owner's employee dashboard entry; manager numbers expire on their own.
+# Clock-outs through QuerySet.update() don't send these signals; those views
+# call invalidate_dashboard_stats() themselves.
+@receiver([post_save, post_delete], sender=Attendance)
+@receiver([post_save, post_delete], sender=WorkReport)
+@receiver([post_save, post_delete], sender=MaterialRequest)
+@receiver([post_save, post_delete], sender=MaterialIndent)
+def dashboard_data_changed(sender, instance, **kwargs):
+    invalidate_dashboard_stats(instance.user_id)
+
+
+# The live approval pages; update() / bulk_create() callers publish themselves.
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=MaterialRequest)
+def approval_row_saved(sender, instance, **kwargs):
+    publish(sender, [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=User)
+def team_membership_changed(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+    invalidate_teams()
+
+
+@receiver([post_save, post_delete], sender=Item)
+@receiver([post_save, post_delete], sender=ItemAlias)
+def catalog_changed(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Apply the SQLITE_HIGH_CONCURRENCY pragmas to every new SQLite connection."""
+    if connection.vendor != "sqlite" or not getattr(settings, "SQLITE_HIGH_CONCURRENCY", False):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
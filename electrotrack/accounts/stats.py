@@ -0,0 +1,148 @@
+"""
+Dashboard statistics, computed with a handful of indexed COUNT / SUM queries
+and kept in the cache for STATS_CACHE_TTL seconds.
+
+Admins share one organisation-wide entry; each supervisor has their own,
+counted over their team only (the `user__supervisor` join the list views
+use). Clock-ins don't invalidate manager numbers: during a shift change
+every clock-in would otherwise throw the entry away, and the next refresh
+would recount, so "clocked in" is at most STATS_CACHE_TTL seconds old.
+Reviews do: `invalidate_review_stats()` drops the organisation-wide entry
+and the reviewer's and owners' supervisors' entries when an approval,
+rejection or hours edit commits, so a pending count drops as soon as the
+manager is redirected back. An employee's own entry is dropped by
+`invalidate_dashboard_stats(user_id)` when their attendance or requests
+change, so clocking in or out shows straight away.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Attendance, AttendanceDailySummary, MaterialRequest, WorkReport
+
+User = get_user_model()
+
+STATS_CACHE_TTL = 30
+MANAGER_KEY = "dashboard-stats:manager"
+
+
+def _employee_key(user_id):
+    return f"dashboard-stats:user:{user_id}"
+
+
+def invalidate_dashboard_stats(*user_ids):
+    """Drop the cached employee stats of `user_ids`."""
+    cache.delete_many([_employee_key(user_id) for user_id in user_ids])
+
+
+def _supervisor_key(supervisor_id):
+    return f"{MANAGER_KEY}:{supervisor_id}"
+
+
+def _manager_key(supervisor):
+    return _supervisor_key(supervisor.pk) if supervisor else MANAGER_KEY
+
+
+def invalidate_review_stats(reviewer, *user_ids):
+    """
+    After `reviewer` approved, rejected or edited records of `user_ids`:
+    drop those users' entries, the organisation-wide one, the reviewer's and
+    those of the users' supervisors, once the transaction commits.
+    """
+    supervisor_ids = set(
+        User.objects.filter(pk__in=user_ids, supervisor__isnull=False).values_list("supervisor_id", flat=True)
+    )
+    if reviewer.role == "supervisor":
+        supervisor_ids.add(reviewer.pk)
+    keys = [MANAGER_KEY, *map(_supervisor_key, supervisor_ids), *map(_employee_key, user_ids)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def manager_stats(supervisor=None):
+    """
+    Numbers for the admin dashboard, or for `supervisor`'s dashboard
+    counted over their team.
+    """
+    today = timezone.localdate()
+    team = {"supervisor": supervisor} if supervisor else {}
+    records = {"user__supervisor": supervisor} if supervisor else {}
+    attendance = Attendance.objects.filter(**records)
+
+    users = User.objects.filter(**team).aggregate(
+        total=Count("id"),
+        electricians=Count("id", filter=Q(role="electrician")),
+    )
+    # One COUNT per number rather than one aggregate with FILTERs: each can
+    # use its own index (the open-shift constraint, shift_date, status)
+    # instead of scanning the whole table.
+    attendance = {
+        "clocked_in": attendance.filter(clock_in__isnull=False, clock_out__isnull=True).count(),
+        "today": attendance.filter(shift_date=today).count(),
+        "pending": attendance.filter(status="pending").count(),
+    }
+    pending_reports = WorkReport.objects.filter(status="pending", **records).count()
+    pending_materials = MaterialRequest.objects.filter(status="pending", **records).count()
+    hours_by_site = (
+        AttendanceDailySummary.objects.filter(date=today, **records)
+        .values("site_location")
+        .annotate(hours=Sum("hours"), people=Count("user"))
+        .order_by("site_location")
+    )
+
+    return {
+        "total_users": users["total"],
+        "electricians": users["electricians"],
+        "clocked_in": attendance["clocked_in"],
+        "attendance_today": attendance["today"],
+        "pending_attendance": attendance["pending"],
+        "pending_work_reports": pending_reports,
+        "pending_material_requests": pending_materials,
+        "pending_total": attendance["pending"] + pending_reports + pending_materials,
+        "hours_today_by_site": [
+            {
+                "site": row["site_location"] or "Unassigned",
+                "hours": round(row["hours"] or 0, 2),
+                "people": row["people"],
+            }
+            for row in hours_by_site
+        ],
+    }
+
+
+def employee_stats(user):
+    """Personal numbers for the employee dashboard."""
+    today = timezone.localdate()
+    week_start = today - timedelta(days=today.weekday())
+
+    hours = AttendanceDailySummary.objects.filter(user=user, date__gte=week_start).aggregate(
+        week=Sum("hours"),
+        today=Sum("hours", filter=Q(date=today)),
+    )
+    open_shift = (
+        Attendance.objects.filter(user=user, clock_in__isnull=False, clock_out__isnull=True)
+        .values("clock_in")
+        .first()
+    )
+    clocked_in_since = open_shift["clock_in"] if open_shift else None
+
+    return {
+        "clocked_in": open_shift is not None,
+        "clocked_in_since": clocked_in_since.isoformat() if clocked_in_since else None,
+        "hours_today": round(hours["today"] or 0, 2),
+        "hours_this_week": round(hours["week"] or 0, 2),
+        "pending_attendance": Attendance.objects.filter(user=user, status="pending").count(),
+        "pending_material_requests": MaterialRequest.objects.filter(user=user, status="pending").count(),
+    }
+
+
+def get_dashboard_stats(user):
+    """Role-aware stats for `user`, served from the cache when fresh."""
+    if user.role == "admin" or user.is_superuser:
+        return cache.get_or_set(_manager_key(None), manager_stats, STATS_CACHE_TTL)
+    if user.role == "supervisor":
+        return cache.get_or_set(_manager_key(user), lambda: manager_stats(user), STATS_CACHE_TTL)
+    return cache.get_or_set(_employee_key(user.pk), lambda: employee_stats(user), STATS_CACHE_TTL)
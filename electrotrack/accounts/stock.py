@@ -0,0 +1,223 @@
+"""
+Material stock: per-site Item balances and the StockLedger behind them.
+
+Approving a MaterialRequest line that is linked to an Item reserves its
+quantity at the requester's site (users without a site draw on the central
+store). Rejecting an approved line releases the reservation, and the
+storekeeper's issue turns it into a decrement of on_hand. Every movement
+locks the StockBalance rows it touches (select_for_update, in id order),
+changes them with F() expressions guarded by the same condition as the
+table's check constraint, and writes its ledger rows in the same
+transaction. Approvals that would reserve more than is available are
+refused and the line stays as it was. Lines without an Item are not stock
+items; their status changes without a movement.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .audit import record, record_many
+from .feed import publish
+from .models import Item, ItemAlias, MaterialRequest, StockBalance, StockLedger, normalize_item_name
+
+
+STATUS_ACTIONS = {"approved": "approve", "rejected": "reject"}
+
+
+class StockError(Exception):
+    """A movement that would take a balance below zero, or isn't allowed."""
+
+
+def items_by_name(names):
+    """{normalized name: Item} for those of `names` that are catalog items, by name or alias."""
+    wanted = {normalize_item_name(name) for name in names} - {""}
+    if not wanted:
+        return {}
+    found = {item.normalized_name: item for item in Item.objects.filter(normalized_name__in=wanted)}
+    for alias in ItemAlias.objects.filter(normalized_name__in=wanted - set(found)).select_related("item"):
+        found[alias.normalized_name] = alias.item
+    return found
+
+
+def _lock_balances(keys):
+    """{(item_id, site_id): StockBalance} for `keys`, locked; missing ones start at zero."""
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    def locked():
+        condition = Q()
+        for item_id, site_id in keys:
+            condition |= Q(item_id=item_id, site_id=site_id)
+        return {
+            (balance.item_id, balance.site_id): balance
+            for balance in StockBalance.objects.select_for_update().filter(condition).order_by("id")
+        }
+
+    balances = locked()
+    if len(balances) < len(keys):
+        StockBalance.objects.bulk_create(
+            [StockBalance(item_id=item_id, site_id=site_id) for item_id, site_id in keys - set(balances)],
+            ignore_conflicts=True,
+        )
+        balances = locked()
+    return balances
+
+
+def _apply(balance, on_hand=0, reserved=0):
+    """Add to a locked balance in SQL, refusing to break reserved <= on_hand or go negative."""
+    changed = StockBalance.objects.filter(
+        pk=balance.pk,
+        on_hand__gte=F("reserved") + reserved - on_hand,
+        reserved__gte=-reserved,
+    ).update(
+        on_hand=F("on_hand") + on_hand,
+        reserved=F("reserved") + reserved,
+        updated_at=timezone.now(),
+    )
+    if not changed:
+        raise StockError(f"not enough {balance.item} in stock")
+    balance.on_hand += on_hand
+    balance.reserved += reserved
+
+
+def _move(balance, kind, quantity, user, material_request_id=None, note=""):
+    return StockLedger(
+        item_id=balance.item_id,
+        site_id=balance.site_id,
+        kind=kind,
+        quantity=quantity,
+        on_hand=balance.on_hand,
+        reserved=balance.reserved,
+        material_request_id=material_request_id,
+        user=user,
+        note=note,
+    )
+
+
+def _reserved_sites(request_ids):
+    """{request id: site id} its current reservation was made at (users can change site)."""
+    return dict(
+        StockLedger.objects.filter(material_request_id__in=request_ids, kind="reserve")
+        .order_by("id")
+        .values_list("material_request_id", "site_id")
+    )
+
+
+# ============================================
+# MOVEMENTS
+# ============================================
+def receive(item, site, quantity, user, note=""):
+    """Book `quantity` of `item` into stock at `site` (None: central store)."""
+    with transaction.atomic():
+        balance = _lock_balances([(item.pk, site.pk if site else None)]).popitem()[1]
+        _apply(balance, on_hand=quantity)
+        _move(balance, "receipt", quantity, user, note=note).save()
+    return balance
+
+
+def set_request_status(queryset, new_status, user):
+    """
+    Move the MaterialRequest lines of `queryset` to `new_status`, reserving
+    stock for approvals (oldest lines first) and releasing what rejected
+    lines held. Returns (updated, refused), `refused` being
+    [(line, reason), ...] for lines left unchanged.
+    """
+    with transaction.atomic():
+        lines = list(
+            queryset.exclude(status=new_status)
+            .select_for_update(of=("self",))
+            .select_related("item", "user")
+            .only("id", "status", "quantity", "reserved", "issued_at", "item__name", "user__site")
+            .order_by("created_at", "id")
+        )
+        if new_status == "approved":
+            plain, refused, reserved = _reserve(lines, user)
+            MaterialRequest.objects.filter(pk__in=reserved).update(status=new_status, reserved=F("quantity"))
+        else:
+            plain, refused = _release(lines, user)
+            reserved = []
+        MaterialRequest.objects.filter(pk__in=plain).update(status=new_status, reserved=0)
+
+        changed = set(plain) | set(reserved)
+        publish(MaterialRequest, changed)
+        record_many(user, STATUS_ACTIONS.get(new_status, "edit"), MaterialRequest, [
+            (line.pk, {
+                "status": [line.status, new_status],
+                "reserved": [line.reserved, line.quantity if line.pk in reserved else 0],
+            })
+            for line in lines if line.pk in changed
+        ])
+    return len(plain) + len(reserved), refused
+
+
+def _reserve(lines, user):
+    """Reserve stock for `lines`; returns (non-stock ids, refused, reserved ids)."""
+    stock_lines = [line for line in lines if line.item_id]
+    balances = _lock_balances((line.item_id, line.user.site_id) for line in stock_lines)
+    available = {key: balance.available for key, balance in balances.items()}
+    totals, moves, reserved, refused = defaultdict(int), [], [], []
+
+    for line in stock_lines:
+        key = (line.item_id, line.user.site_id)
+        if line.quantity > available[key]:
+            refused.append((line, f"only {available[key]} {line.item.name} available"))
+            continue
+        available[key] -= line.quantity
+        totals[key] += line.quantity
+        balance = balances[key]
+        move = _move(balance, "reserve", line.quantity, user, line.pk)
+        move.reserved = balance.reserved + totals[key]
+        moves.append(move)
+        reserved.append(line.pk)
+
+    for key, total in totals.items():
+        _apply(balances[key], reserved=total)
+    StockLedger.objects.bulk_create(moves)
+    return [line.pk for line in lines if not line.item_id], refused, reserved
+
+
+def _release(lines, user):
+    """Release what `lines` hold; returns (ids to update, refused)."""
+    refused = [(line, "already issued") for line in lines if line.issued_at]
+    lines = [line for line in lines if not line.issued_at]
+    holding = [line for line in lines if line.reserved]
+
+    sites = _reserved_sites([line.pk for line in holding])
+    balances = _lock_balances((line.item_id, sites.get(line.pk)) for line in holding)
+    totals, moves = defaultdict(int), []
+    for line in holding:
+        key = (line.item_id, sites.get(line.pk))
+        totals[key] += line.reserved
+        balance = balances[key]
+        move = _move(balance, "release", line.reserved, user, line.pk)
+        move.reserved = balance.reserved - totals[key]
+        moves.append(move)
+
+    for key, total in totals.items():
+        _apply(balances[key], reserved=-total)
+    StockLedger.objects.bulk_create(moves)
+    return [line.pk for line in lines], refused
+
+
+def issue_request(pk, user):
+    """Hand out an approved line: its reservation leaves on_hand. Returns the line."""
+    with transaction.atomic():
+        line = (
+            MaterialRequest.objects.select_for_update(of=("self",))
+            .select_related("item")
+            .get(pk=pk)
+        )
+        if line.status != "approved" or not line.reserved or line.issued_at:
+            raise StockError("only approved lines holding stock can be issued")
+        site_id = _reserved_sites([line.pk]).get(line.pk)
+        balance = _lock_balances([(line.item_id, site_id)]).popitem()[1]
+        _apply(balance, on_hand=-line.reserved, reserved=-line.reserved)
+        _move(balance, "issue", line.reserved, user, line.pk).save()
+        record(user, "issue", line, reserved=(line.reserved, 0))
+        line.issued_at = timezone.now()
+        line.reserved = 0
+        line.save(update_fields=["issued_at", "reserved"])
+    return line
@@ -0,0 +1,127 @@
+"""
+Incremental maintenance of AttendanceDailySummary.
+
+Every write path that changes an Attendance row's hours or status collects
+the (user_id, day) keys it touched with `summary_keys()` and then calls
+`refresh_daily_summaries()`, which re-aggregates just those days in one
+query and upserts the result in one more. Days are Attendance.shift_date,
+the local date of `clock_in` at the user's site.
+
+Only closed shifts are counted: an open shift has no hours yet, so clocking
+in leaves the summaries alone and clocking out adds the shift. Refreshes
+lock the users' rows first, so two refreshes of the same day can't
+interleave their read and their write and leave the older totals behind.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Attendance, AttendanceDailySummary, shift_date
+
+User = get_user_model()
+
+SUMMARY_FIELDS = [
+    "site_location", "hours", "shifts",
+    "pending_count", "approved_count", "rejected_count", "updated_at",
+]
+
+
+def summary_keys(queryset):
+    """Distinct (user_id, day) pairs covered by an Attendance queryset."""
+    return set(
+        queryset.filter(shift_date__isnull=False)
+        .values_list("user_id", "shift_date")
+        .distinct()
+    )
+
+
+def record_key(record):
+    """The (user_id, day) summary key of a single Attendance instance."""
+    if record.clock_in is None:
+        return None
+    day = record.shift_date or shift_date(record.user.site, record.clock_in)
+    return record.user_id, day
+
+
+def _aggregate(queryset):
+    """Yield unsaved AttendanceDailySummary rows for an Attendance queryset."""
+    rows = (
+        queryset.filter(shift_date__isnull=False, clock_out__isnull=False)
+        .values("user_id", "shift_date", "user__site_location")
+        .annotate(
+            total=Coalesce(Sum("total_hours"), Value(0.0)),
+            shift_count=Count("id"),
+            pending=Count("id", filter=Q(status="pending")),
+            approved=Count("id", filter=Q(status="approved")),
+            rejected=Count("id", filter=Q(status="rejected")),
+        )
+        .order_by()
+    )
+    for row in rows:
+        yield AttendanceDailySummary(
+            user_id=row["user_id"],
+            date=row["shift_date"],
+            site_location=row["user__site_location"],
+            hours=round(row["total"], 2),
+            shifts=row["shift_count"],
+            pending_count=row["pending"],
+            approved_count=row["approved"],
+            rejected_count=row["rejected"],
+        )
+
+
+def _upsert(summaries):
+    AttendanceDailySummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=["user", "date"],
+        update_fields=SUMMARY_FIELDS,
+    )
+
+
+def _lock_users(user_ids):
+    """Row-lock the users (in id order, so concurrent refreshes can't deadlock)."""
+    list(User.objects.select_for_update().filter(pk__in=user_ids).order_by("pk").values_list("pk"))
+
+
+def refresh_daily_summaries(keys):
+    """
+    Recompute the summary rows for the given (user_id, day) keys. Call it
+    inside the transaction that changed the shifts, or after it committed.
+    """
+    keys = {key for key in keys if key is not None}
+    if not keys:
+        return 0
+
+    user_ids = {user_id for user_id, _ in keys}
+    days = [day for _, day in keys]
+    source = Attendance.objects.filter(
+        user_id__in=user_ids,
+        shift_date__gte=min(days),
+        shift_date__lte=max(days),
+    )
+
+    with transaction.atomic():
+        # Aggregate only once any other refresh of these users has committed.
+        _lock_users(user_ids)
+        summaries = [s for s in _aggregate(source) if (s.user_id, s.date) in keys]
+        _upsert(summaries)
+        # Days whose last shift moved away or was deleted.
+        stale = keys - {(s.user_id, s.date) for s in summaries}
+        if stale:
+            condition = Q()
+            for user_id, day in stale:
+                condition |= Q(user_id=user_id, date=day)
+            AttendanceDailySummary.objects.filter(condition).delete()
+    return len(summaries)
+
+
+def rebuild_daily_summaries(user_ids):
+    """Rebuild every summary row for a chunk of users from raw Attendance."""
+    with transaction.atomic():
+        _lock_users(user_ids)
+        summaries = list(_aggregate(Attendance.objects.filter(user_id__in=user_ids)))
+        AttendanceDailySummary.objects.filter(user_id__in=user_ids).delete()
+        AttendanceDailySummary.objects.bulk_create(summaries)
+    return len(summaries)
@@ -0,0 +1,74 @@
+"""
+Supervisor teams (User.supervisor / User.team).
+
+List views scope supervisors with a single join on the indexed
+User.supervisor column (`user__supervisor=request.user`). Object-level
+checks (approve / reject / edit one row) use `can_manage()`, which looks the
+owner up in the supervisor's team ids. Those are resolved once per request
+and kept in the session for TEAM_CACHE_TTL seconds; any change to a user
+bumps a generation number in the cache so stale sessions re-resolve.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+User = get_user_model()
+
+TEAM_CACHE_TTL = 300
+SESSION_KEY = "team"
+GENERATION_KEY = "teams:generation"
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = int(time.time())
+        cache.add(GENERATION_KEY, generation, None)
+        generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_teams():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        _generation()
+
+
+def team_ids(request):
+    """Ids of the users supervised by request.user."""
+    if hasattr(request, "_team_ids"):
+        return request._team_ids
+
+    user = request.user
+    generation = _generation()
+    cached = request.session.get(SESSION_KEY)
+    if (
+        cached
+        and cached["user"] == user.pk
+        and cached["generation"] == generation
+        and time.time() - cached["at"] < TEAM_CACHE_TTL
+    ):
+        ids = frozenset(cached["ids"])
+    else:
+        ids = frozenset(User.objects.filter(supervisor=user).values_list("id", flat=True))
+        request.session[SESSION_KEY] = {
+            "user": user.pk,
+            "ids": sorted(ids),
+            "generation": generation,
+            "at": time.time(),
+        }
+
+    request._team_ids = ids
+    return ids
+
+
+def can_manage(request, owner_id):
+    """Whether request.user may approve / edit a record owned by `owner_id`."""
+    user = request.user
+    if user.is_superuser or user.role == "admin":
+        return True
+    if user.role == "supervisor":
+        return owner_id in team_ids(request)
+    return False
@@ -1,3 +1,428 @@
+import json
+from datetime import UTC, date, datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .api import issue_token
+from .audit import history, record
+from .catalog import match, suggest
+from .models import (
+    Attendance, AttendanceDailySummary, IdempotencyKey, Item, ItemAlias,
+    MaterialRequest, Site, StockBalance, StockLedger, shift_date,
+)
+from .punches import Punch, sync_punches
+from .stock import receive, set_request_status
+from .summaries import rebuild_daily_summaries, record_key, refresh_daily_summaries
+from .timesheet import TimesheetRules, build_timesheets, compute, compute_reference, load_period
+from .user_import import UserImportError, import_users, read_rows
+
+User = get_user_model()
+
+
+# ============================================
+# STOCK
+# ============================================
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(name="Plant A", latitude=12.97, longitude=80.22)
+        self.storekeeper = User.objects.create_user("store", password="x", role="admin")
+        self.electrician = User.objects.create_user("sparky", password="x", site=self.site)
+        self.cable = Item.objects.create(name="Cable 2.5mm", unit="m")
+        receive(self.cable, self.site, 10, self.storekeeper)
+
+    def line(self, quantity):
+        return MaterialRequest.objects.create(
+            user=self.electrician, item_name=self.cable.name, item=self.cable, quantity=quantity, unit="m"
+        )
+
+    def balance(self):
+        return StockBalance.objects.get(item=self.cable, site=self.site)
+
+    def test_approval_reserves_stock(self):
+        line = self.line(6)
+        updated, refused = set_request_status(MaterialRequest.objects.filter(pk=line.pk), "approved", self.storekeeper)
+
+        self.assertEqual((updated, refused), (1, []))
+        line.refresh_from_db()
+        self.assertEqual((line.status, line.reserved), ("approved", 6))
+        balance = self.balance()
+        self.assertEqual((balance.on_hand, balance.reserved), (10, 6))
+        self.assertTrue(StockLedger.objects.filter(material_request=line, kind="reserve", quantity=6).exists())
+
+    def test_approval_beyond_available_is_refused(self):
+        first, second = self.line(6), self.line(6)
+        updated, refused = set_request_status(
+            MaterialRequest.objects.filter(pk__in=[first.pk, second.pk]), "approved", self.storekeeper
+        )
+
+        self.assertEqual(updated, 1)
+        self.assertEqual([line.pk for line, _ in refused], [second.pk])
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.reserved), ("pending", 0))
+        self.assertEqual(self.balance().reserved, 6)
+
+    def test_rejection_releases_reservation(self):
+        line = self.line(4)
+        set_request_status(MaterialRequest.objects.filter(pk=line.pk), "approved", self.storekeeper)
+        set_request_status(MaterialRequest.objects.filter(pk=line.pk), "rejected", self.storekeeper)
+
+        line.refresh_from_db()
+        self.assertEqual((line.status, line.reserved), ("rejected", 0))
+        self.assertEqual(self.balance().reserved, 0)
+
+
+# ============================================
+# CATALOG
+# ============================================
+class CatalogLookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bulb = Item.objects.create(name="LED Bulb 9W", unit="pcs")
+        self.bulb_12w = Item.objects.create(name="LED Bulb 12W", unit="pcs")
+        self.cable = Item.objects.create(name="Cable 2.5mm copper", unit="m")
+        self.cable_4mm = Item.objects.create(name="Cable 4mm copper", unit="m")
+        ItemAlias.objects.create(item=self.bulb, name="9w led")
+
+    def names(self, query, **kwargs):
+        return [result["name"] for result in suggest(query, **kwargs)]
+
+    def test_suggest(self):
+        self.assertEqual(self.names("led bu"), ["LED Bulb 12W", "LED Bulb 9W"])
+        self.assertEqual(self.names("led bulb 9w"), ["LED Bulb 9W"])
+        self.assertEqual(self.names("9w"), ["LED Bulb 9W"])
+        self.assertEqual(self.names("cabel coper"), ["Cable 2.5mm copper", "Cable 4mm copper"])
+        self.assertEqual(self.names("led bu", limit=1), ["LED Bulb 12W"])
+
+    def test_match(self):
+        self.assertEqual(match("9 W LED bulbs"), (self.bulb.pk, "exact"))
+        self.assertEqual(match("LED bulb 9 watt"), (self.bulb.pk, "fuzzy"))
+        self.assertEqual(match("cable 2.5mm coper"), (self.cable.pk, "fuzzy"))
+        self.assertEqual(match("cable copper"), (None, "ambiguous"))
+        self.assertEqual(match("paint"), (None, "unmatched"))
+
+    def test_new_item_is_seen_on_next_lookup(self):
+        self.assertEqual(match("white paint"), (None, "unmatched"))
+        paint = Item.objects.create(name="Paint white", unit="l")
+        self.assertEqual(match("white paint"), (paint.pk, "exact"))
+
+
+# ============================================
+# ATTENDANCE
+# ============================================
+class OneOpenShiftTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("sparky", password="x")
+
+    def test_second_open_shift_is_rejected(self):
+        Attendance.objects.create(user=self.user, clock_in=timezone.now())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Attendance.objects.create(user=self.user, clock_in=timezone.now())
+
+    def test_closed_shifts_do_not_count(self):
+        now = timezone.now()
+        Attendance.objects.create(user=self.user, clock_in=now - timedelta(hours=9), clock_out=now - timedelta(hours=1))
+        Attendance.objects.create(user=self.user, clock_in=now)
+        self.assertEqual(Attendance.objects.filter(user=self.user).count(), 2)
+
+
+class PunchSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("sparky", password="x")
+        self.now = timezone.now().replace(microsecond=0)
+
+    def punch(self, client_id, action, hours_ago):
+        return Punch(client_id, action, self.now - timedelta(hours=hours_ago))
+
+    def test_pair_is_applied_once(self):
+        punches = [self.punch("in-1", "clock_in", 9), self.punch("out-1", "clock_out", 1.3333)]
+        results, open_shift = sync_punches(self.user, punches)
+
+        self.assertEqual([result["status"] for result in results], ["applied", "applied"])
+        self.assertIsNone(open_shift)
+        shift = Attendance.objects.get(user=self.user)
+        self.assertEqual(shift.total_hours, 7.67)
+
+        results, _ = sync_punches(self.user, punches)
+        self.assertEqual([result["status"] for result in results], ["duplicate", "duplicate"])
+        self.assertEqual(Attendance.objects.filter(user=self.user).count(), 1)
+
+    def test_older_pair_is_applied_beside_live_shift(self):
+        live = Attendance.objects.create(user=self.user, clock_in=self.now - timedelta(hours=2))
+        results, open_shift = sync_punches(
+            self.user, [self.punch("in-1", "clock_in", 30), self.punch("out-1", "clock_out", 22)]
+        )
+
+        self.assertEqual([result["status"] for result in results], ["applied", "applied"])
+        self.assertEqual(open_shift, live)
+        self.assertEqual(Attendance.objects.filter(user=self.user).count(), 2)
+
+    def test_pair_overlapping_a_closed_shift_is_rejected(self):
+        Attendance.objects.create(
+            user=self.user, clock_in=self.now - timedelta(hours=10), clock_out=self.now - timedelta(hours=5)
+        )
+        results, _ = sync_punches(
+            self.user, [self.punch("in-1", "clock_in", 12), self.punch("out-1", "clock_out", 8)]
+        )
+
+        self.assertEqual([result.get("reason") for result in results], ["overlaps_shift", "overlaps_shift"])
+        self.assertEqual(Attendance.objects.filter(user=self.user).count(), 1)
+
+
+class ClockOutPositionTests(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="Plant A", latitude=12.97, longitude=80.22, radius_m=200)
+        self.user = User.objects.create_user("sparky", password="x", site=site)
+        self.client.force_login(self.user)
+
+    def punch(self, action, latitude="", longitude=""):
+        self.client.post(
+            reverse("accounts:attendance"), {"action": action, "latitude": latitude, "longitude": longitude}
+        )
+
+    def test_clock_out_keeps_clock_in_position(self):
+        self.punch("clock_in", "12.97", "80.22")
+        self.punch("clock_out")
+
+        shift = Attendance.objects.get(user=self.user)
+        self.assertEqual((shift.latitude, shift.longitude, shift.out_of_fence), (12.97, 80.22, False))
+        self.assertTrue(shift.geohash)
+        self.assertEqual((shift.clock_out_latitude, shift.clock_out_longitude), (None, None))
+
+    def test_invalid_coordinates_are_ignored(self):
+        self.punch("clock_in", "nan", "80.22")
+        self.punch("clock_out", "95", "80.22")
+
+        shift = Attendance.objects.get(user=self.user)
+        self.assertEqual((shift.latitude, shift.clock_out_latitude), (None, None))
+
+
+class ShiftDateTests(TestCase):
+    def setUp(self):
+        self.kolkata = Site.objects.create(name="Chennai", latitude=13.08, longitude=80.27, timezone="Asia/Kolkata")
+        self.new_york = Site.objects.create(name="Queens", latitude=40.73, longitude=-73.79, timezone="America/New_York")
+        self.user = User.objects.create_user("sparky", password="x", site=self.kolkata)
+
+    def test_date_is_local_to_the_site(self):
+        late_evening_utc = datetime(2026, 3, 1, 20, tzinfo=UTC)
+        early_morning_utc = datetime(2026, 3, 2, 3, tzinfo=UTC)
+
+        self.assertEqual(shift_date(self.kolkata, late_evening_utc), date(2026, 3, 2))
+        self.assertEqual(shift_date(self.new_york, early_morning_utc), date(2026, 3, 1))
+        self.assertEqual(shift_date(None, late_evening_utc), date(2026, 3, 1))
+        shift = Attendance.objects.create(user=self.user, clock_in=late_evening_utc)
+        self.assertEqual(shift.shift_date, date(2026, 3, 2))
+
+    def test_moving_site_does_not_redate_shifts(self):
+        shift = Attendance.objects.create(user=self.user, clock_in=datetime(2026, 3, 1, 20, tzinfo=UTC))
+        self.user.site = self.new_york
+        self.user.save()
+
+        shift = Attendance.objects.select_related("user__site").get(pk=shift.pk)
+        shift.status = "approved"
+        shift.save()
+        self.assertEqual(shift.shift_date, date(2026, 3, 2))
+
+        shift.clock_in += timedelta(hours=1)
+        shift.save(update_fields=["clock_in"])
+        shift.refresh_from_db()
+        self.assertEqual(shift.shift_date, date(2026, 3, 1))
+
+
+class DailySummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("sparky", password="x", site_location="Plant A")
+        self.day = date(2026, 3, 2)
+
+    def shift(self, start_hour, hours, status="pending"):
+        clock_in = timezone.make_aware(datetime.combine(self.day, datetime.min.time())) + timedelta(hours=start_hour)
+        return Attendance.objects.create(
+            user=self.user, clock_in=clock_in, clock_out=clock_in + timedelta(hours=hours),
+            total_hours=hours, status=status,
+        )
+
+    def summary(self):
+        return AttendanceDailySummary.objects.filter(user=self.user, date=self.day).values_list(
+            "site_location", "hours", "shifts", "pending_count", "approved_count", "rejected_count"
+        ).first()
+
+    def test_refresh_counts_closed_shifts(self):
+        first, second = self.shift(6, 3), self.shift(10, 4.5, status="approved")
+        Attendance.objects.create(user=self.user, clock_in=first.clock_out + timedelta(hours=8))
+        refresh_daily_summaries([record_key(first), record_key(second)])
+        self.assertEqual(self.summary(), ("Plant A", 7.5, 2, 1, 1, 0))
+
+        Attendance.objects.filter(pk=second.pk).update(status="rejected")
+        refresh_daily_summaries([record_key(second)])
+        self.assertEqual(self.summary(), ("Plant A", 7.5, 2, 1, 0, 1))
+
+        keys = [record_key(first), record_key(second)]
+        Attendance.objects.filter(pk__in=[first.pk, second.pk]).delete()
+        refresh_daily_summaries(keys)
+        self.assertIsNone(self.summary())
+
+    def test_rebuild_matches_refresh(self):
+        shifts = [self.shift(6, 3), self.shift(10, 4.5, status="approved")]
+        refresh_daily_summaries([record_key(shift) for shift in shifts])
+        refreshed = self.summary()
+        AttendanceDailySummary.objects.all().delete()
+
+        self.assertEqual(rebuild_daily_summaries([self.user.pk]), 1)
+        self.assertEqual(self.summary(), refreshed)
+
+
+# ============================================
+# API
+# ============================================
+class IdempotentReplayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("sparky", password="x")
+        self.headers = {"Authorization": f"Token {issue_token(self.user)}", "Idempotency-Key": "tap-1"}
+
+    def post(self, name):
+        return self.client.post(reverse(name), data="{}", content_type="application/json", headers=self.headers)
+
+    def test_retry_replays_first_response(self):
+        first = self.post("accounts:api_clock_in")
+        retry = self.post("accounts:api_clock_in")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(json.loads(retry.content), json.loads(first.content))
+        self.assertEqual(Attendance.objects.filter(user=self.user).count(), 1)
+
+    def test_key_reused_for_another_endpoint(self):
+        self.post("accounts:api_clock_in")
+        self.assertEqual(self.post("accounts:api_clock_out").status_code, 422)
+
+    def test_expired_key_is_a_new_request(self):
+        self.post("accounts:api_clock_in")
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+        response = self.post("accounts:api_clock_in")
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+
+
+# ============================================
+# AUDIT
+# ============================================
+class AuditSavepointTests(TestCase):
+    def test_rolled_back_savepoint_drops_its_events(self):
+        actor = User.objects.create_user("boss", password="x", role="admin")
+        user = User.objects.create_user("sparky", password="x")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                record(actor, "edit", user, role=("electrician", "supervisor"))
+                try:
+                    with transaction.atomic():
+                        record(actor, "edit", user, site=(None, 1))
+                        raise IntegrityError
+                except IntegrityError:
+                    pass
+
+        self.assertEqual([event.changes for event in history(user)], [{"role": ["electrician", "supervisor"]}])
+
+
+# ============================================
+# USER IMPORT
+# ============================================
+class UserImportValidationTests(TestCase):
+    def test_unknown_column(self):
+        with self.assertRaises(UserImportError):
+            read_rows("username,nickname\nsparky,S\n")
+
+    def test_any_bad_row_imports_nothing(self):
+        rows = read_rows(
+            "username,email,role,site,supervisor\n"
+            "ok,ok@example.com,electrician,,\n"
+            "bad-email,not-an-email,,,\n"
+            "ok,,,,\n"
+            "nosite,,,Nowhere,\n"
+            "noboss,,,,ghost\n"
+            "boss,,wizard,,\n"
+        )
+        result = import_users(rows)
+
+        self.assertEqual([number for number, _ in result.errors], [3, 4, 5, 6, 7])
+        self.assertFalse(User.objects.exists())
+
+    def test_supervisor_loop_is_rejected(self):
+        result = import_users(read_rows("username,supervisor\na,b\nb,a\n"))
+
+        self.assertEqual(len(result.errors), 2)
+        self.assertFalse(User.objects.exists())
+
+    def test_reimport_keeps_existing_passwords(self):
+        import_users(read_rows("username,password\nsparky,first-pass\n"), workers=1)
+        result = import_users(read_rows("username,password\nsparky,second-pass\n"), workers=1)
+
+        self.assertEqual(result.unchanged, 1)
+        self.assertTrue(User.objects.get(username="sparky").check_password("first-pass"))
+
+
+# ============================================
+# TIMESHEETS
+# ============================================
+class TimesheetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("sparky", password="x")
+        self.start, self.end = date(2026, 3, 2), date(2026, 3, 8)
+
+    def shift(self, day, start_hour, hours):
+        clock_in = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=start_hour)
+        return Attendance.objects.create(
+            user=self.user, clock_in=clock_in, clock_out=clock_in + timedelta(hours=hours), status="approved"
+        )
+
+    def day_off(self, day, kind):
+        return Attendance.objects.create(user=self.user, shift_date=day, attendance_type=kind, status="approved")
+
+    def totals(self):
+        columns = load_period(self.start, self.end)
+        totals = compute(columns, TimesheetRules())
+        reference = compute_reference(columns, TimesheetRules())
+        self.assertEqual(totals.keys(), reference.keys())
+        for user_id, values in reference.items():
+            for field, value in values.items():
+                self.assertAlmostEqual(totals[user_id][field], value, places=6, msg=field)
+        return totals[self.user.pk]
+
+    def test_overtime_night_and_breaks(self):
+        self.shift(self.start, 8, 10)                   # 9.5 worked after the break, 1.5 over the day
+        self.shift(date(2026, 3, 3), 22, 8)             # 7.5 worked, all 8 hours in the night window
+        for offset in range(2, 7):
+            self.shift(self.start + timedelta(days=offset), 7, 8.5)    # 8 worked each
+
+        totals = self.totals()
+        self.assertEqual(totals["shifts"], 7)
+        self.assertAlmostEqual(totals["worked_hours"], 57)
+        self.assertAlmostEqual(totals["night_hours"], 8)
+        # 55.5 regular hours in the week: 7.5 more over the weekly 48.
+        self.assertAlmostEqual(totals["regular_hours"], 48)
+        self.assertAlmostEqual(totals["overtime_hours"], 1.5 + 7.5)
+        self.assertAlmostEqual(totals["paid_hours"], 48 + 9 * 1.5 + 8 * 0.25)
+
+        self.assertEqual(build_timesheets(self.start, self.end, TimesheetRules()), 1)
+        self.assertEqual(self.user.timesheets.get().paid_hours, 63.5)
+
+    def test_leave_rows_without_clock_times(self):
+        self.shift(self.start, 8, 4)
+        leave = self.day_off(date(2026, 3, 3), "leave")
+        self.day_off(date(2026, 3, 4), "absent")
+
+        leave.refresh_from_db()
+        self.assertEqual(leave.shift_date, date(2026, 3, 3))
+        totals = self.totals()
+        self.assertEqual((totals["shifts"], totals["leave_days"], totals["absent_days"]), (1, 1, 1))
+        self.assertAlmostEqual(totals["paid_hours"], 4 + 8)
 
-# Create your tests here.
+        # Neither counts as an open shift.
+        Attendance.objects.create(user=self.user, clock_in=timezone.now())
@@ -0,0 +1,282 @@
+"""
+Timesheets: per-employee pay-period totals from approved attendance.
+
+`load_period()` reads a period's approved Attendance rows in one
+values_list pass into columns; clock times come back as epoch seconds
+computed in SQL, so no datetime objects are built. `compute()` applies TimesheetRules to all
+of them at once with NumPy; `compute_reference()` does the same row by row
+in plain Python (the correctness check for `manage.py benchmark_timesheet`,
+and the fallback when NumPy is not installed). `build_timesheets()` upserts
+the totals into TimesheetEntry.
+
+Per shift, worked hours are clock_out - clock_in, less an unpaid break on
+long shifts, and night hours are the part of the shift inside the night
+window in the site's local time. Overtime is worked time over the daily
+threshold (per shift_date) plus the remaining regular time over the weekly
+threshold (Monday weeks, clipped to the period). Leave rows are paid
+leave_hours each; absent rows are only counted. Neither has clock times:
+they are dated by the shift_date they were created with.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+import math
+import zoneinfo
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .expressions import EpochSeconds
+from .models import Attendance, TimesheetEntry
+
+DAY = 86400
+TOTAL_FIELDS = [
+    "shifts", "worked_hours", "regular_hours", "overtime_hours",
+    "night_hours", "leave_days", "absent_days", "paid_hours",
+]
+
+
+@dataclass(frozen=True)
+class TimesheetRules:
+    daily_overtime_after: float = 8.0
+    weekly_overtime_after: float = 48.0
+    overtime_multiplier: float = 1.5
+    night_start: int = 22           # local hour the night window opens
+    night_end: int = 6              # ... and closes (next day if earlier)
+    night_premium: float = 0.25     # extra paid hours per night hour
+    break_after: float = 6.0        # shifts longer than this (hours) ...
+    break_hours: float = 0.5        # ... lose an unpaid break
+    leave_hours: float = 8.0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(**getattr(settings, "TIMESHEET_RULES", {}))
+
+    def night_window(self, day_start):
+        """(start, end) of the night window opening on the day starting at `day_start`."""
+        end_day = day_start + DAY if self.night_end <= self.night_start else day_start
+        return day_start + self.night_start * 3600, end_day + self.night_end * 3600
+
+
+@dataclass
+class PeriodColumns:
+    """A pay period's attendance, one list per column (row i across all of them)."""
+    start: object
+    end: object
+    user_ids: list
+    days: list          # shift_date ordinals
+    starts: list        # clock_in, local seconds since the epoch (None if missing)
+    ends: list          # clock_out, same
+    types: list         # attendance_type
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    @property
+    def first_monday(self):
+        return self.start.toordinal() - self.start.weekday()
+
+
+def load_period(start, end, queryset=None):
+    """Approved attendance with start <= shift_date <= end, as PeriodColumns."""
+    rows = (queryset if queryset is not None else Attendance.objects.all()).filter(
+        status="approved", shift_date__gte=start, shift_date__lte=end,
+    ).order_by().annotate(
+        start_seconds=EpochSeconds("clock_in"), end_seconds=EpochSeconds("clock_out"),
+    ).values_list(
+        "user_id", "shift_date", "start_seconds", "end_seconds", "attendance_type", "user__site__timezone",
+    )
+
+    # UTC offset per (zone, day): the night window is in site local time.
+    offsets = {}
+    default_zone = timezone.get_default_timezone()
+
+    def offset(zone_name, day):
+        key = (zone_name, day)
+        if key not in offsets:
+            zone = zoneinfo.ZoneInfo(zone_name) if zone_name else default_zone
+            noon = datetime.combine(day, time(12))
+            offsets[key] = zone.utcoffset(noon).total_seconds()
+        return offsets[key]
+
+    columns = PeriodColumns(start, end, [], [], [], [], [])
+    for user_id, day, clock_in, clock_out, kind, zone_name in rows.iterator(chunk_size=20_000):
+        shift = offset(zone_name, day)
+        columns.user_ids.append(user_id)
+        columns.days.append(day.toordinal())
+        columns.starts.append(clock_in + shift if clock_in is not None else None)
+        columns.ends.append(clock_out + shift if clock_out is not None else None)
+        columns.types.append(kind)
+    return columns
+
+
+def _paid(totals, rules):
+    return (
+        totals["regular_hours"]
+        + totals["overtime_hours"] * rules.overtime_multiplier
+        + totals["night_hours"] * rules.night_premium
+        + totals["leave_days"] * rules.leave_hours
+    )
+
+
+# ============================================
+# REFERENCE (plain Python)
+# ============================================
+def compute_reference(columns, rules):
+    """{user_id: {field: value}} computed one row at a time."""
+    totals = {}
+    daily = defaultdict(float)
+
+    for user_id, day, start, end, kind in zip(
+        columns.user_ids, columns.days, columns.starts, columns.ends, columns.types
+    ):
+        entry = totals.setdefault(user_id, dict.fromkeys(TOTAL_FIELDS, 0))
+        if kind == "leave":
+            entry["leave_days"] += 1
+            continue
+        if kind == "absent":
+            entry["absent_days"] += 1
+            continue
+        if start is None or end is None or end <= start:
+            continue
+
+        hours = (end - start) / 3600
+        worked = max(hours - rules.break_hours, 0) if hours > rules.break_after else hours
+        night = 0
+        for k in range(math.floor(start / DAY) - 1, math.floor(end / DAY) + 1):
+            window_start, window_end = rules.night_window(k * DAY)
+            night += max(min(end, window_end) - max(start, window_start), 0)
+
+        entry["shifts"] += 1
+        entry["worked_hours"] += worked
+        entry["night_hours"] += night / 3600
+        daily[user_id, day] += worked
+
+    weekly = defaultdict(float)
+    for (user_id, day), worked in daily.items():
+        overtime = max(worked - rules.daily_overtime_after, 0)
+        totals[user_id]["overtime_hours"] += overtime
+        weekly[user_id, (day - columns.first_monday) // 7] += worked - overtime
+    for (user_id, _), regular in weekly.items():
+        overtime = max(regular - rules.weekly_overtime_after, 0)
+        totals[user_id]["overtime_hours"] += overtime
+        totals[user_id]["regular_hours"] += regular - overtime
+
+    for entry in totals.values():
+        entry["paid_hours"] = _paid(entry, rules)
+    return totals
+
+
+# ============================================
+# VECTORIZED (NumPy)
+# ============================================
+def compute(columns, rules):
+    """{user_id: {field: value}}, every step over whole columns at once."""
+    try:
+        import numpy as np
+    except ImportError:
+        return compute_reference(columns, rules)
+    if not len(columns):
+        return {}
+
+    users, user_index = np.unique(np.asarray(columns.user_ids, dtype=np.int64), return_inverse=True)
+    days = np.asarray(columns.days, dtype=np.int64)
+    starts = np.array(columns.starts, dtype=float)  # None -> nan
+    ends = np.array(columns.ends, dtype=float)
+    types = np.asarray(columns.types)
+    n_users = len(users)
+
+    leave = np.bincount(user_index[types == "leave"], minlength=n_users)
+    absent = np.bincount(user_index[types == "absent"], minlength=n_users)
+
+    with np.errstate(invalid="ignore"):
+        worked_shift = (types != "leave") & (types != "absent") & (ends > starts)
+    starts, ends = starts[worked_shift], ends[worked_shift]
+    shift_users, shift_days = user_index[worked_shift], days[worked_shift]
+
+    hours = (ends - starts) / 3600
+    worked = np.where(hours > rules.break_after, np.maximum(hours - rules.break_hours, 0), hours)
+
+    night = np.zeros(len(starts))
+    if len(starts):
+        first = np.floor(starts / DAY) - 1
+        span = int((np.floor(ends / DAY) - first).max())
+        for offset in range(span + 1):
+            window_start, window_end = rules.night_window((first + offset) * DAY)
+            night += np.clip(np.minimum(ends, window_end) - np.maximum(starts, window_start), 0, None)
+
+    # (user, day) and (user, week) grids; a month for 10k users is 310k cells.
+    first_day = columns.start.toordinal()
+    n_days = columns.end.toordinal() - first_day + 1
+    daily = np.bincount(
+        shift_users * n_days + (shift_days - first_day), weights=worked, minlength=n_users * n_days
+    ).reshape(n_users, n_days)
+    daily_overtime = np.clip(daily - rules.daily_overtime_after, 0, None)
+    regular_daily = daily - daily_overtime
+
+    week_of_day = (first_day + np.arange(n_days) - columns.first_monday) // 7
+    weekly = np.stack(
+        [regular_daily[:, week_of_day == week].sum(axis=1) for week in np.unique(week_of_day)], axis=1
+    )
+    weekly_overtime = np.clip(weekly - rules.weekly_overtime_after, 0, None)
+
+    totals = {
+        "shifts": np.bincount(shift_users, minlength=n_users),
+        "worked_hours": np.bincount(shift_users, weights=worked, minlength=n_users),
+        "regular_hours": (weekly - weekly_overtime).sum(axis=1),
+        "overtime_hours": daily_overtime.sum(axis=1) + weekly_overtime.sum(axis=1),
+        "night_hours": np.bincount(shift_users, weights=night, minlength=n_users) / 3600,
+        "leave_days": leave,
+        "absent_days": absent,
+    }
+    totals["paid_hours"] = _paid(totals, rules)
+
+    columns_out = [totals[field].tolist() for field in TOTAL_FIELDS]
+    return {
+        user_id: dict(zip(TOTAL_FIELDS, values))
+        for user_id, *values in zip(users.tolist(), *columns_out)
+    }
+
+
+# ============================================
+# WRITING
+# ============================================
+def build_timesheets(start, end, rules=None, queryset=None):
+    """Compute and upsert TimesheetEntry rows for the period; returns how many were written."""
+    rules = rules or TimesheetRules.from_settings()
+    totals = compute(load_period(start, end, queryset), rules)
+    entries = [
+        TimesheetEntry(
+            user_id=user_id,
+            period_start=start,
+            period_end=end,
+            **{
+                field: value if field in ("shifts", "leave_days", "absent_days") else round(value, 2)
+                for field, value in values.items()
+            },
+        )
+        for user_id, values in totals.items()
+    ]
+    started = timezone.now()
+    with transaction.atomic():
+        TimesheetEntry.objects.bulk_create(
+            entries,
+            batch_size=2_000,
+            update_conflicts=True,
+            unique_fields=["user", "period_start", "period_end"],
+            update_fields=TOTAL_FIELDS + ["computed_at"],
+        )
+        if queryset is None:
+            # Entries not rewritten above: their last approved row went away.
+            TimesheetEntry.objects.filter(
+                period_start=start, period_end=end, computed_at__lt=started
+            ).delete()
+    return len(entries)
+
+
+def month_period(day):
+    """(first, last) day of the month containing `day`."""
+    first = day.replace(day=1)
+    last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return first, last
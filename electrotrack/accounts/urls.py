@@ -2,6 +2,7 @@
 
 from django.urls import path
 
+from .api import api_clock_in, api_clock_out, api_sync_punches
 from .views import (
     # Authentication
     login_view,
@@ -10,12 +11,15 @@ from .views import (
     # Dashboards
     dashboard_view,
     employee_dashboard,
+    dashboard_stats,
 
     # User Management
     users_list,
     user_add_view,
     user_edit_view,
     user_delete_view,
+    users_import,
+    users_bulk_update,
 
     # Attendance
     attendance_view,
@@ -24,18 +28,43 @@ from .views import (
 
     approve_attendance,
     reject_attendance,
+    attendance_bulk_status,
 
     # Work Reports
     work_reports,
     work_report_add,
     work_report_approve,
     work_report_reject,
+    work_report_bulk_status,
 
     # Material Requests
     material_requests,
     material_request_add,
     material_approve,
     material_reject,
+    material_bulk_status,
+    material_item_suggest,
+
+    # Stock
+    stock_view,
+    stock_issue,
+
+    # Exports
+    attendance_export,
+    work_reports_export,
+    material_requests_export,
+
+    # Search
+    search_records,
+
+    # Sites
+    site_nearby,
+
+    # Live feed
+    live_feed,
+
+    # Metrics
+    request_metrics,
 )
 
 app_name = "accounts"
@@ -52,6 +81,7 @@ urlpatterns = [
     # -------------------------
     path("dashboard/", dashboard_view, name="dashboard"),  # Admin / Supervisor
     path("employee-dashboard/", employee_dashboard, name="employee_dashboard"),  # Employee
+    path("dashboard/stats/", dashboard_stats, name="dashboard_stats"),  # JSON for both
 
     # -------------------------
     # USER MANAGEMENT
@@ -60,6 +90,8 @@ urlpatterns = [
     path("users/add/", user_add_view, name="add_user"),
     path("users/edit/<int:user_id>/", user_edit_view, name="edit_user"),
     path("users/delete/<int:user_id>/", user_delete_view, name="delete_user"),
+    path("users/import/", users_import, name="users_import"),
+    path("users/bulk/", users_bulk_update, name="users_bulk_update"),
 
     # -------------------------
     # ATTENDANCE
@@ -70,6 +102,7 @@ urlpatterns = [
 
     path("attendance/approve/<int:pk>/", approve_attendance, name="approve_attendance"),
     path("attendance/reject/<int:pk>/", reject_attendance, name="reject_attendance"),
+    path("attendance/bulk-status/", attendance_bulk_status, name="attendance_bulk_status"),
 
     # -------------------------
     # WORK REPORTS
@@ -79,6 +112,7 @@ urlpatterns = [
 
     path("work-reports/approve/<int:pk>/", work_report_approve, name="work_report_approve"),
     path("work-reports/reject/<int:pk>/", work_report_reject, name="work_report_reject"),
+    path("work-reports/bulk-status/", work_report_bulk_status, name="work_report_bulk_status"),
 
     # -------------------------
     # MATERIAL REQUESTS
@@ -87,4 +121,46 @@ urlpatterns = [
     path("material-requests/add/",material_request_add, name="material_request_add"),
     path("material-requests/approve/<int:pk>/", material_approve, name="material_approve"),
     path("material-requests/reject/<int:pk>/", material_reject, name="material_reject"),
+    path("material-requests/bulk-status/", material_bulk_status, name="material_bulk_status"),
+    path("material-requests/items/", material_item_suggest, name="material_item_suggest"),  # typeahead JSON
+
+    # -------------------------
+    # EXPORTS (CSV, ?format=xlsx for Excel)
+    # -------------------------
+    path("attendance/export/", attendance_export, name="attendance_export"),
+    path("work-reports/export/", work_reports_export, name="work_reports_export"),
+    path("material-requests/export/", material_requests_export, name="material_requests_export"),
+
+    # -------------------------
+    # STOCK (storekeeper)
+    # -------------------------
+    path("stock/", stock_view, name="stock"),
+    path("stock/issue/<int:pk>/", stock_issue, name="stock_issue"),
+
+    # -------------------------
+    # SEARCH (JSON)
+    # -------------------------
+    path("search/", search_records, name="search"),
+
+    # -------------------------
+    # SITES (geofence)
+    # -------------------------
+    path("sites/<int:pk>/nearby/", site_nearby, name="site_nearby"),
+
+    # -------------------------
+    # LIVE FEED (server-sent events, served under ASGI)
+    # -------------------------
+    path("live/<str:page>/", live_feed, name="live_feed"),
+
+    # -------------------------
+    # METRICS (Prometheus text, admins only)
+    # -------------------------
+    path("metrics/", request_metrics, name="metrics"),
+
+    # -------------------------
+    # JSON API (async, token auth)
+    # -------------------------
+    path("api/attendance/clock-in/", api_clock_in, name="api_clock_in"),
+    path("api/attendance/clock-out/", api_clock_out, name="api_clock_out"),
+    path("api/attendance/sync/", api_sync_punches, name="api_sync_punches"),
 ]
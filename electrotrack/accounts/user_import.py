@@ -0,0 +1,332 @@
+"""
+Bulk user import / update (manage.py import_users and the Import button on
+the Users page) and bulk reassignment of role / site.
+
+A file is CSV with a header row, or JSON: a list of objects. Columns:
+
+  username        required; the key rows are matched on
+  email, first_name, last_name, role, site_location
+  site            a Site name
+  supervisor      a username, already stored or imported in the same file
+  password        hashed in a process pool (accounts.passwords); new users
+                  without one get an unusable password until it is reset.
+                  Existing users keep theirs unless reset_passwords is set,
+                  so re-importing a roster doesn't reset everyone.
+
+Blank cells leave an existing user's value alone. A supervisor chain that
+would loop back to a user (a supervises b, b supervises a) is an error. Every row is checked
+before anything is written; if any row has a problem nothing is imported.
+Otherwise new users go in with bulk_create and changed ones with
+bulk_update, in one transaction, with the edits in the audit log.
+bulk_create / bulk_update / update() send no signals, so the team cache
+is invalidated here.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .audit import record_many
+from .models import Site
+from .passwords import hash_passwords
+from .teams import invalidate_teams
+
+User = get_user_model()
+
+COLUMNS = (
+    "username", "email", "first_name", "last_name", "role", "site_location",
+    "site", "supervisor", "password",
+)
+# Plain fields copied from the row; site / supervisor / password are resolved.
+TEXT_FIELDS = ("email", "first_name", "last_name", "role", "site_location")
+REASSIGN_FIELDS = ("role", "site_location", "site")
+BATCH_SIZE = 2_000  # rows per INSERT / UPDATE and usernames per lookup
+
+
+class UserImportError(ValueError):
+    """The file can't be read as users at all (bad format or columns)."""
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0                            # existing users, when updates are off
+    errors: list = field(default_factory=list)  # (row number, message)
+
+
+def read_rows(data, name=""):
+    """
+    [(row number, {column: value}), ...] from the bytes or text of a CSV or
+    JSON file; JSON if `name` ends in .json or the content starts with "[".
+    Row numbers are CSV line numbers (the header is line 1) or 1-based JSON
+    positions.
+    """
+    if isinstance(data, bytes):
+        try:
+            data = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise UserImportError("The file is not UTF-8 text.")
+
+    if name.lower().endswith(".json") or data.lstrip().startswith("["):
+        try:
+            entries = json.loads(data)
+        except ValueError as error:
+            raise UserImportError(f"Invalid JSON: {error}.")
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise UserImportError("JSON must be a list of objects.")
+        rows = [(number, entry) for number, entry in enumerate(entries, start=1)]
+        columns = {key for entry in entries for key in entry}
+    else:
+        reader = csv.DictReader(io.StringIO(data))
+        if reader.fieldnames:
+            reader.fieldnames = [column.strip().lower() for column in reader.fieldnames]
+        rows = [(number, row) for number, row in enumerate(reader, start=2)]
+        columns = set(reader.fieldnames or ())
+
+    if "username" not in columns:
+        raise UserImportError("A username column is required.")
+    unknown = columns - set(COLUMNS)
+    if unknown:
+        raise UserImportError(f"Unknown column(s): {', '.join(sorted(unknown))}.")
+    return rows
+
+
+def _clean(row):
+    """(non-blank values of `row`, None) or (None, what is wrong with it)."""
+    values = {
+        key: str(value).strip() for key, value in row.items()
+        if key in COLUMNS and value is not None and str(value).strip()
+    }
+    username = values.get("username")
+    if not username:
+        return None, "username is required"
+    try:
+        User.username_validator(username)
+    except ValidationError:
+        return None, f"invalid username {username!r}"
+
+    for name in ("username", "email", "first_name", "last_name", "site_location"):
+        limit = User._meta.get_field(name).max_length
+        if len(values.get(name, "")) > limit:
+            return None, f"{name} is longer than {limit} characters"
+    if "email" in values:
+        try:
+            validate_email(values["email"])
+        except ValidationError:
+            return None, f"invalid email {values['email']!r}"
+    if "role" in values:
+        values["role"] = values["role"].lower()
+        if values["role"] not in dict(User.ROLE_CHOICES):
+            return None, f"unknown role {values['role']!r}"
+    return values, None
+
+
+def _by_username(usernames):
+    """{username: User} for the stored ones among `usernames`, BATCH_SIZE per query."""
+    usernames = list(usernames)
+    found = {}
+    for i in range(0, len(usernames), BATCH_SIZE):
+        found.update(
+            (user.username, user) for user in User.objects.filter(username__in=usernames[i:i + BATCH_SIZE])
+        )
+    return found
+
+
+def _supervisor_cycles(cleaned):
+    """
+    [(row number, problem), ...] for rows whose supervisor chain, with the
+    file's supervisors in place of the stored ones, leads back to the row.
+    """
+    boss_of = {values["username"]: values["supervisor"] for _, values in cleaned if "supervisor" in values}
+    # Follow the chains out of the file through the stored supervisors.
+    todo = set(boss_of.values()) - set(boss_of)
+    while todo:
+        todo = list(todo)
+        stored = {}
+        for i in range(0, len(todo), BATCH_SIZE):
+            stored.update(
+                User.objects.filter(username__in=todo[i:i + BATCH_SIZE]).values_list("username", "supervisor__username")
+            )
+        boss_of.update((name, stored.get(name)) for name in todo)
+        todo = {boss for boss in stored.values() if boss and boss not in boss_of}
+
+    errors = []
+    for number, values in cleaned:
+        username = values["username"]
+        if values.get("supervisor") in (None, username):
+            continue
+        chain, seen = [username], {username}
+        boss = boss_of[username]
+        while boss and boss not in seen:
+            chain.append(boss)
+            seen.add(boss)
+            boss = boss_of.get(boss)
+        if boss == username:
+            errors.append((number, f"supervisor chain loops: {' -> '.join(chain + [username])}"))
+    return errors
+
+
+def import_users(rows, actor=None, update=True, dry_run=False, workers=None, reset_passwords=False):
+    """
+    Create or update the users in `rows` (from read_rows). With update=False
+    rows for existing usernames are skipped; existing users' passwords are
+    only replaced with reset_passwords=True. Returns an ImportResult; when it
+    has errors nothing was written.
+    """
+    result = ImportResult()
+    cleaned = []
+    first_row = {}
+    for number, row in rows:
+        values, problem = _clean(row)
+        if problem is None and values["username"] in first_row:
+            problem = f"username {values['username']!r} is also on row {first_row[values['username']]}"
+        if problem:
+            result.errors.append((number, problem))
+            continue
+        first_row[values["username"]] = number
+        cleaned.append((number, values))
+
+    existing = _by_username(first_row)
+    site_names = {values["site"] for _, values in cleaned if "site" in values}
+    sites = dict(Site.objects.filter(name__in=site_names).values_list("name", "id"))
+    supervisors = {values["supervisor"] for _, values in cleaned if "supervisor" in values}
+    stored_supervisors = {
+        name: user.pk for name, user in existing.items() if name in supervisors
+    }
+    stored_supervisors.update(
+        (name, user.pk) for name, user in _by_username(supervisors - set(existing) - set(first_row)).items()
+    )
+    for number, values in cleaned:
+        if "site" in values and values["site"] not in sites:
+            result.errors.append((number, f"unknown site {values['site']!r}"))
+        supervisor = values.get("supervisor")
+        if supervisor and supervisor not in stored_supervisors and supervisor not in first_row:
+            result.errors.append((number, f"unknown supervisor {supervisor!r}"))
+        elif supervisor == values["username"]:
+            result.errors.append((number, "a user can't supervise themselves"))
+    if not result.errors:
+        result.errors = _supervisor_cycles(
+            [(number, values) for number, values in cleaned if update or values["username"] not in existing]
+        )
+    if result.errors:
+        result.errors.sort()
+        return result
+
+    # Work out the new rows and the changes before hashing anything.
+    new_users, changed, passwords = [], [], []
+    pending = []  # (user, supervisor username): supervisors created by this import
+    for _, values in cleaned:
+        user = existing.get(values["username"])
+        if user is not None and not update:
+            result.skipped += 1
+            continue
+        is_new = user is None
+        if is_new:
+            user = User(username=values["username"])
+        changes = {}
+        for name in TEXT_FIELDS:
+            if name in values and getattr(user, name) != values[name]:
+                changes[name] = [getattr(user, name), values[name]]
+                setattr(user, name, values[name])
+        if "site" in values and user.site_id != sites[values["site"]]:
+            changes["site"] = [user.site_id, sites[values["site"]]]
+            user.site_id = sites[values["site"]]
+        if "supervisor" in values:
+            supervisor_id = stored_supervisors.get(values["supervisor"])
+            if supervisor_id is None:
+                # A new user in this file; its id is known once it is inserted.
+                pending.append((user, values["supervisor"]))
+                changes["supervisor"] = [user.supervisor_id, None]
+            elif user.supervisor_id != supervisor_id:
+                changes["supervisor"] = [user.supervisor_id, supervisor_id]
+                user.supervisor_id = supervisor_id
+        if "password" in values and (is_new or reset_passwords):
+            passwords.append((user, values["password"]))
+            changes["password"] = "changed"
+
+        if is_new:
+            new_users.append(user)
+        elif changes:
+            changed.append((user, changes))
+        else:
+            result.unchanged += 1
+
+    result.created = len(new_users)
+    result.updated = len(changed)
+    if dry_run:
+        return result
+
+    # Hash outside the transaction: this is the slow part.
+    hashed = hash_passwords([password for _, password in passwords], workers)
+    for (user, _), password in zip(passwords, hashed):
+        user.password = password
+    for user in new_users:
+        if not user.password:
+            user.set_unusable_password()
+
+    with transaction.atomic():
+        User.objects.bulk_create(new_users, batch_size=BATCH_SIZE)
+        # Not every backend returns the new ids from a bulk INSERT.
+        created_ids = {
+            name: user.pk for name, user in _by_username(user.username for user in new_users).items()
+        }
+        for user in new_users:
+            user.pk = created_ids[user.username]
+
+        changes_of = {id(user): changes for user, changes in changed}
+        for user, supervisor in pending:
+            user.supervisor_id = created_ids[supervisor]
+            if id(user) in changes_of:
+                changes_of[id(user)]["supervisor"][1] = user.supervisor_id
+        late = [user for user, _ in pending if id(user) not in changes_of]
+        if late:
+            User.objects.bulk_update(late, ["supervisor"], batch_size=BATCH_SIZE)
+
+        fields = sorted({name for _, changes in changed for name in changes})
+        if fields:
+            User.objects.bulk_update([user for user, _ in changed], fields, batch_size=BATCH_SIZE)
+
+        record_many(actor, "create", User, [
+            (user.pk, {"username": [None, user.username], "role": [None, user.role]}) for user in new_users
+        ])
+        record_many(actor, "edit", User, [(user.pk, changes) for user, changes in changed])
+
+    invalidate_teams()
+    return result
+
+
+def reassign_users(users, actor=None, **values):
+    """
+    Set role, site_location and/or site (a Site or None) on every user in the
+    queryset `users` with one UPDATE. Returns the number of users changed.
+    """
+    unknown = set(values) - set(REASSIGN_FIELDS)
+    if unknown:
+        raise UserImportError(f"Can't reassign {', '.join(sorted(unknown))}.")
+    if "role" in values and values["role"] not in dict(User.ROLE_CHOICES):
+        raise UserImportError(f"Unknown role {values['role']!r}.")
+    if not values:
+        return 0
+
+    columns = [User._meta.get_field(name).attname for name in values]
+    new = [getattr(value, "pk", value) for value in values.values()]
+    with transaction.atomic():
+        # Old values for the audit log, read under lock; then one UPDATE.
+        rows = list(users.select_for_update().values_list("pk", *columns))
+        updated = users.update(**values)
+        record_many(actor, "edit", User, [
+            (row[0], {
+                name: [old, value] for name, old, value in zip(values, row[1:], new) if old != value
+            })
+            for row in rows if list(row[1:]) != new
+        ])
+    if updated:
+        invalidate_teams()
+    return updated
@@ -4,13 +4,69 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.utils import timezone
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_POST
+from django.db import IntegrityError, transaction
+from django.db.models import DateTimeField, F, Value
+from asgiref.sync import sync_to_async
+from datetime import date, datetime, time, timedelta
+from itertools import zip_longest
+import json
+
+
+from .models import (
+    Attendance, WorkReport, MaterialRequest, MaterialIndent, Site,
+    Item, StockBalance, StockLedger, normalize_item_name,
+)
+from .audit import record, record_many
+from .catalog import suggest
+from . import feed
+from .expressions import HoursBetween
+from .geofence import attendance_near, clean_location, fence_fields, haversine_m
+from .imaging import enqueue_photo
+from .metrics import render_prometheus
+from .stats import get_dashboard_stats, invalidate_dashboard_stats, invalidate_review_stats
+from .search import search
+from .stock import StockError, issue_request, items_by_name, receive, set_request_status
+from .summaries import record_key, refresh_daily_summaries, summary_keys
+from .teams import can_manage
+from .user_import import UserImportError, import_users, read_rows, reassign_users
+from .exports import (
+    ATTENDANCE_EXPORT,
+    WORK_REPORT_EXPORT,
+    MATERIAL_REQUEST_EXPORT,
+    export_response,
+)
+from .forms import WorkReportForm, MaterialRequestForm, LoginForm
 
+User = get_user_model()
 
+# Rows per page on the attendance management listing.
+ATTENDANCE_PAGE_SIZE = 50
+# Columns accounts/_attendance_row.html reads.
+ATTENDANCE_ROW_FIELDS = (
+    "id", "clock_in", "clock_out", "total_hours", "status",
+    "latitude", "longitude", "out_of_fence", "shift_date", "user__username",
+)
 
-from .models import Attendance, WorkReport, MaterialRequest
-from .forms import WorkReportForm, MaterialRequestForm, LoginForm
+# Bulk approve/reject: POSTed action -> status written to the rows.
+BULK_STATUS_ACTIONS = {"approve": "approved", "reject": "rejected"}
+# Statuses a "filtered" bulk approve / reject may touch, per model; work
+# reports are reviewed from in_progress / completed as well as pending.
+AWAITING_REVIEW = {
+    Attendance: ("pending",),
+    MaterialRequest: ("pending",),
+    WorkReport: ("in_progress", "completed", "pending"),
+}
+# Ids per UPDATE in bulk approve / reject (below SQLite's bound-parameter limit).
+BULK_UPDATE_BATCH = 5_000
 
-User = get_user_model()
+# Row problems listed as messages after a failed user import (the rest are counted).
+IMPORT_ERRORS_SHOWN = 10
+
+TEAM_ONLY_MESSAGE = "⚠️ You can only manage records of your own team."
 
 
 # ============================================
@@ -32,6 +88,8 @@ def login_view(request):
 
             if user.is_superuser or user_role in ['admin', 'supervisor']:
                 return redirect('accounts:dashboard')
+            elif user_role == 'storekeeper':
+                return redirect('accounts:stock')
             else:
                 return redirect('accounts:employee_dashboard')
         else:
@@ -65,13 +123,23 @@ def employee_dashboard(request):
     return render(request, "accounts/employee_dashboard.html")
 
 
+@login_required
+def dashboard_stats(request):
+    """JSON numbers for both dashboards (role-aware, cached briefly)."""
+    return JsonResponse(get_dashboard_stats(request.user))
+
+
 # ============================================
 # USERS MANAGEMENT
 # ============================================
 @login_required
 def users_list(request):
     users = User.objects.all()
-    return render(request, "accounts/users.html", {"users": users})
+    return render(request, "accounts/users.html", {
+        "users": users,
+        "role_choices": User.ROLE_CHOICES,
+        "sites": Site.objects.order_by("name"),
+    })
 
 
 @login_required
@@ -93,6 +161,7 @@ def user_add_view(request):
         if hasattr(user, "site_location"):
             user.site_location = site_location  # ✅ save it
         user.save()
+        record(request.user, "create", user, username=(None, user.username), role=(None, user.role))
 
         messages.success(request, "✅ User created successfully.")
         return redirect("accounts:users")
@@ -110,6 +179,7 @@ def user_edit_view(request, user_id):
         password = request.POST.get("password")
         role = request.POST.get("role")
 
+        before = {"username": user.username, "email": user.email, "role": user.role}
         user.username = name
         user.email = email
         if password:
@@ -117,6 +187,12 @@ def user_edit_view(request, user_id):
         if hasattr(user, "role"):
             user.role = role
         user.save()
+        changes = {
+            field: (old, getattr(user, field)) for field, old in before.items() if getattr(user, field) != old
+        }
+        if password:
+            changes["password"] = "changed"
+        record(request.user, "edit", user, **changes)
 
         messages.success(request, "✅ User updated successfully.")
         return redirect("accounts:users")
@@ -127,11 +203,92 @@ def user_edit_view(request, user_id):
 @login_required
 def user_delete_view(request, user_id):
     user = get_object_or_404(User, id=user_id)
-    user.delete()
+    with transaction.atomic():
+        record(request.user, "delete", user, username=(user.username, None), role=(user.role, None))
+        user.delete()
     messages.success(request, "🗑️ User deleted successfully.")
     return redirect("accounts:users")
 
 
+@login_required
+@require_POST
+def users_import(request):
+    """
+    Admin upload of a CSV / JSON file of users (see accounts.user_import).
+    Runs in the request, so very large files with passwords are better
+    imported with `manage.py import_users`.
+    """
+    is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+    if request.user.role != "admin":
+        return HttpResponseForbidden("Admins only.")
+
+    upload = request.FILES.get("file")
+    try:
+        if upload is None:
+            raise UserImportError("Choose a file to import.")
+        rows = read_rows(upload.read(), upload.name)
+    except UserImportError as error:
+        if is_ajax:
+            return JsonResponse({"success": False, "message": str(error)}, status=400)
+        messages.error(request, f"⚠️ {error}")
+        return redirect("accounts:users")
+
+    result = import_users(
+        rows, actor=request.user, update=bool(request.POST.get("update")),
+        reset_passwords=bool(request.POST.get("reset_passwords")),
+    )
+    if is_ajax:
+        return JsonResponse({
+            "success": not result.errors,
+            "created": result.created,
+            "updated": result.updated,
+            "unchanged": result.unchanged,
+            "skipped": result.skipped,
+            "errors": [{"row": number, "message": problem} for number, problem in result.errors],
+        }, status=400 if result.errors else 200)
+    if result.errors:
+        messages.error(request, f"⚠️ Nothing imported: {len(result.errors)} row(s) have problems.")
+        for number, problem in result.errors[:IMPORT_ERRORS_SHOWN]:
+            messages.error(request, f"Row {number}: {problem}")
+    else:
+        messages.success(
+            request,
+            f"✅ {result.created} user(s) created, {result.updated} updated, "
+            f"{result.unchanged} unchanged, {result.skipped} skipped.",
+        )
+    return redirect("accounts:users")
+
+
+@login_required
+@require_POST
+def users_bulk_update(request):
+    """Set role / site_location / site of the selected users (`ids`) with one UPDATE."""
+    is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+    if request.user.role != "admin":
+        return HttpResponseForbidden("Admins only.")
+
+    values = {}
+    if request.POST.get("role"):
+        values["role"] = request.POST["role"]
+    if request.POST.get("site_location"):
+        values["site_location"] = request.POST["site_location"].strip()
+    if request.POST.get("site"):
+        values["site"] = get_object_or_404(Site, pk=request.POST["site"])
+    ids = [int(pk) for pk in request.POST.getlist("ids") if pk.isdigit()]
+    try:
+        updated = reassign_users(User.objects.filter(pk__in=ids), actor=request.user, **values)
+    except UserImportError as error:
+        if is_ajax:
+            return JsonResponse({"success": False, "message": str(error)}, status=400)
+        messages.error(request, f"⚠️ {error}")
+        return redirect("accounts:users")
+
+    if is_ajax:
+        return JsonResponse({"success": True, "updated": updated})
+    messages.success(request, f"✅ {updated} user(s) updated.")
+    return redirect("accounts:users")
+
+
 # ============================================
 # ATTENDANCE
 # ============================================
@@ -150,48 +307,60 @@ def attendance_view(request):
         
 
         # --------- Get location safely ----------
-        latitude = request.POST.get("latitude")
-        longitude = request.POST.get("longitude")
-
         try:
-            latitude = float(latitude) if latitude else None
-            longitude = float(longitude) if longitude else None
-        except:
-            latitude = None
-            longitude = None
+            latitude, longitude = clean_location(request.POST.get("latitude"), request.POST.get("longitude"))
+        except ValueError:
+            latitude = longitude = None
 
         # --------- Clock IN ----------
         if action == "clock_in":
-            Attendance.objects.create(
-                user=user,
-                clock_in=timezone.now(),
-                latitude=latitude,
-                longitude=longitude,
-                status="pending",
-            )
+            # The one-open-shift constraint makes a double submit a no-op.
+            try:
+                with transaction.atomic():
+                    Attendance.objects.create(
+                        user=user,
+                        clock_in=timezone.now(),
+                        latitude=latitude,
+                        longitude=longitude,
+                        status="pending",
+                        **fence_fields(user.site, latitude, longitude),
+                    )
+            except IntegrityError:
+                messages.warning(request, "⚠️ You are already clocked in.")
+                return redirect("accounts:attendance")
+
             messages.success(request, "✅ Clock-in recorded successfully!")
             return redirect("accounts:attendance")
 
         # --------- Clock OUT ----------
         elif action == "clock_out":
-            try:
-                record = Attendance.objects.filter(
-                    user=user, clock_out__isnull=True
-                ).latest("id")
-
-                record.clock_out = timezone.now()
-                record.latitude = latitude
-                record.longitude = longitude
-
-                # --------- Calculate Total Hours ----------
-                if record.clock_in:
-                    duration = record.clock_out - record.clock_in
-                    record.total_hours = round(duration.total_seconds() / 3600, 2)
-
-                record.save()
+            # One SELECT for the open shift (its id and summary day), then a
+            # conditional UPDATE by pk; total hours are computed in SQL.
+            now = timezone.now()
+            shift = (
+                Attendance.objects.filter(user=user, clock_in__isnull=False, clock_out__isnull=True)
+                .only("id", "user_id", "clock_in", "shift_date")
+                .first()
+            )
+            closed = 0
+            if shift is not None:
+                with transaction.atomic():
+                    closed = Attendance.objects.filter(pk=shift.pk, clock_out__isnull=True).update(
+                        clock_out=now,
+                        clock_out_latitude=latitude,
+                        clock_out_longitude=longitude,
+                        total_hours=HoursBetween(
+                            Value(now, output_field=DateTimeField()), F("clock_in")
+                        ),
+                    )
+                    if closed:
+                        feed.publish(Attendance, [shift.pk])
+                        refresh_daily_summaries([record_key(shift)])
+
+            if closed:
+                invalidate_dashboard_stats(user.pk)
                 messages.success(request, "✅ Clock-out recorded successfully!")
-
-            except Attendance.DoesNotExist:
+            else:
                 messages.warning(request, "⚠️ No active clock-in found!")
 
             return redirect("accounts:attendance")
@@ -214,34 +383,232 @@ def update_hours(request, pk):
         except:
             hours = 0
 
-        record = Attendance.objects.get(id=pk)
-        record.total_hours = hours
-        record.save()
+        attendance = Attendance.objects.get(id=pk)
+        if not can_manage(request, attendance.user_id):
+            messages.error(request, TEAM_ONLY_MESSAGE)
+            return redirect("accounts:attendance_manage")
+        old_hours = attendance.total_hours
+        attendance.total_hours = hours
+        attendance.save(update_fields=["total_hours"])
+        record(request.user, "edit", attendance, total_hours=(old_hours, hours))
+        refresh_daily_summaries([record_key(attendance)])
+        invalidate_review_stats(request.user, attendance.user_id)
 
         messages.success(request, "Hours updated successfully!")
         return redirect("accounts:attendance_manage")
 
 
 
+def _parse_date(value):
+    """Parse a YYYY-MM-DD query param, returning None for blank/invalid input."""
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _apply_list_filters(params, queryset, datetime_field):
+    """
+    Narrow a list queryset by the shared status, site, date_from and date_to
+    params (request.GET on list pages, request.POST on bulk actions). Dates
+    are turned into an aware datetime range on `datetime_field` so the filter
+    stays index friendly; a DateField (Attendance.shift_date) is compared
+    directly.
+    """
+    status = params.get("status")
+    site = params.get("site")
+    date_from = _parse_date(params.get("date_from"))
+    date_to = _parse_date(params.get("date_to"))
+
+    if status:
+        queryset = queryset.filter(status=status)
+    if site:
+        queryset = queryset.filter(user__site_location=site)
+    if queryset.model._meta.get_field(datetime_field).get_internal_type() == "DateField":
+        if date_from:
+            queryset = queryset.filter(**{f"{datetime_field}__gte": date_from})
+        if date_to:
+            queryset = queryset.filter(**{f"{datetime_field}__lte": date_to})
+        return queryset
+    if date_from:
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+        queryset = queryset.filter(**{f"{datetime_field}__gte": start})
+    if date_to:
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+        queryset = queryset.filter(**{f"{datetime_field}__lt": end})
+    return queryset
+
+
+def _site_choices():
+    """Distinct, non-empty User.site_location values for the filter dropdowns."""
+    return (
+        User.objects.exclude(site_location__isnull=True)
+        .exclude(site_location="")
+        .order_by("site_location")
+        .values_list("site_location", flat=True)
+        .distinct()
+    )
+
+
+def _bulk_status_update(request, queryset, datetime_field, redirect_to):
+    """
+    Apply approve/reject to many rows with a single UPDATE.
+
+    POST params:
+      action  -- "approve" or "reject"
+      scope   -- "selected" (default): rows listed in `ids`
+                 "filtered": every row awaiting review (AWAITING_REVIEW) that
+                 matches the site/date_from/date_to params, e.g. all pending
+                 for a site on a day
+    Returns JSON ({"success", "updated"}) for AJAX callers, otherwise redirects
+    back to the list with a message carrying the count.
+    """
+    is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+    new_status = BULK_STATUS_ACTIONS.get(request.POST.get("action"))
+
+    if request.user.role not in ["admin", "supervisor"] or new_status is None:
+        if is_ajax:
+            return JsonResponse({"success": False, "message": "Invalid bulk action."}, status=400)
+        messages.error(request, "⚠️ Invalid bulk action.")
+        return redirect(redirect_to)
+
+    if request.POST.get("scope") == "filtered":
+        # Only rows still awaiting review, whatever status filter was posted.
+        params = request.POST.copy()
+        params.pop("status", None)
+        queryset = _apply_list_filters(params, queryset, datetime_field)
+        queryset = queryset.filter(status__in=AWAITING_REVIEW[queryset.model])
+    else:
+        ids = [int(pk) for pk in request.POST.getlist("ids") if pk.isdigit()]
+        queryset = queryset.filter(pk__in=ids)
+
+    queryset = queryset.exclude(status=new_status)
+    refused = []
+    if queryset.model is MaterialRequest:
+        # Approvals reserve stock; lines that would overdraw it are skipped.
+        owners = set(queryset.values_list("user_id", flat=True))
+        try:
+            updated, refused = set_request_status(queryset, new_status, request.user)
+        except StockError as error:
+            # Another approval took the stock first; nothing was changed.
+            if is_ajax:
+                return JsonResponse({"success": False, "message": f"Stock changed: {error}."}, status=409)
+            messages.error(request, f"⚠️ Stock changed: {error}. Nothing was updated.")
+            return redirect(redirect_to)
+    else:
+        # Attendance feeds the daily summaries; collect the touched days first.
+        keys = summary_keys(queryset) if queryset.model is Attendance else set()
+        with transaction.atomic():
+            # Read the rows (and their old status, for the audit log) under
+            # lock, then update exactly those.
+            rows = list(queryset.select_for_update(of=("self",)).values_list("pk", "status", "user_id"))
+            ids = [pk for pk, _, _ in rows]
+            owners = {user_id for _, _, user_id in rows}
+            updated = sum(
+                queryset.model.objects.filter(pk__in=ids[i:i + BULK_UPDATE_BATCH]).update(status=new_status)
+                for i in range(0, len(ids), BULK_UPDATE_BATCH)
+            )
+            record_many(request.user, request.POST["action"], queryset.model, [
+                (pk, {"status": [old, new_status]}) for pk, old, _ in rows
+            ])
+            feed.publish(queryset.model, ids)
+            refresh_daily_summaries(keys)
+    # .update() sends no signals; drop the employees' and managers' stats here.
+    invalidate_review_stats(request.user, *owners)
+
+    if is_ajax:
+        return JsonResponse({
+            "success": True, "updated": updated, "refused": len(refused), "status": new_status,
+        })
+    messages.success(request, f"✅ {updated} record(s) marked {new_status}.")
+    if refused:
+        messages.warning(request, f"⚠️ {len(refused)} record(s) skipped: not enough stock.")
+    return redirect(redirect_to)
+
+
+def _attendance_scope(user):
+    """Attendance rows a manager may see; None for employees."""
+    if user.role == "admin":
+        return Attendance.objects.all()
+    elif user.role == "supervisor":
+        return Attendance.objects.filter(user__supervisor=user)
+    return None
+
+
+def _work_report_scope(user):
+    """Admin sees all reports, supervisors their team's; employees their own."""
+    if user.role == "admin":
+        return WorkReport.objects.all()
+    elif user.role == "supervisor":
+        return WorkReport.objects.filter(user__supervisor=user)
+    return WorkReport.objects.filter(user=user)
+
+
+def _material_request_scope(user):
+    """Admin sees all material requests, supervisors their team's; employees their own."""
+    if user.role == "admin":
+        return MaterialRequest.objects.all()
+    elif user.role == "supervisor":
+        return MaterialRequest.objects.filter(user__supervisor=user)
+    return MaterialRequest.objects.filter(user=user)
+
+
 @login_required
 def attendance_manage(request):
-    """Admin/Supervisor view"""
-    if request.user.role == "admin":
-        attendance_list = Attendance.objects.all().order_by("-id")
-    elif request.user.role == "supervisor":
-        attendance_list = Attendance.objects.filter(supervisor=request.user).order_by("-id")
-    else:
+    """Admin/Supervisor view, keyset-paginated on id (newest first)."""
+    attendance_list = _attendance_scope(request.user)
+    if attendance_list is None:
         # employees should not access this
         return redirect("accounts:attendance")
 
-    return render(request, "accounts/attendance_manage.html", {"attendance_list": attendance_list})
+    attendance_list = _apply_list_filters(request.GET, attendance_list, "shift_date")
+
+    # ?before=<id> is the cursor: the page holds rows with a smaller id.
+    # Seeking on the primary key keeps every page O(page size), unlike OFFSET.
+    try:
+        before = int(request.GET.get("before", ""))
+    except ValueError:
+        before = None
+    if before:
+        attendance_list = attendance_list.filter(id__lt=before)
+
+    rows = list(
+        attendance_list.select_related("user")
+        .only(*ATTENDANCE_ROW_FIELDS)
+        .order_by("-id")[:ATTENDANCE_PAGE_SIZE + 1]
+    )
+    has_next = len(rows) > ATTENDANCE_PAGE_SIZE
+    rows = rows[:ATTENDANCE_PAGE_SIZE]
+
+    # Keep the active filters on the "older" link, minus the old cursor.
+    params = request.GET.copy()
+    params.pop("before", None)
+    if has_next:
+        params["before"] = rows[-1].id
+
+    return render(request, "accounts/attendance_manage.html", {
+        "attendance_list": rows,
+        "next_query": params.urlencode() if has_next else "",
+        "is_first_page": not before,
+        "filters": request.GET,
+        "status_choices": Attendance.STATUS_CHOICES,
+        "sites": _site_choices(),
+        "feed_cursor": _feed_cursor(request),
+    })
 
 
 @login_required
 def approve_attendance(request, pk):
     attendance = get_object_or_404(Attendance, pk=pk)
+    if not can_manage(request, attendance.user_id):
+        messages.error(request, TEAM_ONLY_MESSAGE)
+        return redirect("accounts:attendance_manage")
+    old_status = attendance.status
     attendance.status = "approved"
     attendance.save()
+    record(request.user, "approve", attendance, status=(old_status, "approved"))
+    refresh_daily_summaries([record_key(attendance)])
+    invalidate_review_stats(request.user, attendance.user_id)
     messages.success(request, "✅ Attendance approved.")
     return redirect("accounts:attendance_manage")
 
@@ -249,26 +616,45 @@ def approve_attendance(request, pk):
 @login_required
 def reject_attendance(request, pk):
     attendance = get_object_or_404(Attendance, pk=pk)
+    if not can_manage(request, attendance.user_id):
+        messages.error(request, TEAM_ONLY_MESSAGE)
+        return redirect("accounts:attendance_manage")
+    old_status = attendance.status
     attendance.status = "rejected"
     attendance.save()
+    record(request.user, "reject", attendance, status=(old_status, "rejected"))
+    refresh_daily_summaries([record_key(attendance)])
+    invalidate_review_stats(request.user, attendance.user_id)
     messages.warning(request, "❌ Attendance rejected.")
     return redirect("accounts:attendance_manage")
 
 
+@login_required
+@require_POST
+def attendance_bulk_status(request):
+    # Employees get None here and are turned away by _bulk_status_update.
+    scope = _attendance_scope(request.user)
+    return _bulk_status_update(
+        request, Attendance.objects.none() if scope is None else scope,
+        "shift_date", "accounts:attendance_manage"
+    )
+
+
 # ============================================
 # WORK REPORTS
 # ============================================
 @login_required
 def work_reports(request):
     """Admin and supervisors can see all reports; employees see their own."""
-    if request.user.role == "admin":
-        reports = WorkReport.objects.all().order_by("-created_at")
-    elif request.user.role == "supervisor":
-        reports = WorkReport.objects.filter(user__supervisor=request.user).order_by("-created_at")
-    else:
-        reports = WorkReport.objects.filter(user=request.user).order_by("-created_at")
-
-    return render(request, "accounts/work_reports.html", {"reports": reports})
+    reports = _work_report_scope(request.user).order_by("-created_at")
+    reports = _apply_list_filters(request.GET, reports, "created_at").select_related("user")
+
+    return render(request, "accounts/work_reports.html", {
+        "reports": reports,
+        "filters": request.GET,
+        "status_choices": WorkReport.STATUS_CHOICES,
+        "sites": _site_choices(),
+    })
 
 
 
@@ -291,9 +677,6 @@ def work_report_add(request):
         if form.is_valid():
             report = form.save(commit=False)
             report.user = request.user
-            # optionally assign supervisor/branch if you store that:
-            if hasattr(request.user, "supervisor"):
-                report.supervisor = request.user.supervisor
             report.save()
 
             # If AJAX request, return JSON success
@@ -319,8 +702,14 @@ def work_report_add(request):
 @login_required
 def work_report_approve(request, pk):
     report = get_object_or_404(WorkReport, pk=pk)
+    if not can_manage(request, report.user_id):
+        messages.error(request, TEAM_ONLY_MESSAGE)
+        return redirect("accounts:work_reports")
+    old_status = report.status
     report.status = "approved"
     report.save()
+    record(request.user, "approve", report, status=(old_status, "approved"))
+    invalidate_review_stats(request.user, report.user_id)
     messages.success(request, "✅ Work report approved.")
     return redirect("accounts:work_reports")
 
@@ -328,12 +717,26 @@ def work_report_approve(request, pk):
 @login_required
 def work_report_reject(request, pk):
     report = get_object_or_404(WorkReport, pk=pk)
+    if not can_manage(request, report.user_id):
+        messages.error(request, TEAM_ONLY_MESSAGE)
+        return redirect("accounts:work_reports")
+    old_status = report.status
     report.status = "rejected"
     report.save()
+    record(request.user, "reject", report, status=(old_status, "rejected"))
+    invalidate_review_stats(request.user, report.user_id)
     messages.warning(request, "❌ Work report rejected.")
     return redirect("accounts:work_reports")
 
 
+@login_required
+@require_POST
+def work_report_bulk_status(request):
+    return _bulk_status_update(
+        request, _work_report_scope(request.user), "created_at", "accounts:work_reports"
+    )
+
+
 # ============================================
 # MATERIAL REQUESTS
 # ============================================
@@ -352,31 +755,51 @@ def material_request_add(request):
         # ✅ Extract multiple rows from form (no [] in key names)
         item_names = request.POST.getlist("item_name")
         quantities = request.POST.getlist("quantity")
-        units = request.POST.get("unit")
+        units = request.POST.getlist("unit")
         description = request.POST.get("description")
         photo = request.FILES.get("photo")  # ✅ handle uploaded photo
 
+        lines = []
+        for item_name, quantity, unit in zip_longest(item_names, quantities, units, fillvalue=""):
+            item_name = item_name.strip()
+            try:
+                quantity = int(quantity)
+            except ValueError:
+                continue
+            if item_name and quantity > 0:
+                lines.append((item_name, quantity, unit))
+
         # ✅ Validation
-        if not item_names or not quantities:
+        if not lines:
             messages.error(request, "⚠️ Please enter at least one material item.")
             return redirect("accounts:material_request_add")
 
-        # ✅ Save each material item as a separate entry
-        for i in range(len(item_names)):
-            item_name = item_names[i].strip()
-            quantity = quantities[i]
-            unit = units[i] if i < len(units) else ""
+        # Lines naming a catalog item (or one of its aliases) are linked to
+        # it, so demand adds up per item and approval reserves stock.
+        items = items_by_name(item_name for item_name, _, _ in lines)
 
-            if item_name and quantity:
-                MaterialRequest.objects.create(
+        # ✅ One indent (photo written once) + all lines in one INSERT
+        with transaction.atomic():
+            indent = MaterialIndent.objects.create(
+                user=user, description=description, photo=photo
+            )
+            created = MaterialRequest.objects.bulk_create([
+                MaterialRequest(
+                    indent=indent,
                     user=user,
-                    item_name=f"{item_name}" ,
+                    item_name=item_name,
+                    item=items.get(normalize_item_name(item_name)),
                     quantity=quantity,
-                    unit=unit,
+                    unit=unit or getattr(items.get(normalize_item_name(item_name)), "unit", ""),
                     description=description,
-                    photo=photo,  # ✅ attach photo
-                    status="pending"
+                    photo=indent.photo.name if indent.photo else None,  # ✅ shared file
+                    status="pending",
                 )
+                for item_name, quantity, unit in lines
+            ])
+            feed.publish(MaterialRequest, [line.pk for line in created])
+            # ✅ Compress + thumbnail in the background after commit
+            enqueue_photo(indent.photo.name if indent.photo else None)
 
         messages.success(request, "✅ Material request submitted successfully!")
         return redirect("accounts:employee_dashboard")
@@ -393,27 +816,366 @@ def material_request_add(request):
 @login_required
 def material_requests(request):
     """Admin & Supervisor View All Material Requests"""
-    if request.user.role in ["admin", "supervisor"]:
-        requests = MaterialRequest.objects.select_related('user').order_by('-created_at')
-    else:
-        requests = MaterialRequest.objects.filter(user=request.user).order_by('-created_at')
-
-    return render(request, "accounts/material_requests.html", {"requests": requests})
+    requests = _material_request_scope(request.user).select_related('user').order_by('-created_at')
+    requests = _apply_list_filters(request.GET, requests, "created_at")
+
+    return render(request, "accounts/material_requests.html", {
+        "requests": requests,
+        "filters": request.GET,
+        "status_choices": MaterialRequest.STATUS_CHOICES,
+        "sites": _site_choices(),
+        "feed_cursor": _feed_cursor(request),
+    })
 
 
 @login_required
 def material_approve(request, pk):
     req = get_object_or_404(MaterialRequest, pk=pk)
-    req.status = "approved"
-    req.save()
-    messages.success(request, "✅ Material request approved.")
+    if not can_manage(request, req.user_id):
+        messages.error(request, TEAM_ONLY_MESSAGE)
+        return redirect("accounts:material_requests")
+    try:
+        _, refused = set_request_status(MaterialRequest.objects.filter(pk=req.pk), "approved", request.user)
+    except StockError as error:
+        refused = [(req, str(error))]
+    if refused:
+        messages.error(request, f"⚠️ Not approved: {refused[0][1]}.")
+    else:
+        invalidate_review_stats(request.user, req.user_id)
+        messages.success(request, "✅ Material request approved.")
     return redirect("accounts:material_requests")
 
 
 @login_required
 def material_reject(request, pk):
     req = get_object_or_404(MaterialRequest, pk=pk)
-    req.status = "rejected"
-    req.save()
-    messages.warning(request, "❌ Material request rejected.")
+    if not can_manage(request, req.user_id):
+        messages.error(request, TEAM_ONLY_MESSAGE)
+        return redirect("accounts:material_requests")
+    try:
+        _, refused = set_request_status(MaterialRequest.objects.filter(pk=req.pk), "rejected", request.user)
+    except StockError as error:
+        refused = [(req, str(error))]
+    if refused:
+        messages.error(request, f"⚠️ Not rejected: {refused[0][1]}.")
+    else:
+        invalidate_review_stats(request.user, req.user_id)
+        messages.warning(request, "❌ Material request rejected.")
     return redirect("accounts:material_requests")
+
+
+@login_required
+@require_POST
+def material_bulk_status(request):
+    return _bulk_status_update(
+        request, _material_request_scope(request.user), "created_at", "accounts:material_requests"
+    )
+
+
+@login_required
+def material_item_suggest(request):
+    """Typeahead for the material name field: JSON catalog items for ?q= (see accounts.catalog)."""
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 8)), 20))
+    except ValueError:
+        limit = 8
+    return JsonResponse({"results": suggest(request.GET.get("q", "")[:100], limit)})
+
+
+# ============================================
+# STOCK (storekeeper, see accounts.stock)
+# ============================================
+STOCK_ROLES = ["admin", "storekeeper"]
+
+
+def _can_keep_stock(user):
+    return user.is_superuser or user.role in STOCK_ROLES
+
+
+@login_required
+def stock_view(request):
+    """Stock per item and site, goods received, and approved lines waiting to be issued."""
+    if not _can_keep_stock(request.user):
+        return redirect("accounts:employee_dashboard")
+
+    if request.method == "POST":
+        name = request.POST.get("item_name", "").strip()
+        unit = request.POST.get("unit", "").strip()
+        site_id = request.POST.get("site", "")
+        try:
+            quantity = int(request.POST.get("quantity", ""))
+        except ValueError:
+            quantity = 0
+        if not normalize_item_name(name) or quantity <= 0:
+            messages.error(request, "⚠️ Enter an item and a quantity above zero.")
+            return redirect("accounts:stock")
+
+        item = items_by_name([name]).get(normalize_item_name(name))
+        if item is None:
+            item = Item.objects.create(name=name, unit=unit)
+        site = get_object_or_404(Site, pk=site_id) if site_id else None
+        receive(item, site, quantity, request.user, note=request.POST.get("note", "")[:255])
+        messages.success(request, f"✅ Received {quantity} {item.unit or ''} {item.name}.")
+        return redirect("accounts:stock")
+
+    balances = StockBalance.objects.select_related("item", "site").order_by("item__name", "site__name")
+    site = request.GET.get("site", "")
+    if site == "central":
+        balances = balances.filter(site__isnull=True)
+    elif site.isdigit():
+        balances = balances.filter(site_id=int(site))
+    if request.GET.get("q"):
+        balances = balances.filter(item__name__icontains=request.GET["q"])
+
+    to_issue = (
+        MaterialRequest.objects.filter(status="approved", reserved__gt=0, issued_at__isnull=True)
+        .select_related("user", "item")
+        .order_by("created_at")[:100]
+    )
+    moves = StockLedger.objects.select_related("item", "site", "user").order_by("-id")[:50]
+
+    return render(request, "accounts/stock.html", {
+        "balances": balances,
+        "to_issue": to_issue,
+        "moves": moves,
+        "sites": Site.objects.order_by("name"),
+        "filters": request.GET,
+    })
+
+
+@login_required
+@require_POST
+def stock_issue(request, pk):
+    if not _can_keep_stock(request.user):
+        return HttpResponseForbidden("Storekeepers only.")
+    try:
+        line = issue_request(pk, request.user)
+    except MaterialRequest.DoesNotExist:
+        messages.error(request, "⚠️ Material request not found.")
+    except StockError as error:
+        messages.error(request, f"⚠️ Not issued: {error}.")
+    else:
+        messages.success(request, f"✅ Issued {line.quantity} {line.item.name}.")
+    return redirect("accounts:stock")
+
+
+# ============================================
+# EXPORTS (streamed CSV / XLSX)
+# ============================================
+def _is_asgi(request):
+    """Whether this request came in through config.asgi rather than WSGI / runserver."""
+    return isinstance(request, ASGIRequest)
+
+
+@login_required
+def attendance_export(request):
+    attendance_list = _attendance_scope(request.user)
+    if attendance_list is None:
+        return redirect("accounts:attendance")
+    attendance_list = _apply_list_filters(request.GET, attendance_list, "shift_date")
+    return export_response(
+        attendance_list, ATTENDANCE_EXPORT, "attendance", request.GET.get("format"), _is_asgi(request)
+    )
+
+
+@login_required
+def work_reports_export(request):
+    reports = _apply_list_filters(request.GET, _work_report_scope(request.user), "created_at")
+    return export_response(
+        reports, WORK_REPORT_EXPORT, "work_reports", request.GET.get("format"), _is_asgi(request)
+    )
+
+
+@login_required
+def material_requests_export(request):
+    requests = _apply_list_filters(request.GET, _material_request_scope(request.user), "created_at")
+    return export_response(
+        requests, MATERIAL_REQUEST_EXPORT, "material_requests", request.GET.get("format"), _is_asgi(request)
+    )
+
+
+# ============================================
+# SEARCH (full text, see accounts.search)
+# ============================================
+@login_required
+def search_records(request):
+    """
+    JSON search over work reports and material requests the user may see.
+    GET params: q (prefix-matched words), type (all / work_reports /
+    material_requests), user (id), plus the usual status / site / date_from /
+    date_to filters and limit (max 100).
+    """
+    text = request.GET.get("q", "").strip()
+    kind = request.GET.get("type", "all")
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 20)), 100))
+    except ValueError:
+        limit = 20
+
+    targets = [
+        ("work_reports", _work_report_scope, "task_name"),
+        ("material_requests", _material_request_scope, "item_name"),
+    ]
+    results = []
+    for name, scope, title_field in targets:
+        if kind not in ("all", name):
+            continue
+        queryset = _apply_list_filters(request.GET, scope(request.user), "created_at")
+        user_id = request.GET.get("user", "")
+        if user_id.isdigit():
+            queryset = queryset.filter(user_id=int(user_id))
+
+        for row, rank in search(queryset, text, limit):
+            results.append({
+                "type": name,
+                "id": row.pk,
+                "title": getattr(row, title_field),
+                "description": (row.description or "")[:200],
+                "user": row.user.username,
+                "status": row.status,
+                "created_at": row.created_at.isoformat(),
+                "rank": rank,
+            })
+
+    results.sort(key=lambda result: result["rank"], reverse=True)
+    return JsonResponse({"query": text, "results": results[:limit]})
+
+
+# ============================================
+# SITES / GEOFENCE
+# ============================================
+@login_required
+def site_nearby(request, pk):
+    """JSON: who is clocked in near a site right now (?radius=<metres>, default the fence)."""
+    if request.user.role not in ["admin", "supervisor"]:
+        return JsonResponse({"error": "forbidden"}, status=403)
+    site = get_object_or_404(Site, pk=pk)
+    try:
+        radius = float(request.GET.get("radius", "")) or None
+    except ValueError:
+        radius = None
+
+    open_shifts = (
+        Attendance.objects.filter(clock_in__isnull=False, clock_out__isnull=True)
+        .select_related("user")
+        .only("id", "clock_in", "latitude", "longitude", "out_of_fence", "user__username")
+    )
+    if request.user.role == "supervisor":
+        open_shifts = open_shifts.filter(user__supervisor=request.user)
+    people = [
+        {
+            "user": row.user.username,
+            "attendance_id": row.id,
+            "clock_in": row.clock_in.isoformat() if row.clock_in else None,
+            "distance_m": round(haversine_m(site.latitude, site.longitude, row.latitude, row.longitude)),
+            "out_of_fence": row.out_of_fence,
+        }
+        for row in attendance_near(site, open_shifts, radius)
+    ]
+    return JsonResponse({"site": site.name, "people": sorted(people, key=lambda p: p["distance_m"])})
+
+
+# ============================================
+# LIVE FEED (server-sent events, see accounts.feed)
+# ============================================
+# page: (scope, date field for the list filters, row template, its variable, columns)
+LIVE_PAGES = {
+    "attendance": (
+        _attendance_scope, "shift_date", "accounts/_attendance_row.html", "record", ATTENDANCE_ROW_FIELDS,
+    ),
+    "material_requests": (
+        _material_request_scope, "created_at", "accounts/_material_request_row.html", "r", None,
+    ),
+}
+
+
+def _feed_cursor(request):
+    """
+    ?after= for a page's event stream, or None when the page is served over
+    WSGI / runserver: there a stream would hold a worker thread for as long
+    as the page stays open, so the page is rendered without live updates.
+    """
+    return feed.cursor() if _is_asgi(request) else None
+
+
+def _live_rows(request, page, ids):
+    """Rendered rows among `ids` the user may see on `page`, flagged if they pass its filters."""
+    scope, date_field, template, name, fields = LIVE_PAGES[page]
+    rows = scope(request.user).filter(pk__in=ids)
+    matching = set(_apply_list_filters(request.GET, rows, date_field).values_list("pk", flat=True))
+    rows = rows.select_related("user")
+    if fields:
+        rows = rows.only(*fields)
+    return [
+        {
+            "id": row.pk,
+            "match": row.pk in matching,
+            "html": render_to_string(template, {name: row}, request=request),
+        }
+        for row in rows.order_by("-pk")
+    ]
+
+
+def _event(seq, event=None, data=None):
+    lines = [f"id: {seq}"]
+    if event:
+        lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@login_required
+async def live_feed(request, page):
+    """
+    Server-sent events for the attendance_manage / material_requests tables:
+    "rows" events carry the re-rendered rows created or changed since
+    ?after= (or the Last-Event-ID the browser resends on reconnect), and
+    "reload" means the stream fell too far behind to catch up. Waiting costs
+    no queries. Only served under ASGI (config.asgi), where an open page
+    holds no worker thread; elsewhere the answer is 204, which tells the
+    browser not to reconnect.
+    """
+    if page not in LIVE_PAGES:
+        raise Http404
+    if not _is_asgi(request):
+        return HttpResponse(status=204)
+    request.user = await request.auser()
+    scope = LIVE_PAGES[page][0](request.user)
+    if scope is None:
+        return HttpResponseForbidden()
+    try:
+        after = int(request.headers.get("Last-Event-ID") or request.GET.get("after") or 0)
+    except ValueError:
+        after = 0
+    if not after:
+        after = await sync_to_async(feed.cursor)()
+    label = scope.model._meta.label_lower
+    live_rows = sync_to_async(_live_rows)
+
+    async def stream():
+        yield "retry: 5000\n\n"
+        try:
+            async for batches in feed.changes(after):
+                if batches is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                ids = {pk for _, changes in batches for pk in changes.get(label, ())}
+                rows = await live_rows(request, page, ids) if ids else []
+                yield _event(batches[-1][0], "rows" if rows else None, rows)
+        except feed.Stale:
+            yield "event: reload\ndata: {}\n\n"
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # let nginx pass events through unbuffered
+    return response
+
+
+# ============================================
+# REQUEST METRICS (settings.REQUEST_METRICS)
+# ============================================
+@login_required
+def request_metrics(request):
+    """Per-view query / timing numbers in Prometheus text format (admins only)."""
+    if not (request.user.is_superuser or request.user.role == "admin"):
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -3,6 +3,11 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the site through this (e.g. ``uvicorn config.asgi:application``) so the
+live approval pages work: accounts.views.live_feed is an async view that holds
+an event stream open per page, which under WSGI would tie up a worker thread
+each.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -17,16 +17,31 @@ import os
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+def env_bool(name, default=False):
+    """Read a true/false environment variable ("1", "true", "yes", "on")."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Every deployment knob below reads DJANGO_* / POSTGRES_* environment
+# variables; with none set you get the local SQLite development setup.
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-u%lmms@65u7rwtku#9^%%je8wh##)&2g0&ijnf=+fu-xo&z8x='
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-u%lmms@65u7rwtku#9^%%je8wh##)&2g0&ijnf=+fu-xo&z8x=',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('DJANGO_DEBUG', True)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -45,6 +60,7 @@ AUTH_USER_MODEL = 'accounts.User'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'accounts.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,13 +75,19 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compiled templates are kept in memory between requests.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -76,12 +98,109 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_ENGINE=postgres switches to PostgreSQL (needs psycopg). Connections
+# are kept open for DJANGO_CONN_MAX_AGE seconds and health-checked before
+# reuse; POSTGRES_POOL=1 uses psycopg's connection pool instead (Django 5.1+).
+
+DB_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'electrotrack'),
+            'USER': os.environ.get('POSTGRES_USER', 'electrotrack'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if env_bool('POSTGRES_POOL'):
+        # The pool owns connection lifetime; Django requires CONN_MAX_AGE = 0.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('POSTGRES_POOL_MIN', '2')),
+            'max_size': int(os.environ.get('POSTGRES_POOL_MAX', '20')),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# The test database is created from the current models: the early
+# migrations create the same tables twice and can't run on an empty database.
+DATABASES['default']['TEST'] = {'MIGRATE': False}
+
+# SQLite "high-concurrency" mode for single-box sites: every new connection
+# gets journal_mode=WAL, busy_timeout and synchronous=NORMAL (see
+# accounts.signals.tune_sqlite_connection), and transactions start with
+# BEGIN IMMEDIATE so writers queue on the busy timeout instead of failing
+# with "database is locked" when they upgrade a read lock.
+SQLITE_HIGH_CONCURRENCY = env_bool('DJANGO_SQLITE_HIGH_CONCURRENCY')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('DJANGO_SQLITE_BUSY_TIMEOUT_MS', '10000'))
+
+if DB_ENGINE != 'postgres' and SQLITE_HIGH_CONCURRENCY:
+    DATABASES['default']['OPTIONS'] = {
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+
+
+# Per-view query count / SQL / template timing (accounts.middleware).
+# Off by default; when on, responses carry a Server-Timing header and
+# /accounts/metrics/ serves Prometheus text to admins. Views running more
+# than REQUEST_QUERY_BUDGET queries are logged (0 disables the check).
+REQUEST_METRICS = env_bool('DJANGO_REQUEST_METRICS')
+REQUEST_QUERY_BUDGET = int(os.environ.get('DJANGO_REQUEST_QUERY_BUDGET', '30'))
+
+# Live approval pages (accounts.feed). "database" passes changes through a
+# ChangeNotification table that one thread per worker process polls while
+# pages are open, so every process sees every change; "local" skips the
+# table but only reaches pages served by the process that made the change
+# (a single ASGI worker, or runserver).
+LIVE_FEED_BACKEND = os.environ.get('DJANGO_LIVE_FEED', 'database')
+LIVE_FEED_POLL_SECONDS = float(os.environ.get('DJANGO_LIVE_FEED_POLL_SECONDS', '2'))
+
+# Pay rules for accounts.timesheet; any TimesheetRules field can be
+# overridden here, e.g. {"daily_overtime_after": 9, "night_premium": 0.5}.
+TIMESHEET_RULES = {}
+
+
+# Cache
+# DJANGO_CACHE = locmem (default) | file | redis
+
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('DJANGO_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / '.cache'),
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'electrotrack',
+        }
+    }
+
+# Sessions are read from the cache and written through to the database.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 
 # Password validation
@@ -133,3 +252,5 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# Where `manage.py archive_audit_events` writes its gzipped JSON Lines files.
+AUDIT_ARCHIVE_DIR = os.environ.get('DJANGO_AUDIT_ARCHIVE_DIR', BASE_DIR / 'audit-archive')